@@ -2,7 +2,7 @@ from fastapi import FastAPI
 
 from ..nodes.registry import NodeRegistry
 
-NodeRegistry.discover_nodes()
+NodeRegistry.ensure_discovered()
 
 from ..integrations.google.auth import router as google_auth_router
 from .ai_management import router as ai_management_router
@@ -9,7 +9,8 @@ from ..database import get_db
 from ..models.dataset_model import DatasetModel
 from ..models.run_model import RunModel
 from ..schemas.dataset_schemas import DatasetResponseSchema
-from ..schemas.run_schemas import RunResponseSchema
+from ..schemas.run_schemas import RunSummaryResponseSchema
+from .run_management import select_run_summaries
 
 router = APIRouter()
 
@@ -106,16 +107,15 @@ def delete_dataset(dataset_id: str, db: Session = Depends(get_db)):
 @router.get(
     "/{dataset_id}/list_runs/",
     description="List all runs that used this dataset",
-    response_model=List[RunResponseSchema],
+    response_model=List[RunSummaryResponseSchema],
 )
 def list_dataset_runs(dataset_id: str, db: Session = Depends(get_db)):
     dataset = db.query(DatasetModel).filter(DatasetModel.id == dataset_id).first()
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
-    runs = (
-        db.query(RunModel)
-        .filter(RunModel.input_dataset_id == dataset_id)
+    runs = db.scalars(
+        select_run_summaries()
+        .where(RunModel.input_dataset_id == dataset_id)
         .order_by(RunModel.created_at.desc())
-        .all()
-    )
+    ).all()
     return runs
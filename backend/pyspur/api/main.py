@@ -1,3 +1,5 @@
+import asyncio
+import contextlib
 import os
 import shutil
 import tempfile
@@ -13,7 +15,16 @@ from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 from loguru import logger
 
+from ..database import dispose_async_engine
+from ..execution.retention import (
+    RUN_RETENTION_INTERVAL_HOURS,
+    load_retention_policies,
+    run_retention_periodically,
+)
+from ..nodes.llm._response_cache import close_response_cache
+from ..utils.http_clients import close_http_clients
 from .api_app import api_app
+from .pagination import NEXT_CURSOR_HEADER
 
 load_dotenv()
 
@@ -22,12 +33,13 @@ exit_stack = ExitStack()
 temporary_static_dir = None
 socket_manager = None
 socket_thread = None
+retention_task = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifespan and cleanup."""
-    global temporary_static_dir, socket_manager, socket_thread
+    global temporary_static_dir, socket_manager, socket_thread, retention_task
 
     # Setup: Create temporary directory and extract static files
     temporary_static_dir = Path(tempfile.mkdtemp())
@@ -40,6 +52,12 @@ async def lifespan(app: FastAPI):
     if static_dir.exists():
         shutil.copytree(static_dir, temporary_static_dir, dirs_exist_ok=True)
 
+    # Prune the run history in the background if retention policies are configured
+    retention_policies = load_retention_policies()
+    if retention_policies and RUN_RETENTION_INTERVAL_HOURS > 0:
+        retention_task = asyncio.create_task(
+            run_retention_periodically(retention_policies, RUN_RETENTION_INTERVAL_HOURS)
+        )
 
     yield
 
@@ -54,6 +72,14 @@ async def lifespan(app: FastAPI):
             except Exception as e:
                 logger.error(f"Error stopping socket manager thread: {e}")
 
+    if retention_task:
+        retention_task.cancel()
+        # Let a pass in progress stop before its engine is disposed
+        with contextlib.suppress(asyncio.CancelledError):
+            await retention_task
+    await dispose_async_engine()
+    await close_response_cache()
+    await close_http_clients()
     exit_stack.close()
     shutil.rmtree(temporary_static_dir, ignore_errors=True)
 
@@ -67,6 +93,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Mount the API routes under /api
@@ -1,69 +1,84 @@
-from typing import Any, Dict, List
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, Response
+from fastapi.encoders import jsonable_encoder
 
 from ..nodes.factory import NodeFactory
-from ..nodes.llm._utils import LLMModels
+from ..nodes.manifest import load_manifest, node_type_schema
+from ..nodes.registry import NodeRegistry
 
 router = APIRouter()
 
 
-@router.get(
-    "/supported_types/",
-    description="Get the schemas for all available node types",
-)
-async def get_node_types() -> Dict[str, List[Dict[str, Any]]]:
-    """Return the schemas for all available node types."""
-    # get the schemas for each node class
+# The serialized /supported_types/ response with its ETag, for one registry version
+_supported_types_cache: Optional[Tuple[int, bytes, str]] = None
+
+
+def _build_node_types() -> Dict[str, List[Dict[str, Any]]]:
+    """Collect the schemas for all available node types.
+
+    Built-in node types are served from the node manifest, without importing them.
+    """
+    manifest = load_manifest()
     node_groups = NodeFactory.get_all_node_types()
 
-    response: Dict[str, List[Dict[str, Any]]] = {}
+    node_types_by_group: Dict[str, List[Dict[str, Any]]] = {}
     for group_name, node_types in node_groups.items():
-        node_schemas: List[Dict[str, Any]] = []
-        for node_type in node_types:
-            node_class = node_type.node_class
-            try:
-                input_schema = node_class.input_model.model_json_schema()
-            except AttributeError:
-                input_schema = {}
-            try:
-                output_schema = node_class.output_model.model_json_schema()
-            except AttributeError:
-                output_schema = {}
-
-            # Get the config schema and update its title with the display name
-            config_schema = node_class.config_model.model_json_schema()
-            config_schema["title"] = node_type.display_name
-            has_fixed_output = node_class.config_model.model_fields["has_fixed_output"].default
-
-            node_schema: Dict[str, Any] = {
-                "name": node_type.node_type_name,
-                "input": input_schema,
-                "output": output_schema,
-                "config": config_schema,
-                "visual_tag": node_class.get_default_visual_tag().model_dump(),
-                "has_fixed_output": has_fixed_output,
+        manifest_schemas: Dict[str, Dict[str, Any]] = {}
+        if manifest is not None:
+            manifest_schemas = {
+                node_schema["name"]: node_schema
+                for node_schema in manifest["supported_types"].get(group_name, [])
             }
+        node_types_by_group[group_name] = [
+            manifest_schemas.get(node_type.node_type_name) or node_type_schema(node_type)
+            for node_type in node_types
+        ]
+
+    return node_types_by_group
 
-            # Add model constraints if this is an LLM node
-            if node_type.node_type_name in ["LLMNode", "SingleLLMCallNode"]:
-                model_constraints = {}
-                for model_enum in LLMModels:
-                    model_info = LLMModels.get_model_info(model_enum.value)
-                    if model_info:
-                        model_constraints[model_enum.value] = model_info.constraints.model_dump()
-                node_schema["model_constraints"] = model_constraints
 
-            # Add the logo if available
-            logo = node_type.logo
-            if logo:
-                node_schema["logo"] = logo
+def get_supported_types_payload() -> Tuple[bytes, str]:
+    """Get the serialized schemas of all node types and their ETag.
 
-            category = node_type.category
-            if category:
-                node_schema["category"] = category
+    They are built once per version of the node registry, so they are rebuilt after
+    the tool functions were reloaded.
+    """
+    global _supported_types_cache
+    NodeRegistry.ensure_discovered()
+    registry_version = NodeRegistry.version()
+    cached = _supported_types_cache
+    if cached is None or cached[0] != registry_version:
+        body = json.dumps(jsonable_encoder(_build_node_types())).encode()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        cached = _supported_types_cache = (registry_version, body, etag)
+    return cached[1], cached[2]
 
-            node_schemas.append(node_schema)
-        response[group_name] = node_schemas
 
-    return response
+@router.get(
+    "/supported_types/",
+    description="Get the schemas for all available node types",
+    response_model=Dict[str, List[Dict[str, Any]]],
+)
+async def get_node_types(if_none_match: Optional[str] = Header(None)) -> Response:
+    """Return the schemas for all available node types.
+
+    Clients revalidate with the ETag and get an empty 304 response while it still matches.
+    """
+    body, etag = get_supported_types_payload()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.post(
+    "/tools/reload/",
+    description="Discover the tool functions in the project's tools directory again",
+)
+async def reload_tool_functions() -> Dict[str, int]:
+    """Re-import the tools directory, so edited tool functions take effect."""
+    tool_count = NodeRegistry.reload_tool_functions()
+    return {"tool_functions": tool_count}
@@ -0,0 +1,66 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple, TypeVar
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+T = TypeVar("T")
+
+# Response header carrying the cursor of the next page, absent on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(timestamp: datetime, intid: int) -> str:
+    """Encode the sort key of the last row of a page as an opaque cursor."""
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{intid}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor created by `encode_cursor`."""
+    try:
+        timestamp, _, intid = base64.urlsafe_b64decode(cursor.encode()).decode().partition("|")
+        return datetime.fromisoformat(timestamp), int(intid)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor") from None
+
+
+def keyset_page(
+    query: Select[Any],
+    time_column: InstrumentedAttribute[Any],
+    id_column: InstrumentedAttribute[int],
+    page_size: int,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+) -> Select[Any]:
+    """Select one page of rows, newest first.
+
+    With a cursor, the page starts right after the row the cursor was created from,
+    which the database finds through an index instead of skipping `offset` rows.
+    One row more than the page size is selected, see `finish_page`.
+    """
+    if cursor:
+        timestamp, intid = decode_cursor(cursor)
+        query = query.where(tuple_(time_column, id_column) < tuple_(timestamp, intid))
+    elif offset:
+        query = query.offset(offset)
+    return query.order_by(time_column.desc(), id_column.desc()).limit(page_size + 1)
+
+
+def finish_page(
+    rows: Sequence[T],
+    page_size: int,
+    response: Response,
+    time_attribute: str,
+    id_attribute: str = "_intid",
+) -> List[T]:
+    """Trim the extra row selected by `keyset_page` and set the next page's cursor."""
+    page = list(rows[:page_size])
+    if len(rows) > page_size:
+        last = page[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            getattr(last, time_attribute), getattr(last, id_attribute)
+        )
+    return page
@@ -1,62 +1,86 @@
+import asyncio
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, raiseload, selectinload
 
-from ..database import get_db
-from ..models.run_model import RunModel, RunStatus
-from ..models.task_model import TaskStatus
-from ..schemas.run_schemas import RunResponseSchema
+from ..database import get_async_db
+from ..execution.payload_store import get_default_payload_store
+from ..models.run_model import RunModel
+from ..schemas.run_schemas import RunResponseSchema, RunSummaryResponseSchema
+from .pagination import finish_page, keyset_page
 
 router = APIRouter()
 
 
+def select_run_summaries() -> Select[tuple[RunModel]]:
+    """Select runs loading only the columns of a run summary and no relationships."""
+    columns = [
+        getattr(RunModel, name)
+        for name in RunSummaryResponseSchema.model_fields
+        if name in RunModel.__mapper__.column_attrs
+    ]
+    return select(RunModel).options(load_only(*columns), raiseload("*"))
+
+
 @router.get(
     "/",
-    response_model=List[RunResponseSchema],
+    response_model=List[RunSummaryResponseSchema],
     description="List all runs",
 )
-def list_runs(
+async def list_runs(
+    response: Response,
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=10, ge=1, le=100),
+    cursor: Optional[str] = Query(
+        default=None, description="Cursor of the next page, from the X-Next-Cursor header"
+    ),
     parent_only: bool = True,
     run_type: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    offset = (page - 1) * page_size
-    query = db.query(RunModel)
+    query = select_run_summaries()
 
     if parent_only:
-        query = query.filter(RunModel.parent_run_id.is_(None))
+        query = query.where(RunModel.parent_run_id.is_(None))
     if run_type:
-        query = query.filter(RunModel.run_type == run_type)
+        query = query.where(RunModel.run_type == run_type)
 
-    runs = query.order_by(RunModel.start_time.desc()).offset(offset).limit(page_size).all()
-    return runs
+    runs = await db.scalars(
+        keyset_page(
+            query,
+            RunModel.start_time,
+            RunModel._intid,
+            page_size,
+            cursor=cursor,
+            offset=(page - 1) * page_size,
+        )
+    )
+    return finish_page(runs.all(), page_size, response, "start_time")
 
 
-@router.get("/{run_id}/", response_model=RunResponseSchema)
-def get_run(run_id: str, db: Session = Depends(get_db)):
-    run = db.query(RunModel).filter(RunModel.id == run_id).first()
+async def _get_run_detail(db: AsyncSession, run_id: str) -> RunResponseSchema:
+    """Load a run with its tasks and the full payloads of those tasks."""
+    run = await db.scalar(
+        select(RunModel)
+        .options(selectinload(RunModel.tasks), selectinload(RunModel.workflow_version))
+        .where(RunModel.id == run_id)
+    )
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
-    return run
+    response = RunResponseSchema.model_validate(run)
+    # Offloaded payloads are read from disk, which mustn't block the event loop
+    await asyncio.to_thread(get_default_payload_store().resolve_tasks, response.tasks)
+    return response
+
+
+@router.get("/{run_id}/", response_model=RunResponseSchema)
+async def get_run(run_id: str, db: AsyncSession = Depends(get_async_db)):
+    return await _get_run_detail(db, run_id)
 
 
 @router.get("/{run_id}/status/", response_model=RunResponseSchema)
-def get_run_status(run_id: str, db: Session = Depends(get_db)):
-    run = db.query(RunModel).filter(RunModel.id == run_id).first()
-    if not run:
-        raise HTTPException(status_code=404, detail="Run not found")
-    if run.status != RunStatus.FAILED:
-        failed_tasks = [task for task in run.tasks if task.status == TaskStatus.FAILED]
-        running_and_pending_tasks = [
-            task for task in run.tasks if task.status in [TaskStatus.PENDING, TaskStatus.RUNNING]
-        ]
-        if failed_tasks and len(running_and_pending_tasks) == 0:
-            run.status = RunStatus.FAILED
-            db.commit()
-            db.refresh(run)
-    if not run:
-        raise HTTPException(status_code=404, detail="Run not found")
-    return run
+async def get_run_status(run_id: str, db: AsyncSession = Depends(get_async_db)):
+    return await _get_run_detail(db, run_id)
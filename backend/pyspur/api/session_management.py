@@ -1,9 +1,9 @@
 from typing import cast
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
 from ..database import get_db
 from ..models.user_session_model import SessionModel, UserModel
@@ -13,6 +13,7 @@ from ..schemas.session_schemas import (
     SessionListResponse,
     SessionResponse,
 )
+from .pagination import finish_page, keyset_page
 
 router = APIRouter()
 
@@ -71,8 +72,12 @@ async def create_session(
 
 @router.get("/", response_model=SessionListResponse)
 async def list_sessions(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: str | None = Query(
+        None, description="Cursor of the next page, from the X-Next-Cursor header"
+    ),
     user_id: str | None = None,
     db: Session = Depends(get_db),
 ) -> SessionListResponse:
@@ -85,17 +90,18 @@ async def list_sessions(
     # Get total count
     total_count = cast(int, db.scalar(select(func.count()).select_from(query.subquery())))
 
-    # Get paginated sessions
-    sessions = (
-        db.query(SessionModel)
-        .execution_options(join_depth=2)  # Include messages in response
-        .order_by(SessionModel.created_at.desc())
-    )
-
-    if user_id:
-        sessions = sessions.filter(SessionModel.user_id == user_id)
-
-    sessions = sessions.offset(skip).limit(limit).all()
+    # Get paginated sessions, with the messages of the whole page loaded in one query
+    sessions = db.scalars(
+        keyset_page(
+            query.options(selectinload(SessionModel.messages)),
+            SessionModel.created_at,
+            SessionModel._intid,
+            limit,
+            cursor=cursor,
+            offset=skip,
+        )
+    ).all()
+    sessions = finish_page(sessions, limit, response, "created_at")
 
     # Convert models to response schemas
     session_responses = [SessionResponse.model_validate(session) for session in sessions]
@@ -1,4 +1,3 @@
-import asyncio
 import base64
 import hashlib
 import json
@@ -6,24 +5,30 @@ import os
 import re
 from datetime import datetime, timezone
 from pathlib import Path  # Import Path for directory handling
-from typing import Any, Awaitable, Callable, Coroutine, Dict, List, Optional, Set, Tuple, Union
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Set, Tuple, Union
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
 from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..database import SessionLocal, get_async_db, get_db
 from ..dataset.ds_util import get_ds_column_names, get_ds_iterator
+from ..execution.batch import iter_ordered
+from ..execution.fingerprint import TaskOutputLookup
+from ..execution.payload_store import get_default_payload_store
+from ..execution.run_registry import cancel_run
 from ..execution.task_recorder import TaskRecorder
 from ..execution.workflow_execution_context import WorkflowExecutionContext
-from ..execution.workflow_executor import WorkflowExecutor
+from ..execution.workflow_executor import WorkflowCancelledError, WorkflowExecutor
 from ..models.dataset_model import DatasetModel
 from ..models.output_file_model import OutputFileModel
-from ..models.run_model import RunModel, RunStatus
+from ..models.run_model import RunModel, RunStatus, recount_task_counters
 from ..models.task_model import TaskModel, TaskStatus
 from ..models.workflow_model import WorkflowModel
 from ..nodes.base import BaseNodeOutput
 from ..nodes.factory import NodeFactory
+from ..nodes.llm._batch import LLM_BATCH_MAX_REQUESTS, collect_llm_batches
 from ..nodes.logic.human_intervention import HumanInterventionNodeOutput, PauseError
 from ..schemas.pause_schemas import (
     PausedWorkflowResponseSchema,
@@ -34,10 +39,13 @@ from ..schemas.run_schemas import (
     PartialRunRequestSchema,
     ResumeRunRequestSchema,
     RunResponseSchema,
+    RunSummaryResponseSchema,
     StartRunRequestSchema,
 )
 from ..schemas.workflow_schemas import WorkflowDefinitionSchema, WorkflowNodeSchema
 from ..utils.workflow_version_utils import fetch_workflow_version
+from .pagination import finish_page, keyset_page
+from .run_management import select_run_summaries
 
 router = APIRouter()
 
@@ -155,8 +163,14 @@ async def run_workflow_blocking_v2(  # noqa: C901
         workflow=workflow_definition,
         task_recorder=task_recorder,
         context=context,
+        version_key=workflow_version.definition_hash,
+        output_lookup=TaskOutputLookup(db, workflow.id).get if request.reuse_outputs else None,
+        timeout=request.timeout,
     )
     input_node = next(node for node in workflow_definition.nodes if node.node_type == "InputNode")
+    # End the transaction so the session doesn't hold a pooled connection while the nodes
+    # run, e.g. while the rows of a batch run wait for their batch job
+    db.commit()
 
     try:
         outputs = await executor(initial_inputs[input_node.id])
@@ -189,6 +203,9 @@ async def run_workflow_blocking_v2(  # noqa: C901
                         end_time=datetime.now(),
                         is_downstream_of_pause=True,
                     )
+            await task_recorder.aflush()
+        elif task_recorder.has_failed_tasks:
+            new_run.status = RunStatus.FAILED
         else:
             new_run.status = RunStatus.COMPLETED
 
@@ -202,6 +219,7 @@ async def run_workflow_blocking_v2(  # noqa: C901
         # Refresh the run to get the updated tasks
         db.refresh(new_run)
         response = RunResponseSchema.model_validate(new_run)
+        get_default_payload_store().resolve_tasks(response.tasks)
         response.message = "Workflow execution completed successfully."
         return response
 
@@ -231,6 +249,7 @@ async def run_workflow_blocking_v2(  # noqa: C901
                     end_time=datetime.now(),
                     is_downstream_of_pause=True,
                 )
+        await task_recorder.aflush()
 
         db.commit()
         # Refresh the run to get the updated tasks
@@ -241,6 +260,16 @@ async def run_workflow_blocking_v2(  # noqa: C901
             status_code=202,
             detail=response.model_dump(),
         ) from e
+    except WorkflowCancelledError as e:
+        new_run.status = RunStatus.CANCELED
+        new_run.end_time = datetime.now(timezone.utc)
+        db.commit()
+        response = RunResponseSchema.model_validate(new_run)
+        response.message = "Workflow execution was canceled."
+        raise HTTPException(
+            status_code=409,
+            detail=response.model_dump(),
+        ) from e
     except Exception as e:
         new_run.status = RunStatus.FAILED
         new_run.end_time = datetime.now(timezone.utc)
@@ -303,8 +332,14 @@ async def run_workflow_blocking(  # noqa: C901
         workflow=workflow_definition,
         task_recorder=task_recorder,
         context=context,
+        version_key=workflow_version.definition_hash,
+        output_lookup=TaskOutputLookup(db, workflow.id).get if request.reuse_outputs else None,
+        timeout=request.timeout,
     )
     input_node = next(node for node in workflow_definition.nodes if node.node_type == "InputNode")
+    # End the transaction so the session doesn't hold a pooled connection while the nodes
+    # run, e.g. while the rows of a batch run wait for their batch job
+    db.commit()
 
     try:
         outputs = await executor(initial_inputs[input_node.id])
@@ -337,6 +372,9 @@ async def run_workflow_blocking(  # noqa: C901
                         end_time=datetime.now(),
                         is_downstream_of_pause=True,
                     )
+            await task_recorder.aflush()
+        elif task_recorder.has_failed_tasks:
+            new_run.status = RunStatus.FAILED
         else:
             new_run.status = RunStatus.COMPLETED
 
@@ -373,11 +411,23 @@ async def run_workflow_blocking(  # noqa: C901
                     end_time=datetime.now(),
                     is_downstream_of_pause=True,
                 )
+        await task_recorder.aflush()
 
         db.commit()
         # Refresh the run to get the updated tasks
         db.refresh(new_run)
         raise e
+    except WorkflowCancelledError:
+        new_run.status = RunStatus.CANCELED
+        new_run.end_time = datetime.now(timezone.utc)
+        db.commit()
+        raise
+    except Exception:
+        # Includes WorkflowTimeoutError, the run was stopped at its deadline
+        new_run.status = RunStatus.FAILED
+        new_run.end_time = datetime.now(timezone.utc)
+        db.commit()
+        raise
 
 
 @router.post(
@@ -450,6 +500,8 @@ async def run_workflow_non_blocking(  # noqa: C901
 
                 if has_paused_tasks:
                     _handle_paused_workflow(run, executor, task_recorder, workflow_version)
+                elif task_recorder.has_failed_tasks:
+                    run.status = RunStatus.FAILED
                 else:
                     run.status = RunStatus.COMPLETED
 
@@ -460,6 +512,11 @@ async def run_workflow_non_blocking(  # noqa: C901
                 # Refresh the run to get the updated tasks
                 session.refresh(run)
                 return  # Don't raise the exception so the background task can complete
+            except WorkflowCancelledError:
+                run.status = RunStatus.CANCELED
+                run.end_time = datetime.now(timezone.utc)
+                session.commit()
+                return
             except Exception as e:
                 run.status = RunStatus.FAILED
                 run.end_time = datetime.now(timezone.utc)
@@ -490,6 +547,13 @@ async def run_workflow_non_blocking(  # noqa: C901
             workflow=workflow_definition,
             task_recorder=task_recorder,
             context=context,
+            version_key=workflow_version.definition_hash,
+            output_lookup=(
+                TaskOutputLookup(session, run.workflow_id).get
+                if start_run_request.reuse_outputs
+                else None
+            ),
+            timeout=start_run_request.timeout,
         )
         return task_recorder, context, executor
 
@@ -556,6 +620,7 @@ async def run_workflow_non_blocking(  # noqa: C901
                     end_time=datetime.now(),
                     is_downstream_of_pause=True,
                 )
+        task_recorder.flush()
 
     background_tasks.add_task(run_workflow_task, new_run.id, workflow_definition)
 
@@ -576,7 +641,10 @@ async def run_partial_workflow(
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
     workflow_definition = WorkflowDefinitionSchema.model_validate(workflow.definition)
-    executor = WorkflowExecutor(workflow_definition)
+    executor = WorkflowExecutor(
+        workflow_definition,
+        output_lookup=TaskOutputLookup(db, workflow_id).get if request.reuse_outputs else None,
+    )
     input_node = next(node for node in workflow_definition.nodes if node.node_type == "InputNode")
     initial_inputs = request.initial_inputs or {}
     try:
@@ -590,6 +658,19 @@ async def run_partial_workflow(
         raise HTTPException(status_code=400, detail=str(e)) from e
 
 
+def _defers_llm_requests(definition: Dict[str, Any]) -> bool:
+    """Check whether a node of the workflow or of its subworkflows defers its LLM requests."""
+    for node in definition.get("nodes") or []:
+        config = node.get("config") or {}
+        if config.get("deferred_batch"):
+            return True
+        # Subworkflows are kept on the node or, for loops and agents, in its config
+        for subworkflow in (node.get("subworkflow"), config.get("subworkflow")):
+            if isinstance(subworkflow, dict) and _defers_llm_requests(subworkflow):
+                return True
+    return False
+
+
 @router.post(
     "/{workflow_id}/start_batch_run/",
     response_model=RunResponseSchema,
@@ -651,52 +732,55 @@ async def batch_run_workflow_non_blocking(  # noqa: C901
         input_node_id: str,
         parent_run_id: str,
         background_tasks: BackgroundTasks,
-        db: Session,
         mini_batch_size: int,
         output_file_path: str,
     ):
-        ds_iter = get_ds_iterator(file_path)
-        current_batch: List[Awaitable[Dict[str, Any]]] = []
-        batch_count = 0
-        for inputs in ds_iter:
+        async def run_single_input(inputs: Dict[str, Any]) -> Dict[str, Any]:
             initial_inputs = {
                 input_node_id: {k: v for k, v in inputs.items() if k in workflow_input_schema}
             }
-            single_input_run_task = run_workflow_blocking(
-                workflow_id=workflow_id,
-                request=StartRunRequestSchema(
-                    initial_inputs=initial_inputs, parent_run_id=parent_run_id
-                ),
-                db=db,
-                run_type="batch",
-            )
-            current_batch.append(single_input_run_task)
-            if len(current_batch) == mini_batch_size:
-                minibatch_results = await asyncio.gather(*current_batch)
-                current_batch = []
-                batch_count += 1
+            try:
+                # Rows run concurrently, so each needs a session of its own
+                with SessionLocal() as session:
+                    outputs = await run_workflow_blocking(
+                        workflow_id=workflow_id,
+                        request=StartRunRequestSchema(
+                            initial_inputs=initial_inputs, parent_run_id=parent_run_id
+                        ),
+                        db=session,
+                        run_type="batch",
+                    )
+            except Exception as e:
+                # The row's run is already recorded as failed or canceled; keep going
+                # with the remaining rows and note the failure in the output file
+                return {"error": str(e)}
+            return {node_id: output.model_dump() for node_id, output in outputs.items()}
+
+        # Deferred LLM requests wait for a batch job, so enough rows have to be in flight
+        # to fill one
+        if _defers_llm_requests(workflow_definition.model_dump()):
+            mini_batch_size = max(mini_batch_size, LLM_BATCH_MAX_REQUESTS)
+
+        # Sliding window of mini_batch_size concurrent runs, results written in dataset order
+        status = RunStatus.COMPLETED
+        try:
+            async with collect_llm_batches():
                 with open(output_file_path, "a") as output_file:
-                    for output in minibatch_results:
-                        output = {
-                            node_id: output.model_dump() for node_id, output in output.items()
-                        }
+                    async for output in iter_ordered(
+                        get_ds_iterator(file_path), run_single_input, mini_batch_size
+                    ):
                         output_file.write(json.dumps(output) + "\n")
-
-        if current_batch:
-            results = await asyncio.gather(*current_batch)
-            with open(output_file_path, "a") as output_file:
-                for output in results:
-                    output = {node_id: output.model_dump() for node_id, output in output.items()}
-                    output_file.write(json.dumps(output) + "\n")
-
-        with next(get_db()) as session:
-            run = session.query(RunModel).filter(RunModel.id == parent_run_id).first()
-            if not run:
-                session.close()
-                return
-            run.status = RunStatus.COMPLETED
-            run.end_time = datetime.now(timezone.utc)
-            session.commit()
+                        output_file.flush()
+        except Exception:
+            status = RunStatus.FAILED
+            raise
+        finally:
+            with SessionLocal() as session:
+                run = session.query(RunModel).filter(RunModel.id == parent_run_id).first()
+                if run:
+                    run.status = status
+                    run.end_time = datetime.now(timezone.utc)
+                    session.commit()
 
     background_tasks.add_task(
         start_mini_batch_runs,
@@ -706,7 +790,6 @@ async def batch_run_workflow_non_blocking(  # noqa: C901
         input_node_id,
         new_run.id,
         background_tasks,
-        db,
         mini_batch_size,
         output_file_path,
     )
@@ -717,11 +800,12 @@ async def batch_run_workflow_non_blocking(  # noqa: C901
 
 @router.get(
     "/{workflow_id}/runs/",
-    response_model=List[RunResponseSchema],
+    response_model=List[RunSummaryResponseSchema],
     description="List all runs of a workflow",
 )
-def list_runs(
+async def list_runs(
     workflow_id: str,
+    response: Response,
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=10, ge=1, le=100),
     start_date: Optional[datetime] = Query(
@@ -731,39 +815,35 @@ def list_runs(
         default=None, description="Filter runs before this date (inclusive)"
     ),
     status: Optional[RunStatus] = Query(default=None, description="Filter runs by status"),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(
+        default=None, description="Cursor of the next page, from the X-Next-Cursor header"
+    ),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    offset = (page - 1) * page_size
-    query = db.query(RunModel).filter(RunModel.workflow_id == workflow_id)
+    query = select_run_summaries().where(RunModel.workflow_id == workflow_id)
 
     # Apply date filters if provided
     if start_date:
-        query = query.filter(RunModel.start_time >= start_date)
+        query = query.where(RunModel.start_time >= start_date)
     if end_date:
-        query = query.filter(RunModel.start_time <= end_date)
+        query = query.where(RunModel.start_time <= end_date)
 
     # Apply status filter if provided
     if status:
-        query = query.filter(RunModel.status == status)
+        query = query.where(RunModel.status == status)
 
     # Order by start time descending and apply pagination
-    runs = query.order_by(RunModel.start_time.desc()).offset(offset).limit(page_size).all()
-
-    # Update run status based on task status
-    for run in runs:
-        if run.status != RunStatus.FAILED:
-            failed_tasks = [task for task in run.tasks if task.status == TaskStatus.FAILED]
-            running_and_pending_tasks = [
-                task
-                for task in run.tasks
-                if task.status in [TaskStatus.PENDING, TaskStatus.RUNNING]
-            ]
-            if failed_tasks and len(running_and_pending_tasks) == 0:
-                run.status = RunStatus.FAILED
-                db.commit()
-                db.refresh(run)
-
-    return runs
+    runs = await db.scalars(
+        keyset_page(
+            query,
+            RunModel.start_time,
+            RunModel._intid,
+            page_size,
+            cursor=cursor,
+            offset=(page - 1) * page_size,
+        )
+    )
+    return finish_page(runs.all(), page_size, response, "start_time")
 
 
 def save_embedded_file(data_uri: str, workflow_id: str) -> str:
@@ -884,7 +964,10 @@ def get_paused_workflows(
                         else None,
                         resume_user_id=None,  # This would come from task metadata if needed
                         resume_action=None,  # This would come from task metadata if needed
-                        input_data=latest_paused_task.inputs or {},
+                        input_data=get_default_payload_store().resolve_inputs(
+                            latest_paused_task.inputs or {},
+                            {task.node_id: task.outputs for task in run.tasks},
+                        ),
                         comments=None,  # This would come from task metadata if needed
                     )
 
@@ -912,6 +995,7 @@ def get_run_pause_history(db: Session, run_id: str) -> List[PauseHistoryResponse
     if run.tasks:
         # Get all tasks that were ever paused
         paused_tasks = [task for task in run.tasks if task.status == TaskStatus.PAUSED]
+        outputs_by_node = {task.node_id: task.outputs for task in run.tasks}
         for task in paused_tasks:
             # Skip if no pause time
             pause_time = task.end_time or task.start_time
@@ -934,7 +1018,9 @@ def get_run_pause_history(db: Session, run_id: str) -> List[PauseHistoryResponse
                     else None,
                     resume_user_id=None,  # This would come from task metadata if needed
                     resume_action=None,  # This would come from task metadata if needed
-                    input_data=task.inputs or {},
+                    input_data=get_default_payload_store().resolve_inputs(
+                        task.inputs or {}, outputs_by_node
+                    ),
                     comments=None,  # This would come from task metadata if needed
                 )
             )
@@ -1019,6 +1105,7 @@ def _update_paused_task(
     for pending_task in pending_tasks:
         db.delete(pending_task)
 
+    recount_task_counters(db, run.id)
     db.commit()
     db.refresh(run)
 
@@ -1071,6 +1158,7 @@ def _setup_workflow_executor(
         task_recorder=task_recorder,
         context=context,
         resumed_node_ids=[paused_task.node_id],  # Tell executor which node was resumed
+        version_key=workflow_version.definition_hash,
     )
 
     return executor, workflow_definition, context
@@ -1096,7 +1184,7 @@ def _update_executor_outputs(
     # Update the outputs with existing outputs
     if run.outputs:
         executor.outputs = {
-            k: NodeFactory.create_node(
+            k: NodeFactory.get_prototype(
                 node_name=node.title,
                 node_type_name=node.node_type,
                 config=node.config,
@@ -1115,8 +1203,11 @@ def _update_executor_outputs(
             inputs_data = {}
 
             # If we have task inputs, include them in the structure
-            if paused_task.inputs and isinstance(paused_task.inputs, dict):
-                inputs_data.update(paused_task.inputs)  # type: ignore
+            paused_task_inputs = get_default_payload_store().resolve_inputs(
+                paused_task.inputs, {task.node_id: task.outputs for task in run.tasks}
+            )
+            if paused_task_inputs and isinstance(paused_task_inputs, dict):
+                inputs_data.update(paused_task_inputs)  # type: ignore
 
             # Add the new inputs from the action request
             # This ensures downstream nodes can access values via HumanInterventionNode_1.input_1
@@ -1225,10 +1316,16 @@ def _create_resume_workflow_task(  # noqa: C901
 
             # Update their status to RUNNING
             for task in run.tasks:
-                if task.status == TaskStatus.PENDING and task.node_id in blocked_node_ids:
-                    task.status = TaskStatus.RUNNING
-                    task.start_time = datetime.now(timezone.utc)
-            db.commit()
+                if (
+                    executor.task_recorder
+                    and task.status == TaskStatus.PENDING
+                    and task.node_id in blocked_node_ids
+                ):
+                    executor.task_recorder.update_task(
+                        node_id=task.node_id,
+                        status=TaskStatus.RUNNING,
+                        start_time=datetime.now(timezone.utc),
+                    )
 
             # Convert outputs to dict format for precomputed_outputs
             precomputed: Dict[str, Union[Dict[str, Any], List[Dict[str, Any]]]] = {}
@@ -1286,7 +1383,13 @@ def _create_resume_workflow_task(  # noqa: C901
             else:
                 run.outputs = {k: v.model_dump() for k, v in outputs.items()}
 
-            run.status = RunStatus.COMPLETED
+            if executor.task_recorder and executor.task_recorder.has_failed_tasks:
+                run.status = RunStatus.FAILED
+            else:
+                run.status = RunStatus.COMPLETED
+            run.end_time = datetime.now(timezone.utc)
+        except WorkflowCancelledError:
+            run.status = RunStatus.CANCELED
             run.end_time = datetime.now(timezone.utc)
         except Exception as e:
             run.status = RunStatus.FAILED
@@ -1300,16 +1403,22 @@ def _create_resume_workflow_task(  # noqa: C901
 @router.post(
     "/cancel_workflow/{run_id}/",
     response_model=RunResponseSchema,
-    description="Cancel a workflow that is awaiting human approval",
+    description="Cancel a running workflow or one that is awaiting human approval",
 )
 def cancel_workflow(
     run_id: str,
     db: Session = Depends(get_db),
 ) -> RunResponseSchema:
-    """Cancel a workflow that is currently paused or awaiting human approval.
+    """Cancel a workflow that is currently running, paused or awaiting human approval.
 
     This will mark the run as CANCELED in the database and update all pending tasks
-    to CANCELED as well.
+    to CANCELED as well. If the run is executing in this process, its in-flight nodes
+    are cancelled too, and its executor records their tasks as CANCELED.
+
+    Runs are only cancelled in the process that executes them: when the API is served
+    by several worker processes and another worker executes the run, the request only
+    updates the database and the run's nodes keep running until the run ends. The
+    response message tells whether the nodes were stopped.
 
     Args:
         run_id: The ID of the run to cancel
@@ -1337,16 +1446,22 @@ def cancel_workflow(
             ),
         )
 
+    # Stop the nodes that are still executing; the run's task recorder marks them canceled
+    stopped = cancel_run(run_id)
+
     # Update the run status
+    run_status_before = run.status
     run.status = RunStatus.CANCELED
     run.end_time = datetime.now(timezone.utc)
 
     # Update all pending and running tasks to canceled
-    for task in run.tasks:
-        if task.status in [TaskStatus.PENDING, TaskStatus.RUNNING, TaskStatus.PAUSED]:
-            task.status = TaskStatus.CANCELED
-            if not task.end_time:
-                task.end_time = datetime.now(timezone.utc)
+    if not stopped:
+        for task in run.tasks:
+            if task.status in [TaskStatus.PENDING, TaskStatus.RUNNING, TaskStatus.PAUSED]:
+                task.status = TaskStatus.CANCELED
+                if not task.end_time:
+                    task.end_time = datetime.now(timezone.utc)
+        recount_task_counters(db, run.id)
 
     # Commit the changes
     db.commit()
@@ -1354,5 +1469,11 @@ def cancel_workflow(
 
     # Return the updated run
     response = RunResponseSchema.model_validate(run)
-    response.message = "Workflow has been canceled successfully."
+    if stopped or run_status_before == RunStatus.PAUSED:
+        response.message = "Workflow has been canceled successfully."
+    else:
+        response.message = (
+            "Workflow has been marked as canceled, but it is not executing in this "
+            "process so its running nodes could not be stopped."
+        )
     return response
@@ -4,7 +4,7 @@ import os
 import shutil
 from importlib.metadata import version as get_version
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Optional
 
 import typer
 import uvicorn
@@ -178,6 +178,92 @@ def serve(
         raise typer.Exit(1) from e
 
 
+@app.command(name="prune-runs")
+def prune_runs(
+    older_than_days: Optional[float] = typer.Option(
+        None,
+        help="Delete finished runs that started more than this many days ago. "
+        "Without this or --compact-after-days, the RUN_RETENTION_POLICIES setting is used.",
+    ),
+    compact_after_days: Optional[float] = typer.Option(
+        None,
+        help="Replace the subruns of finished runs older than this many days with a summary.",
+    ),
+    workflow_id: Optional[str] = typer.Option(None, help="Only prune runs of this workflow."),
+    run_type: Optional[str] = typer.Option(None, help="Only prune runs of this type."),
+    archive: bool = typer.Option(True, help="Archive runs before deleting them."),
+    archive_dir: Optional[Path] = typer.Option(
+        None, help="Directory for archives. Defaults to RUN_RETENTION_ARCHIVE_DIR."
+    ),
+    archive_format: Optional[str] = typer.Option(
+        None, help="Archive format, jsonl or parquet. Defaults to RUN_RETENTION_ARCHIVE_FORMAT."
+    ),
+    batch_size: Optional[int] = typer.Option(
+        None, min=1, help="Runs deleted per transaction. Defaults to RUN_RETENTION_BATCH_SIZE."
+    ),
+    dry_run: bool = typer.Option(
+        False, help="Only report how many runs would be deleted and compacted."
+    ),
+    sqlite: bool = typer.Option(
+        False,
+        help="Use SQLite database instead of PostgreSQL. Useful for local development.",
+    ),
+) -> None:
+    """Archive, delete and compact old workflow runs."""
+    try:
+        # Load environment variables before the retention settings are read
+        load_environment()
+        if sqlite:
+            os.environ["SQLITE_OVERRIDE_DATABASE_URL"] = "sqlite:///./pyspur.db"
+
+        from ..execution.retention import RetentionPolicy, apply_retention, load_retention_policies
+
+        if older_than_days is None and compact_after_days is None:
+            policies = load_retention_policies()
+            if not policies:
+                print(
+                    "[red]No retention policy given. Pass --older-than-days or"
+                    " --compact-after-days, or set RUN_RETENTION_POLICIES.[/red]"
+                )
+                raise typer.Exit(1)
+        else:
+            policies = [
+                RetentionPolicy(
+                    workflow_id=workflow_id,
+                    run_type=run_type,
+                    max_age_days=older_than_days,
+                    compact_after_days=compact_after_days,
+                    archive=archive,
+                )
+            ]
+
+        options: Dict[str, Any] = {}
+        if archive_dir is not None:
+            options["archive_dir"] = archive_dir
+        if archive_format is not None:
+            if archive_format not in ("jsonl", "parquet"):
+                print("[red]The archive format must be jsonl or parquet.[/red]")
+                raise typer.Exit(1)
+            options["archive_format"] = archive_format
+        if batch_size is not None:
+            options["batch_size"] = batch_size
+
+        result = apply_retention(policies, dry_run=dry_run, **options)
+
+        action = "Would delete" if dry_run else "Deleted"
+        print(f"[green]✓[/green] {action} {result.deleted_runs} runs")
+        action = "Would compact" if dry_run else "Compacted"
+        print(f"[green]✓[/green] {action} the subruns of {result.compacted_runs} runs")
+        if result.archive_path:
+            print(f"[green]✓[/green] Archived runs to {result.archive_path}")
+
+    except typer.Exit:
+        raise
+    except Exception as e:
+        print(f"[red]Error pruning runs: {str(e)}[/red]")
+        raise typer.Exit(1) from e
+
+
 def main() -> None:
     """PySpur CLI."""
     app()
@@ -1,7 +1,14 @@
 import os
-from typing import Iterator
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import Session, sessionmaker
 
 # Get the database URL from the environment
@@ -17,12 +24,77 @@ sqlite_override_database_url = os.getenv("SQLITE_OVERRIDE_DATABASE_URL")
 if sqlite_override_database_url:
     database_url = sqlite_override_database_url
 
+# Connection pool settings, used by both the sync and the async engine
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Seconds after which a pooled connection is replaced (-1 = never)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Prepared statements cached per asyncpg connection by SQLAlchemy, which prepares every
+# statement it runs (0 disables the cache, which is required behind a transaction-mode
+# pgbouncer)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+
+def _engine_options(url: URL) -> Dict[str, Any]:
+    """Get the pool options for an engine on the given database."""
+    options: Dict[str, Any] = {"pool_pre_ping": DB_POOL_PRE_PING}
+    # SQLite engines use pools without size limits
+    if url.get_backend_name() != "sqlite":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return options
+
+
+def get_async_database_url(url: str) -> URL:
+    """Get the URL of a database for its async driver (asyncpg or aiosqlite)."""
+    async_url = make_url(url)
+    backend = async_url.get_backend_name()
+    if backend == "postgresql":
+        async_url = async_url.set(drivername="postgresql+asyncpg").update_query_dict(
+            {"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)}
+        )
+    elif backend == "sqlite":
+        async_url = async_url.set(drivername="sqlite+aiosqlite")
+    return async_url
+
+
 # Create the SQLAlchemy engine
-engine = create_engine(database_url)
+engine = create_engine(database_url, **_engine_options(make_url(database_url)))
 
 # Create a configured "Session" class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The async engine is created on first use, so the async drivers are only needed by
+# processes that use it
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker[AsyncSession]] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    """Get the process-wide async engine."""
+    global _async_engine
+    if _async_engine is None:
+        url = get_async_database_url(database_url)
+        _async_engine = create_async_engine(url, **_engine_options(url))
+    return _async_engine
+
+
+def get_async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    """Get the factory for sessions on the async engine."""
+    global _async_session_factory
+    if _async_session_factory is None:
+        # Objects stay readable after commit; refreshing them would need an await
+        _async_session_factory = async_sessionmaker(
+            get_async_engine(), autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory
+
 
 def get_db() -> Iterator[Session]:
     """Get a database connection."""
@@ -33,6 +105,21 @@ def get_db() -> Iterator[Session]:
         db.close()
 
 
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Get an async database connection."""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+async def dispose_async_engine() -> None:
+    """Close the connections of the async engine, if it was created."""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
+
+
 def is_db_connected() -> bool:
     """Check if the database is connected."""
     try:
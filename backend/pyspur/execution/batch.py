@@ -0,0 +1,63 @@
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, Iterable, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# How many finished-but-not-yet-yielded results may pile up behind a slow item,
+# as a multiple of the window size
+BUFFER_FACTOR = 4
+
+
+async def iter_ordered(
+    items: Iterable[T],
+    func: Callable[[T], Awaitable[R]],
+    max_concurrency: int,
+) -> AsyncIterator[R]:
+    """Apply an async function to every item using a sliding window of concurrent calls.
+
+    Up to `max_concurrency` calls run at once and a new call starts as soon as any call
+    finishes, so one slow item doesn't hold up the items after it. Results are yielded
+    in input order; results that finish ahead of a slower earlier item are buffered.
+
+    If a call raises, the exception is raised at that item's position and all calls
+    still in flight are cancelled.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+
+    iterator = iter(items)
+    exhausted = False
+    pending: Deque[asyncio.Task[R]] = deque()
+    max_pending = max_concurrency * BUFFER_FACTOR
+    try:
+        while True:
+            running = sum(1 for task in pending if not task.done())
+            while not exhausted and running < max_concurrency and len(pending) < max_pending:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.append(asyncio.ensure_future(func(item)))
+                running += 1
+
+            if not pending:
+                return
+
+            head = pending[0]
+            if head.done():
+                pending.popleft()
+                yield head.result()
+                continue
+
+            await asyncio.wait(
+                [task for task in pending if not task.done()],
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+
+def _parse_node_type_limits(value: str) -> Dict[str, int]:
+    """Parse per-node-type limits from either JSON or a `Type=N,Type=N` string."""
+    value = value.strip()
+    if not value:
+        return {}
+    if value.startswith("{"):
+        return {str(k): int(v) for k, v in json.loads(value).items()}
+    limits: Dict[str, int] = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        node_type, _, limit = item.partition("=")
+        limits[node_type.strip()] = int(limit)
+    return limits
+
+
+# Maximum number of nodes executing at once across all runs sharing a limiter (0 = unlimited)
+MAX_CONCURRENT_NODES = int(os.getenv("MAX_CONCURRENT_NODES", "0"))
+# Per-node-type caps, e.g. "SingleLLMCallNode=8,AgentNode=2" or '{"SingleLLMCallNode": 8}'
+NODE_TYPE_CONCURRENCY_LIMITS = _parse_node_type_limits(
+    os.getenv("NODE_TYPE_CONCURRENCY_LIMITS", "")
+)
+
+
+class ConcurrencyLimiter:
+    """Caps how many nodes execute at the same time.
+
+    A limiter holds one global cap and optional caps per node type. A node must acquire
+    both its type's slot and a global slot before it runs. The same limiter can be shared
+    by any number of executors, so the caps apply across runs and not only within one.
+
+    Semaphores are created lazily per event loop, which keeps a process-wide limiter
+    usable from code that starts its own loop (tests, CLI, background workers).
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        node_type_limits: Optional[Dict[str, int]] = None,
+    ):
+        self.max_concurrency = max_concurrency if max_concurrency and max_concurrency > 0 else None
+        self.node_type_limits = {
+            node_type: limit for node_type, limit in (node_type_limits or {}).items() if limit > 0
+        }
+        self._loop_semaphores: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, Dict[Optional[str], asyncio.Semaphore]
+        ] = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_env(cls) -> "ConcurrencyLimiter":
+        """Create a limiter from the MAX_CONCURRENT_NODES / NODE_TYPE_CONCURRENCY_LIMITS env."""
+        return cls(MAX_CONCURRENT_NODES, NODE_TYPE_CONCURRENCY_LIMITS)
+
+    def _get_semaphores(self) -> Dict[Optional[str], asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        semaphores = self._loop_semaphores.get(loop)
+        if semaphores is None:
+            semaphores = {
+                node_type: asyncio.Semaphore(limit)
+                for node_type, limit in self.node_type_limits.items()
+            }
+            if self.max_concurrency is not None:
+                semaphores[None] = asyncio.Semaphore(self.max_concurrency)
+            self._loop_semaphores[loop] = semaphores
+        return semaphores
+
+    @asynccontextmanager
+    async def limit(self, node_type: str, hold_global_slot: bool = True) -> AsyncIterator[None]:
+        """Hold an execution slot for a node of the given type for the duration of the block.
+
+        Args:
+            node_type: The node type, used to look up the per-type cap
+            hold_global_slot: Whether the node also counts against the global cap
+
+        """
+        semaphores = self._get_semaphores()
+        # Type slot first, so nodes waiting on a saturated type don't hold global slots
+        keys: List[Optional[str]] = [node_type, None] if hold_global_slot else [node_type]
+        acquired: List[asyncio.Semaphore] = []
+        try:
+            for key in keys:
+                semaphore = semaphores.get(key)
+                if semaphore is not None:
+                    await semaphore.acquire()
+                    acquired.append(semaphore)
+            yield
+        finally:
+            for semaphore in reversed(acquired):
+                semaphore.release()
+
+
+_default_limiter: Optional[ConcurrencyLimiter] = None
+
+
+def get_default_limiter() -> ConcurrencyLimiter:
+    """Get the process-wide limiter shared by executors that aren't given one explicitly."""
+    global _default_limiter
+    if _default_limiter is None:
+        _default_limiter = ConcurrencyLimiter.from_env()
+    return _default_limiter
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from ..schemas.workflow_schemas import WorkflowDefinitionSchema, WorkflowNodeSchema
+
+# Maximum number of compiled plans kept in memory per process
+EXECUTION_PLAN_CACHE_SIZE = int(os.getenv("EXECUTION_PLAN_CACHE_SIZE", "256"))
+
+
+class ExecutionPlan:
+    """Precompiled graph analysis of a workflow definition.
+
+    Everything the executor needs to know about the shape of the graph is computed
+    once here and shared by every executor built from the same workflow version:
+
+    - node lookup by id
+    - reverse adjacency (node -> predecessors) and forward adjacency (node -> dependents)
+    - topological order
+    - the (router_id, target_id) -> source_handle map for router links
+    - the set of nodes reachable from every node, used to find nodes blocked by a pause
+
+    Plans are immutable once built; use `ExecutionPlan.for_workflow` to get a cached one.
+    """
+
+    _cache: "OrderedDict[str, ExecutionPlan]" = OrderedDict()
+    _cache_lock = threading.Lock()
+
+    def __init__(self, workflow: WorkflowDefinitionSchema):
+        # A copy, so later edits of the caller's definition don't change the shared plan
+        workflow = workflow.model_copy(deep=True)
+        self.workflow = workflow
+        self.node_dict: Dict[str, WorkflowNodeSchema] = {node.id: node for node in workflow.nodes}
+
+        dependencies: Dict[str, Set[str]] = {node.id: set() for node in workflow.nodes}
+        dependents: Dict[str, Set[str]] = {node.id: set() for node in workflow.nodes}
+        router_handles: Dict[Tuple[str, str], str] = {}
+        for link in workflow.links:
+            dependencies[link.target_id].add(link.source_id)
+            dependents[link.source_id].add(link.target_id)
+            source_node = self.node_dict[link.source_id]
+            if source_node.node_type == "RouterNode" and link.source_handle:
+                router_handles[(link.source_id, link.target_id)] = link.source_handle
+
+        self.dependencies: Dict[str, FrozenSet[str]] = {
+            node_id: frozenset(deps) for node_id, deps in dependencies.items()
+        }
+        self.dependents: Dict[str, FrozenSet[str]] = {
+            node_id: frozenset(deps) for node_id, deps in dependents.items()
+        }
+        self.router_handles = router_handles
+        self.topological_order: List[str] = self._topological_sort()
+        self.descendants: Dict[str, FrozenSet[str]] = self._compute_descendants()
+        self.input_node_id: Optional[str] = next(
+            (
+                node.id
+                for node in workflow.nodes
+                if node.node_type == "InputNode" and not node.parent_id
+            ),
+            None,
+        )
+        # Serialized once so nodes that need the definition in their context don't
+        # re-dump the whole workflow on every execution
+        self.workflow_definition = workflow.model_dump()
+
+    def _topological_sort(self) -> List[str]:
+        """Order nodes so that every node comes after all of its predecessors.
+
+        Nodes that are part of a cycle cannot be ordered and are appended at the end.
+        """
+        in_degree = {node_id: len(deps) for node_id, deps in self.dependencies.items()}
+        queue: deque[str] = deque(
+            node.id for node in self.workflow.nodes if in_degree[node.id] == 0
+        )
+        order: List[str] = []
+        while queue:
+            node_id = queue.popleft()
+            order.append(node_id)
+            for dependent in self.dependents[node_id]:
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    queue.append(dependent)
+
+        if len(order) < len(self.node_dict):
+            ordered = set(order)
+            order.extend(node.id for node in self.workflow.nodes if node.id not in ordered)
+        return order
+
+    def _compute_descendants(self) -> Dict[str, FrozenSet[str]]:
+        """Compute, for every node, all nodes that directly or indirectly depend on it."""
+        descendants: Dict[str, FrozenSet[str]] = {}
+        for node_id in self.node_dict:
+            visited: Set[str] = set()
+            queue: deque[str] = deque([node_id])
+            while queue:
+                current = queue.popleft()
+                for dependent in self.dependents[current]:
+                    if dependent not in visited:
+                        visited.add(dependent)
+                        queue.append(dependent)
+            visited.discard(node_id)
+            descendants[node_id] = frozenset(visited)
+        return descendants
+
+    def get_source_handle(self, source_id: str, target_id: str) -> Optional[str]:
+        """Return the router output handle used by the link from source_id to target_id."""
+        return self.router_handles.get((source_id, target_id))
+
+    @staticmethod
+    def compute_version_key(workflow: WorkflowDefinitionSchema) -> str:
+        """Compute a stable key identifying a workflow version from its content."""
+        definition_str = json.dumps(workflow.model_dump(mode="json"), sort_keys=True)
+        return hashlib.sha256(definition_str.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def for_workflow(
+        cls,
+        workflow: WorkflowDefinitionSchema,
+        process_subworkflows: bool = True,
+        version_key: Optional[str] = None,
+    ) -> "ExecutionPlan":
+        """Return the compiled plan for a workflow, building it on first use.
+
+        Args:
+            workflow: The workflow definition to compile
+            process_subworkflows: Whether to fold child nodes into their parent's subworkflow
+            version_key: Optional precomputed key for the workflow version, e.g. the
+                definition hash of a stored workflow version. Computed from the definition
+                content if not provided.
+
+        """
+        key = f"{version_key or cls.compute_version_key(workflow)}:{int(process_subworkflows)}"
+        with cls._cache_lock:
+            plan = cls._cache.get(key)
+            if plan is not None:
+                cls._cache.move_to_end(key)
+                return plan
+
+        if process_subworkflows:
+            plan = cls(cls._process_subworkflows(workflow))
+        else:
+            plan = cls(workflow)
+
+        with cls._cache_lock:
+            cls._cache[key] = plan
+            cls._cache.move_to_end(key)
+            while len(cls._cache) > EXECUTION_PLAN_CACHE_SIZE:
+                cls._cache.popitem(last=False)
+        return plan
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Drop all cached plans."""
+        with cls._cache_lock:
+            cls._cache.clear()
+
+    @staticmethod
+    def _process_subworkflows(workflow: WorkflowDefinitionSchema) -> WorkflowDefinitionSchema:
+        # Group nodes by parent_id
+        nodes_by_parent: Dict[Optional[str], List[WorkflowNodeSchema]] = {}
+        for node in workflow.nodes:
+            parent_id = node.parent_id
+            if parent_id not in nodes_by_parent:
+                nodes_by_parent[parent_id] = []
+            node_copy = node.model_copy(update={"parent_id": None})
+            nodes_by_parent[parent_id].append(node_copy)
+
+        # Get root level nodes (no parent)
+        root_nodes = nodes_by_parent.get(None, [])
+
+        # Process each parent node's children into subworkflows
+        for parent_id, child_nodes in nodes_by_parent.items():
+            if parent_id is None:
+                continue
+
+            # Find the parent node in root nodes
+            parent_node = next((node for node in root_nodes if node.id == parent_id), None)
+            if not parent_node:
+                continue
+
+            # Get links between child nodes
+            child_node_ids = {node.id for node in child_nodes}
+            subworkflow_links = [
+                link
+                for link in workflow.links
+                if link.source_id in child_node_ids and link.target_id in child_node_ids
+            ]
+
+            # Create subworkflow
+            subworkflow = WorkflowDefinitionSchema(nodes=child_nodes, links=subworkflow_links)
+
+            # Update parent node's config with subworkflow
+            parent_node.config = {
+                **parent_node.config,
+                "subworkflow": subworkflow.model_dump(),
+            }
+
+        # Return new workflow with only root nodes
+        child_node_ids = {node.id for node in workflow.nodes if node.parent_id}
+        return WorkflowDefinitionSchema(
+            nodes=root_nodes,
+            links=[
+                link
+                for link in workflow.links
+                if link.source_id not in child_node_ids and link.target_id not in child_node_ids
+            ],
+            test_inputs=workflow.test_inputs,
+            spur_type=workflow.spur_type,
+        )
@@ -0,0 +1,60 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models.run_model import RunModel
+from ..models.task_model import TaskModel, TaskStatus
+from .payload_store import PayloadStore, get_default_payload_store
+
+
+def compute_node_fingerprint(node_type: str, config: Dict[str, Any], inputs: Dict[str, Any]) -> str:
+    """Compute a content-addressed fingerprint of a node execution.
+
+    Two executions with the same fingerprint run the same node type with the same config
+    on the same input values, so the output of one can stand in for the other.
+
+    Args:
+        node_type: The node type name
+        config: The node's config as stored in the workflow definition
+        inputs: The node's serialized input values, keyed by predecessor title
+
+    """
+    payload = json.dumps(
+        {"node_type": node_type, "config": config, "inputs": inputs},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TaskOutputLookup:
+    """Find outputs of earlier completed tasks of a workflow by node fingerprint.
+
+    Lookups use a session of their own on the engine of `db`, so the executor can run
+    them in a worker thread.
+    """
+
+    def __init__(self, db: Session, workflow_id: str, payload_store: Optional[PayloadStore] = None):
+        self.db = db
+        self.workflow_id = workflow_id
+        self.payload_store = payload_store or get_default_payload_store()
+
+    def get(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Return the outputs of the most recent completed task with this fingerprint."""
+        with Session(self.db.get_bind()) as session:
+            outputs = session.scalar(
+                select(TaskModel.outputs)
+                .join(RunModel, TaskModel.run_id == RunModel.id)
+                .where(
+                    RunModel.workflow_id == self.workflow_id,
+                    TaskModel.fingerprint == fingerprint,
+                    TaskModel.status == TaskStatus.COMPLETED,
+                    TaskModel.outputs.isnot(None),
+                )
+                .order_by(TaskModel.end_time.desc().nullslast())
+                .limit(1)
+            )
+        return self.payload_store.load(outputs) if outputs is not None else None
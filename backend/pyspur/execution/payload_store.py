@@ -0,0 +1,142 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from ..models.task_model import TASK_STATUS_PRIORITY, TaskStatus
+from ..schemas.task_schemas import TaskResponseSchema
+from ..utils.path_utils import PROJECT_ROOT
+
+# Serialized task payloads larger than this many bytes are offloaded to compressed blobs
+# (0 = always store payloads inline)
+TASK_PAYLOAD_MAX_INLINE_BYTES = int(os.getenv("TASK_PAYLOAD_MAX_INLINE_BYTES", "65536"))
+# Directory holding offloaded task payloads
+TASK_PAYLOAD_DIR = Path(os.getenv("TASK_PAYLOAD_DIR", str(PROJECT_ROOT / "data" / "task_payloads")))
+
+# Keys marking a stored payload as a blob reference or as a reference to a task output
+BLOB_KEY = "$blob"
+OUTPUT_REF_KEY = "$output_of"
+
+
+def output_reference(node_id: str, field: Optional[str] = None) -> Dict[str, Any]:
+    """Create a reference to the output of a node's task in the same run.
+
+    Args:
+        node_id: The node whose task output is referenced
+        field: The field of the output that is referenced, if not the whole output
+
+    """
+    reference: Dict[str, Any] = {OUTPUT_REF_KEY: node_id}
+    if field is not None:
+        reference["field"] = field
+    return reference
+
+
+def _is_reference(value: Any, key: str) -> bool:
+    return isinstance(value, dict) and key in value
+
+
+class PayloadStore:
+    """Stores task payloads, offloading large ones to gzip-compressed blobs on disk.
+
+    Blobs are content-addressed, so identical payloads are written once. Tasks keep a
+    small `{"$blob": ...}` stub in place of the payload, which `load` turns back into
+    the payload.
+    """
+
+    def __init__(
+        self,
+        base_dir: Optional[Path] = None,
+        max_inline_bytes: int = TASK_PAYLOAD_MAX_INLINE_BYTES,
+    ):
+        self.base_dir = base_dir or TASK_PAYLOAD_DIR
+        self.max_inline_bytes = max_inline_bytes
+
+    def pack(self, value: Any) -> Any:
+        """Return the value to store for a payload, offloading it if it is too large."""
+        if value is None or self.max_inline_bytes <= 0:
+            return value
+        data = json.dumps(value, default=str).encode("utf-8")
+        if len(data) <= self.max_inline_bytes:
+            return value
+
+        digest = hashlib.sha256(data).hexdigest()
+        key = f"{digest[:2]}/{digest}.json.gz"
+        path = self.base_dir / key
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Every writer gets its own temporary file, so concurrent writers of the same
+            # blob in any process or thread can't interleave their bytes
+            with tempfile.NamedTemporaryFile(
+                dir=path.parent, prefix=f"{digest}.", suffix=".tmp", delete=False
+            ) as tmp_file:
+                tmp_file.write(gzip.compress(data))
+            os.replace(tmp_file.name, path)
+        return {BLOB_KEY: key, "size": len(data)}
+
+    def load(self, value: Any) -> Any:
+        """Return the payload for a stored value, reading it from its blob if offloaded."""
+        if not _is_reference(value, BLOB_KEY):
+            return value
+        path = (self.base_dir / value[BLOB_KEY]).resolve()
+        if not path.is_relative_to(self.base_dir.resolve()):
+            raise ValueError(f"Invalid payload blob key: {value[BLOB_KEY]}")
+        return json.loads(gzip.decompress(path.read_bytes()))
+
+    def resolve_inputs(self, inputs: Any, outputs_by_node: Dict[str, Any]) -> Any:
+        """Return task inputs with references replaced by the referenced task outputs.
+
+        Args:
+            inputs: The stored inputs of a task
+            outputs_by_node: Stored task outputs of the same run, by node id
+
+        """
+        inputs = self.load(inputs)
+        if not isinstance(inputs, dict):
+            return inputs
+        resolved: Dict[str, Any] = {}
+        for key, value in inputs.items():
+            if _is_reference(value, OUTPUT_REF_KEY):
+                value = self.load(outputs_by_node.get(value[OUTPUT_REF_KEY]))
+                field = inputs[key].get("field")
+                if field is not None and isinstance(value, dict):
+                    value = value.get(field)
+            resolved[key] = value
+        return resolved
+
+    def resolve_tasks(self, tasks: Iterable[TaskResponseSchema]) -> None:
+        """Load the offloaded payloads and input references of a run's task responses."""
+        tasks = list(tasks)
+        for task in tasks:
+            task.outputs = self.load(task.outputs)
+            task.subworkflow_output = self.load(task.subworkflow_output)
+        # References point to the output of the task that represents the node
+        outputs_by_node: Dict[str, Any] = {}
+        for task in sorted(tasks, key=_representative_first):
+            outputs_by_node.setdefault(task.node_id, task.outputs)
+        for task in tasks:
+            task.inputs = self.resolve_inputs(task.inputs, outputs_by_node)
+
+
+def _representative_first(task: TaskResponseSchema) -> Tuple[int, bool, float]:
+    """Sort key putting the task that represents a node before its other tasks."""
+    end_time = task.end_time if task.status == TaskStatus.COMPLETED else None
+    return (
+        TASK_STATUS_PRIORITY.get(task.status, len(TASK_STATUS_PRIORITY)),
+        end_time is None,
+        -end_time.timestamp() if end_time is not None else 0.0,
+    )
+
+
+_default_store: Optional[PayloadStore] = None
+
+
+def get_default_payload_store() -> PayloadStore:
+    """Get the process-wide payload store configured from the environment."""
+    global _default_store
+    if _default_store is None:
+        _default_store = PayloadStore()
+    return _default_store
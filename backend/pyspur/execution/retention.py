@@ -0,0 +1,405 @@
+import asyncio
+import gzip
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import IO, Any, Dict, List, Literal, Optional, Sequence
+
+from loguru import logger
+from pydantic import BaseModel, Field, TypeAdapter
+from sqlalchemy import ColumnElement, Select, and_, delete, exists, func, select, true, update
+from sqlalchemy.orm import Session, aliased
+
+from ..models.output_file_model import OutputFileModel
+from ..models.run_model import RunModel, RunStatus
+from ..models.task_model import TaskModel
+from ..models.user_session_model import MessageModel
+from ..schemas.run_schemas import RunSummaryResponseSchema
+from ..schemas.task_schemas import TaskResponseSchema
+from ..utils.path_utils import PROJECT_ROOT
+from .payload_store import PayloadStore, get_default_payload_store
+
+ArchiveFormat = Literal["jsonl", "parquet"]
+
+# Retention policies as a JSON list, e.g.
+# '[{"max_age_days": 90}, {"run_type": "batch", "compact_after_days": 7}]'
+RUN_RETENTION_POLICIES = os.getenv("RUN_RETENTION_POLICIES", "")
+# Number of runs archived and deleted per transaction
+RUN_RETENTION_BATCH_SIZE = int(os.getenv("RUN_RETENTION_BATCH_SIZE", "200"))
+# Directory the archives of deleted runs are written to
+RUN_RETENTION_ARCHIVE_DIR = Path(
+    os.getenv("RUN_RETENTION_ARCHIVE_DIR", str(PROJECT_ROOT / "data" / "run_archives"))
+)
+RUN_RETENTION_ARCHIVE_FORMAT: ArchiveFormat = (
+    "parquet" if os.getenv("RUN_RETENTION_ARCHIVE_FORMAT", "jsonl") == "parquet" else "jsonl"
+)
+# Hours between retention passes of the API server (0 = only run from the CLI)
+RUN_RETENTION_INTERVAL_HOURS = float(os.getenv("RUN_RETENTION_INTERVAL_HOURS", "0"))
+
+# Only runs in these statuses are ever archived, deleted or compacted
+FINISHED_RUN_STATUSES = (RunStatus.COMPLETED, RunStatus.FAILED, RunStatus.CANCELED)
+
+
+class RetentionPolicy(BaseModel):
+    """How long finished runs are kept.
+
+    A policy applies to all runs, or only to the runs of one workflow and/or run type.
+    A run is governed by the most specific policy that matches it; a workflow policy
+    takes precedence over a run type policy.
+    """
+
+    workflow_id: Optional[str] = None
+    run_type: Optional[str] = None
+    # Runs that started more than this many days ago are archived and deleted
+    max_age_days: Optional[float] = Field(default=None, gt=0)
+    # Subruns of runs that started more than this many days ago are archived, deleted
+    # and replaced by a summary on their parent run
+    compact_after_days: Optional[float] = Field(default=None, gt=0)
+    # Whether runs are written to an archive before they are deleted
+    archive: bool = True
+
+    @property
+    def specificity(self) -> int:
+        return 2 * (self.workflow_id is not None) + (self.run_type is not None)
+
+    def overlaps(self, other: "RetentionPolicy") -> bool:
+        """Check whether some run could match both policies."""
+        return all(
+            mine is None or theirs is None or mine == theirs
+            for mine, theirs in (
+                (self.workflow_id, other.workflow_id),
+                (self.run_type, other.run_type),
+            )
+        )
+
+    def run_filter(self) -> ColumnElement[bool]:
+        """Build the condition matching the runs this policy applies to."""
+        conditions: List[ColumnElement[bool]] = []
+        if self.workflow_id is not None:
+            conditions.append(RunModel.workflow_id == self.workflow_id)
+        if self.run_type is not None:
+            conditions.append(RunModel.run_type == self.run_type)
+        return and_(true(), *conditions)
+
+
+def load_retention_policies(value: str = RUN_RETENTION_POLICIES) -> List[RetentionPolicy]:
+    """Parse retention policies from their JSON configuration."""
+    if not value.strip():
+        return []
+    return TypeAdapter(List[RetentionPolicy]).validate_json(value)
+
+
+class RetentionResult(BaseModel):
+    """What a retention pass did, or would do in a dry run."""
+
+    deleted_runs: int = 0
+    compacted_runs: int = 0
+    archive_path: Optional[str] = None
+
+
+class _RunArchive:
+    """Writes the runs that are about to be deleted to a compressed archive file."""
+
+    def __init__(self, path: Path, archive_format: ArchiveFormat):
+        self.path = path
+        self.archive_format = archive_format
+        self._file: Optional[IO[bytes]] = None
+        self._parquet_writer: Any = None
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        if not records:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.archive_format == "parquet":
+            self._write_parquet(records)
+            return
+        if self._file is None:
+            self._file = gzip.open(self.path, "ab")
+        for record in records:
+            self._file.write(json.dumps(record, default=str).encode("utf-8") + b"\n")
+        # The runs are deleted right after, so the records must be on disk by then
+        self._file.flush()
+
+    def _write_parquet(self, records: List[Dict[str, Any]]) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet archives require the pyarrow package") from e
+
+        # Columns to filter archived runs by, plus the full record as JSON
+        table = pa.table(
+            {
+                "run_id": [record["id"] for record in records],
+                "parent_run_id": [record["parent_run_id"] for record in records],
+                "workflow_id": [record["workflow_id"] for record in records],
+                "run_type": [record["run_type"] for record in records],
+                "status": [record["status"] for record in records],
+                "start_time": [record["start_time"] for record in records],
+                "record": [json.dumps(record, default=str) for record in records],
+            }
+        )
+        if self._parquet_writer is None:
+            self._parquet_writer = pq.ParquetWriter(self.path, table.schema, compression="zstd")
+        self._parquet_writer.write_table(table)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+
+class RunRetention:
+    """Applies retention policies to the run history.
+
+    Expired runs are archived (runs, their tasks with full payloads, and their subruns)
+    and deleted together with their tasks and output files. Compaction replaces the
+    subruns of old runs, typically the per-row runs of a batch run, with a summary on
+    the parent run.
+
+    All work happens in batches of `batch_size` runs, each in its own short transaction,
+    so no table is locked for long and an interrupted pass can simply be run again.
+    Large subrun trees are removed bottom-up, a batch at a time.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        policies: Sequence[RetentionPolicy],
+        archive_dir: Optional[Path] = None,
+        archive_format: ArchiveFormat = RUN_RETENTION_ARCHIVE_FORMAT,
+        batch_size: int = RUN_RETENTION_BATCH_SIZE,
+        payload_store: Optional[PayloadStore] = None,
+        now: Optional[datetime] = None,
+    ):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.db = db
+        self.policies = list(policies)
+        self.archive_dir = archive_dir or RUN_RETENTION_ARCHIVE_DIR
+        self.archive_format: ArchiveFormat = archive_format
+        self.batch_size = batch_size
+        self.payload_store = payload_store or get_default_payload_store()
+        self.now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def apply(self, dry_run: bool = False) -> RetentionResult:
+        """Compact and delete the runs the policies no longer keep.
+
+        With `dry_run`, only count the runs that would be deleted and compacted.
+        """
+        result = RetentionResult()
+        suffix = "jsonl.gz" if self.archive_format == "jsonl" else "parquet"
+        archive_path = self.archive_dir / f"runs-{self.now:%Y%m%dT%H%M%S}.{suffix}"
+        archive = _RunArchive(archive_path, self.archive_format)
+        try:
+            for policy in self.policies:
+                writer = archive if policy.archive else None
+                if policy.compact_after_days is not None:
+                    result.compacted_runs += self._compact(policy, writer, dry_run)
+                if policy.max_age_days is not None:
+                    result.deleted_runs += self._expire(policy, writer, dry_run)
+        finally:
+            archive.close()
+        if archive_path.exists():
+            result.archive_path = str(archive_path)
+        return result
+
+    def _policy_runs(self, policy: RetentionPolicy, age_days: float) -> Select[tuple[str]]:
+        """Select finished top-level runs governed by the policy and older than the age."""
+        query = select(RunModel.id).where(
+            RunModel.parent_run_id.is_(None),
+            RunModel.status.in_(FINISHED_RUN_STATUSES),
+            RunModel.start_time < self.now - timedelta(days=age_days),
+            policy.run_filter(),
+        )
+        # Leave runs that a more specific policy governs to that policy
+        for other in self.policies:
+            if other.specificity > policy.specificity and other.overlaps(policy):
+                query = query.where(~other.run_filter())
+        return query.order_by(RunModel._intid)
+
+    def _expire(
+        self, policy: RetentionPolicy, archive: Optional[_RunArchive], dry_run: bool
+    ) -> int:
+        assert policy.max_age_days is not None
+        query = self._policy_runs(policy, policy.max_age_days)
+        if dry_run:
+            return self.db.scalar(select(func.count()).select_from(query.subquery())) or 0
+
+        deleted = 0
+        while True:
+            # Deleted runs drop out of the query, so every batch starts from the top
+            run_ids = list(self.db.scalars(query.limit(self.batch_size)))
+            if not run_ids:
+                return deleted
+            self._remove_runs(run_ids, archive)
+            deleted += len(run_ids)
+            logger.info(f"Deleted {deleted} runs under retention policy {policy}")
+
+    def _compact(
+        self, policy: RetentionPolicy, archive: Optional[_RunArchive], dry_run: bool
+    ) -> int:
+        assert policy.compact_after_days is not None
+        subrun = aliased(RunModel)
+        query = self._policy_runs(policy, policy.compact_after_days).where(
+            exists().where(subrun.parent_run_id == RunModel.id)
+        )
+        if dry_run:
+            return self.db.scalar(select(func.count()).select_from(query.subquery())) or 0
+
+        compacted = 0
+        while True:
+            parent_ids = list(self.db.scalars(query.limit(self.batch_size)))
+            if not parent_ids:
+                return compacted
+            for parent_id in parent_ids:
+                while True:
+                    subrun_ids = list(
+                        self.db.scalars(
+                            select(RunModel.id)
+                            .where(RunModel.parent_run_id == parent_id)
+                            .order_by(RunModel._intid)
+                            .limit(self.batch_size)
+                        )
+                    )
+                    if not subrun_ids:
+                        break
+                    self._remove_runs(subrun_ids, archive, summarize_into=parent_id)
+            compacted += len(parent_ids)
+            logger.info(f"Compacted {compacted} runs under retention policy {policy}")
+
+    def _remove_runs(
+        self,
+        run_ids: List[str],
+        archive: Optional[_RunArchive],
+        summarize_into: Optional[str] = None,
+    ) -> None:
+        """Archive and delete runs with their tasks, subruns and output files.
+
+        Args:
+            run_ids: The runs to delete, at most one batch
+            archive: Where to archive the runs, if they are archived
+            summarize_into: A parent run whose subrun summary absorbs the deleted runs
+
+        """
+        # Subruns go first, one batch and transaction at a time
+        while True:
+            subrun_ids = list(
+                self.db.scalars(
+                    select(RunModel.id)
+                    .where(RunModel.parent_run_id.in_(run_ids))
+                    .order_by(RunModel._intid)
+                    .limit(self.batch_size)
+                )
+            )
+            if not subrun_ids:
+                break
+            self._remove_runs(subrun_ids, archive)
+
+        runs = list(self.db.scalars(select(RunModel).where(RunModel.id.in_(run_ids))))
+        if archive is not None:
+            archive.write(self._archive_records(runs))
+        if summarize_into is not None:
+            self._add_to_subrun_summary(summarize_into, runs)
+
+        output_file_ids = [run.output_file_id for run in runs if run.output_file_id]
+        output_file_paths = list(
+            self.db.scalars(
+                select(OutputFileModel.file_path).where(OutputFileModel.id.in_(output_file_ids))
+            )
+        )
+        self.db.execute(
+            update(MessageModel).where(MessageModel.run_id.in_(run_ids)).values(run_id=None)
+        )
+        self.db.execute(delete(TaskModel).where(TaskModel.run_id.in_(run_ids)))
+        self.db.execute(delete(RunModel).where(RunModel.id.in_(run_ids)))
+        self.db.execute(delete(OutputFileModel).where(OutputFileModel.id.in_(output_file_ids)))
+        self.db.commit()
+
+        for file_path in output_file_paths:
+            try:
+                Path(file_path).unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"Could not delete output file {file_path}: {e}")
+
+    def _archive_records(self, runs: List[RunModel]) -> List[Dict[str, Any]]:
+        """Serialize runs with their tasks, loading offloaded task payloads."""
+        tasks_by_run: Dict[str, List[TaskResponseSchema]] = {run.id: [] for run in runs}
+        for task in self.db.scalars(
+            select(TaskModel).where(TaskModel.run_id.in_(list(tasks_by_run)))
+        ):
+            tasks_by_run[task.run_id].append(TaskResponseSchema.model_validate(task))
+
+        records: List[Dict[str, Any]] = []
+        for run in runs:
+            tasks = tasks_by_run[run.id]
+            self.payload_store.resolve_tasks(tasks)
+            record = RunSummaryResponseSchema.model_validate(run).model_dump(mode="json")
+            # Archive the status stored on the run, whatever the schema derives for display
+            record["status"] = run.status.value
+            record["tasks"] = [task.model_dump(mode="json") for task in tasks]
+            records.append(record)
+        return records
+
+    def _add_to_subrun_summary(self, parent_id: str, subruns: List[RunModel]) -> None:
+        """Fold deleted subruns into the summary kept on their parent run."""
+        parent = self.db.scalar(select(RunModel).where(RunModel.id == parent_id))
+        if parent is None:
+            return
+        summary: Dict[str, Any] = dict(parent.subrun_summary or {})
+        statuses: Dict[str, int] = dict(summary.get("statuses", {}))
+        for subrun in subruns:
+            statuses[subrun.status.value] = statuses.get(subrun.status.value, 0) + 1
+        start_times = [subrun.start_time for subrun in subruns if subrun.start_time]
+        end_times = [subrun.end_time for subrun in subruns if subrun.end_time]
+        if summary.get("first_start_time"):
+            start_times.append(datetime.fromisoformat(summary["first_start_time"]))
+        if summary.get("last_end_time"):
+            end_times.append(datetime.fromisoformat(summary["last_end_time"]))
+
+        summary.update(
+            runs=summary.get("runs", 0) + len(subruns),
+            statuses=statuses,
+            total_tokens=summary.get("total_tokens", 0)
+            + sum(subrun.total_tokens for subrun in subruns),
+            first_start_time=min(start_times).isoformat() if start_times else None,
+            last_end_time=max(end_times).isoformat() if end_times else None,
+        )
+        parent.subrun_summary = summary
+
+
+def apply_retention(
+    policies: Sequence[RetentionPolicy], dry_run: bool = False, **options: Any
+) -> RetentionResult:
+    """Apply retention policies in a session of their own.
+
+    Args:
+        policies: The retention policies to apply
+        dry_run: Only count the runs that would be deleted and compacted
+        **options: Further arguments for `RunRetention`
+
+    """
+    from ..database import SessionLocal
+
+    with SessionLocal() as db:
+        return RunRetention(db, policies, **options).apply(dry_run=dry_run)
+
+
+async def run_retention_periodically(
+    policies: Sequence[RetentionPolicy], interval_hours: float = RUN_RETENTION_INTERVAL_HOURS
+) -> None:
+    """Apply retention policies every `interval_hours` hours until cancelled."""
+    while True:
+        try:
+            result = await asyncio.to_thread(apply_retention, policies)
+            logger.info(
+                f"Run retention deleted {result.deleted_runs} runs"
+                f" and compacted {result.compacted_runs} runs"
+            )
+        except Exception as e:
+            logger.error(f"Run retention failed: {e}")
+        await asyncio.sleep(interval_hours * 3600)
@@ -0,0 +1,45 @@
+import threading
+from typing import TYPE_CHECKING, Dict
+
+if TYPE_CHECKING:
+    from .workflow_executor import WorkflowExecutor
+
+# Executors of the runs currently in progress in this process, by run id
+_active_runs: Dict[str, "WorkflowExecutor"] = {}
+_lock = threading.Lock()
+
+
+def register_run(run_id: str, executor: "WorkflowExecutor") -> bool:
+    """Register the executor of a run so that the run can be cancelled.
+
+    Executors of subworkflows share the run id of their parent run; only the first
+    executor registered for a run id is kept.
+
+    Returns:
+        Whether the executor was registered
+
+    """
+    with _lock:
+        if run_id in _active_runs:
+            return False
+        _active_runs[run_id] = executor
+        return True
+
+
+def unregister_run(run_id: str, executor: "WorkflowExecutor") -> None:
+    """Remove the executor of a run once the run is no longer in progress."""
+    with _lock:
+        if _active_runs.get(run_id) is executor:
+            del _active_runs[run_id]
+
+
+def cancel_run(run_id: str) -> bool:
+    """Cancel a run in progress in this process.
+
+    Returns:
+        Whether the run was in progress in this process and is being cancelled
+
+    """
+    with _lock:
+        executor = _active_runs.get(run_id)
+    return executor.cancel() if executor is not None else False
@@ -1,83 +1,134 @@
+import asyncio
+import os
+import threading
 from datetime import datetime
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, List, Optional, Set
 
 from pydantic import BaseModel
+from sqlalchemy import Engine, Select, case, func, insert, inspect, select, update
 from sqlalchemy.orm import Session
 
-from ..models.task_model import TaskModel, TaskStatus
+from ..models.run_model import TASK_COUNTER_COLUMNS, RunModel
+from ..models.task_model import TASK_STATUS_PRIORITY, TaskModel, TaskStatus
 from ..schemas.workflow_schemas import WorkflowDefinitionSchema
+from .payload_store import PayloadStore, get_default_payload_store
+from .token_usage import TokenUsage
+
+
+# Maximum number of seconds task changes are buffered before they are written
+# (0 = write every change immediately)
+TASK_RECORDER_FLUSH_INTERVAL = float(os.getenv("TASK_RECORDER_FLUSH_INTERVAL", "0.5"))
+
+
+def _effective_tasks_query(run_id: str) -> Select[tuple[TaskModel]]:
+    """Select the task that represents each node of a run."""
+    rank = (
+        func.row_number()
+        .over(
+            partition_by=TaskModel.node_id,
+            order_by=(
+                case(
+                    *(
+                        (TaskModel.status == status, priority)
+                        for status, priority in TASK_STATUS_PRIORITY.items()
+                    ),
+                    else_=len(TASK_STATUS_PRIORITY),
+                ),
+                case((TaskModel.status == TaskStatus.COMPLETED, TaskModel.end_time))
+                .desc()
+                .nullslast(),
+                TaskModel._intid,
+            ),
+        )
+        .label("rank")
+    )
+    ranked = (
+        select(TaskModel._intid.label("intid"), rank).where(TaskModel.run_id == run_id).subquery()
+    )
+    return (
+        select(TaskModel).join(ranked, TaskModel._intid == ranked.c.intid).where(ranked.c.rank == 1)
+    )
+
+
+# Task attributes written by the recorder; the ids are assigned by the database
+_TASK_COLUMNS = frozenset(TaskModel.__table__.columns.keys()) - {"_intid", "id"}
+
+
+def _task_values(task: TaskModel) -> Dict[str, Any]:
+    """Get the column values set on a task."""
+    return {key: value for key, value in inspect(task).dict.items() if key in _TASK_COLUMNS}
+
+
+class _Changes:
+    """Task changes and LLM tokens not yet written to the database."""
+
+    def __init__(self, tasks: Dict[str, Dict[str, Any]], new_tokens: int):
+        # Column values of the changed tasks, by node id
+        self.tasks = tasks
+        self.new_tokens = new_tokens
+
+    def merge(self, newer: Optional["_Changes"]) -> "_Changes":
+        """Combine these changes with later ones, whose task values take precedence."""
+        if newer is None:
+            return self
+        return _Changes({**self.tasks, **newer.tasks}, self.new_tokens + newer.new_tokens)
 
 
 class TaskRecorder:
-    def __init__(self, db: Session, run_id: str):
+    """Records the state of a run's tasks.
+
+    The recorder keeps the run's tasks in memory and writes their changes on a database
+    connection of its own. Changes made while an event loop is running are buffered and
+    written in one transaction at most `flush_interval` seconds later, in a worker thread
+    so the event loop isn't blocked by the commit. Call `flush()` or `aflush()` to write
+    them right away; they raise the error of any background write that failed, whose
+    changes are retried with the next write. Changes made outside an event loop are
+    written immediately.
+
+    Inputs, outputs and subworkflow outputs go through a `PayloadStore`, which offloads
+    large payloads to compressed blobs.
+
+    Every write also applies the status changes of its tasks to the run's task counters
+    and adds the LLM tokens counted by `token_usage` to the run's total.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        run_id: str,
+        flush_interval: Optional[float] = None,
+        payload_store: Optional[PayloadStore] = None,
+    ):
         self.db = db
         self.run_id = run_id
-        self.tasks: Dict[str, TaskModel] = {}
-
-        # Load existing tasks from the database
-        existing_tasks = db.query(TaskModel).filter(TaskModel.run_id == run_id).all()
-
-        # Group tasks by node_id
-        node_tasks: Dict[str, List[TaskModel]] = {}
-        for task in existing_tasks:
-            if task.node_id not in node_tasks:
-                node_tasks[task.node_id] = []
-            node_tasks[task.node_id].append(task)
-
-        # For each node_id, select the most relevant task
-        for node_id, tasks in node_tasks.items():
-            # If there's only one task, use it
-            if len(tasks) == 1:
-                self.tasks[node_id] = tasks[0]
-                continue
-
-            # If there are multiple tasks, prioritize:
-            # 1. COMPLETED tasks
-            # 2. PAUSED tasks
-            # 3. RUNNING tasks
-            # 4. PENDING tasks
-            # 5. FAILED tasks
-            # 6. CANCELED tasks
-
-            # First, try to find a COMPLETED task
-            completed_tasks = [t for t in tasks if t.status == TaskStatus.COMPLETED]
-            if completed_tasks:
-                # Use the most recently completed task
-                self.tasks[node_id] = max(completed_tasks, key=lambda t: t.end_time or datetime.min)
-                continue
-
-            # Next, try to find a PAUSED task
-            paused_tasks = [t for t in tasks if t.status == TaskStatus.PAUSED]
-            if paused_tasks:
-                self.tasks[node_id] = paused_tasks[0]
-                continue
-
-            # Next, try to find a RUNNING task
-            running_tasks = [t for t in tasks if t.status == TaskStatus.RUNNING]
-            if running_tasks:
-                self.tasks[node_id] = running_tasks[0]
-                continue
-
-            # Next, try to find a PENDING task
-            pending_tasks = [t for t in tasks if t.status == TaskStatus.PENDING]
-            if pending_tasks:
-                self.tasks[node_id] = pending_tasks[0]
-                continue
-
-            # Next, try to find a FAILED task
-            failed_tasks = [t for t in tasks if t.status == TaskStatus.FAILED]
-            if failed_tasks:
-                self.tasks[node_id] = failed_tasks[0]
-                continue
-
-            # Finally, use a CANCELED task
-            canceled_tasks = [t for t in tasks if t.status == TaskStatus.CANCELED]
-            if canceled_tasks:
-                self.tasks[node_id] = canceled_tasks[0]
-                continue
-
-            # If we get here, just use the first task
-            self.tasks[node_id] = tasks[0]
+        self.payload_store = payload_store or get_default_payload_store()
+        self.flush_interval = (
+            TASK_RECORDER_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        )
+        self._engine: Engine = db.get_bind()  # type: ignore[assignment]
+        self._dirty_nodes: Set[str] = set()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.token_usage = TokenUsage()
+        self._flushed_tokens = 0
+
+        # Changes waiting for the writer, and whether a thread is writing them
+        self._write_lock = threading.Condition()
+        self._queued: Optional[_Changes] = None
+        self._writing = False
+        self._write_error: Optional[Exception] = None
+        # Ids and last written values of the tasks in the database, only used by the writer
+        self._task_ids: Dict[str, int] = {}
+        self._written: Dict[str, Dict[str, Any]] = {}
+
+        # Load the task that represents each node of the run in a single query. The
+        # tasks are detached, so the caller's session neither writes nor expires them.
+        with Session(self._engine) as session:
+            self.tasks: Dict[str, TaskModel] = {
+                task.node_id: task for task in session.scalars(_effective_tasks_query(run_id))
+            }
+        for node_id, task in self.tasks.items():
+            self._task_ids[node_id] = task._intid
+            self._written[node_id] = _task_values(task)
 
     def create_task(
         self,
@@ -96,59 +147,28 @@ class TaskRecorder:
             ]:
                 # Just update the inputs if needed
                 if inputs and not existing_task.inputs:
-                    existing_task.inputs = inputs
-                    self.db.add(existing_task)
-                    self.db.commit()
+                    existing_task.inputs = self.payload_store.pack(inputs)
+                    self._save(existing_task)
                 return
 
             # For other statuses (PENDING, FAILED, CANCELED), update the existing task
-            existing_task.inputs = inputs
-            existing_task.status = TaskStatus.RUNNING
-            existing_task.start_time = datetime.now()
-            existing_task.end_time = None
-            existing_task.error = None
-            self.db.add(existing_task)
-            self.db.commit()
-            self.db.refresh(existing_task)
-            return
-
-        # If we don't have a task in memory, check the database for any existing tasks
-        existing_task = (
-            self.db.query(TaskModel)
-            .filter(TaskModel.run_id == self.run_id, TaskModel.node_id == node_id)
-            .order_by(TaskModel.end_time.desc().nullslast())
-            .first()
-        )
-
-        if existing_task:
-            # If there's an existing task in the database, use it
-            if existing_task.status in [TaskStatus.COMPLETED, TaskStatus.PAUSED]:
-                # Don't modify COMPLETED or PAUSED tasks
-                self.tasks[node_id] = existing_task
-                return
-
-            # Update the existing task for other statuses
-            existing_task.inputs = inputs
+            existing_task.inputs = self.payload_store.pack(inputs)
             existing_task.status = TaskStatus.RUNNING
             existing_task.start_time = datetime.now()
             existing_task.end_time = None
             existing_task.error = None
-            self.db.add(existing_task)
-            self.db.commit()
-            self.db.refresh(existing_task)
-            self.tasks[node_id] = existing_task
+            self._save(existing_task)
             return
 
-        # If no existing task was found, create a new one
+        # The recorder loaded every existing task of the run, so this node has none yet
         task = TaskModel(
             run_id=self.run_id,
             node_id=node_id,
-            inputs=inputs,
+            status=TaskStatus.PENDING,
+            inputs=self.payload_store.pack(inputs),
         )
-        self.db.add(task)
-        self.db.commit()
-        self.db.refresh(task)
         self.tasks[node_id] = task
+        self._save(task)
         return
 
     def update_task(
@@ -162,6 +182,8 @@ class TaskRecorder:
         subworkflow_output: Optional[Dict[str, BaseModel]] = None,
         end_time: Optional[datetime] = None,
         is_downstream_of_pause: bool = False,
+        fingerprint: Optional[str] = None,
+        start_time: Optional[datetime] = None,
     ):
         task = self.tasks.get(node_id)
         if not task:
@@ -175,24 +197,218 @@ class TaskRecorder:
 
         task.status = status
         if inputs:
-            task.inputs = inputs
+            task.inputs = self.payload_store.pack(inputs)
         if outputs:
-            task.outputs = outputs
+            task.outputs = self.payload_store.pack(outputs)
         if error:
             task.error = error
+        if start_time:
+            task.start_time = start_time
         if end_time:
             task.end_time = end_time
+        if fingerprint:
+            task.fingerprint = fingerprint
         if subworkflow:
             task.subworkflow = subworkflow.model_dump()
         if subworkflow_output:
-            task.subworkflow_output = {
-                k: (
-                    [x.model_dump() if isinstance(x, BaseModel) else x for x in v]
-                    if isinstance(v, list)
-                    else v.model_dump()
-                )
-                for k, v in subworkflow_output.items()
-            }
-        self.db.add(task)
-        self.db.commit()
+            task.subworkflow_output = self.payload_store.pack(
+                {
+                    k: (
+                        [x.model_dump() if isinstance(x, BaseModel) else x for x in v]
+                        if isinstance(v, list)
+                        else v.model_dump()
+                    )
+                    for k, v in subworkflow_output.items()
+                }
+            )
+        self._save(task)
         return
+
+    @property
+    def has_failed_tasks(self) -> bool:
+        """Whether any node of the run failed."""
+        return any(task.status == TaskStatus.FAILED for task in self.tasks.values())
+
+    def skip_tasks(
+        self,
+        node_ids: List[str],
+        end_time: Optional[datetime] = None,
+        error: Optional[str] = None,
+    ):
+        """Mark the tasks of several nodes as CANCELED in a single write."""
+        end_time = end_time or datetime.now()
+        for node_id in node_ids:
+            task = self.tasks.get(node_id)
+            if not task:
+                task = TaskModel(run_id=self.run_id, node_id=node_id, inputs={})
+                self.tasks[node_id] = task
+            task.status = TaskStatus.CANCELED
+            task.end_time = end_time
+            if error:
+                task.error = error
+            self._dirty_nodes.add(node_id)
+        self._mark_dirty()
+
+    def _save(self, task: TaskModel) -> None:
+        """Stage a task change, writing it now or with the next batched flush."""
+        self._dirty_nodes.add(task.node_id)
+        self._mark_dirty()
+
+    def _mark_dirty(self) -> None:
+        if not self._schedule_flush():
+            self.flush()
+
+    def _schedule_flush(self) -> bool:
+        """Make sure a flush is scheduled; return False if changes can't be buffered."""
+        if self.flush_interval <= 0:
+            return False
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.flush_interval, self._flush_in_background)
+        return True
+
+    def _cancel_scheduled_flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+    def _take_changes(self) -> bool:
+        """Queue the changes made since the last flush for the writer.
+
+        Returns:
+            Whether the caller has to start the writer
+
+        """
+        new_tokens = self.token_usage.total_tokens - self._flushed_tokens
+        changes = _Changes(
+            {node_id: _task_values(self.tasks[node_id]) for node_id in self._dirty_nodes},
+            new_tokens,
+        )
+        self._dirty_nodes.clear()
+        self._flushed_tokens += new_tokens
+        with self._write_lock:
+            if changes.tasks or changes.new_tokens:
+                self._queued = self._queued.merge(changes) if self._queued else changes
+            if self._writing or self._queued is None:
+                return False
+            self._writing = True
+            return True
+
+    def _flush_in_background(self) -> None:
+        self._flush_handle = None
+        if self._take_changes():
+            asyncio.get_running_loop().run_in_executor(None, self._write_queued)
+
+    def _write_queued(self) -> None:
+        """Write queued changes until there are none left."""
+        while True:
+            with self._write_lock:
+                changes, self._queued = self._queued, None
+                if changes is None:
+                    self._writing = False
+                    self._write_lock.notify_all()
+                    return
+            try:
+                self._write(changes)
+            except Exception as e:
+                # The transaction was rolled back; retry its changes with the next write
+                with self._write_lock:
+                    self._queued = changes.merge(self._queued)
+                    self._write_error = self._write_error or e
+                    self._writing = False
+                    self._write_lock.notify_all()
+                return
+
+    def _wait_for_writer(self) -> None:
+        with self._write_lock:
+            while self._writing:
+                self._write_lock.wait()
+
+    def _write(self, changes: _Changes) -> None:
+        """Write changes in one transaction and remember what was written."""
+        tasks = TaskModel.__table__
+        runs = RunModel.__table__
+        inserted: Dict[str, Any] = {}
+        # Change of the run's task counters, by status
+        counter_deltas: Dict[TaskStatus, int] = {}
+        with self._engine.begin() as connection:
+            for node_id, values in changes.tasks.items():
+                written = self._written.get(node_id, {})
+                old_status = written.get("status")
+                new_status = values.get("status", old_status or TaskStatus.PENDING)
+                if new_status != old_status:
+                    counter_deltas[new_status] = counter_deltas.get(new_status, 0) + 1
+                    if old_status is not None:
+                        counter_deltas[old_status] = counter_deltas.get(old_status, 0) - 1
+
+                task_id = self._task_ids.get(node_id)
+                if task_id is None:
+                    inserted[node_id] = connection.execute(
+                        insert(tasks).values(**values).returning(tasks.c._intid, tasks.c.id)
+                    ).one()
+                    continue
+                changed = {
+                    key: value
+                    for key, value in values.items()
+                    if key not in written or written[key] != value
+                }
+                if changed:
+                    connection.execute(
+                        update(tasks).where(tasks.c._intid == task_id).values(**changed)
+                    )
+            run_values: Dict[str, Any] = {
+                TASK_COUNTER_COLUMNS[status]: runs.c[TASK_COUNTER_COLUMNS[status]] + delta
+                for status, delta in counter_deltas.items()
+                if delta
+            }
+            if changes.new_tokens:
+                run_values["total_tokens"] = runs.c.total_tokens + changes.new_tokens
+            if run_values:
+                connection.execute(
+                    update(runs).where(runs.c.id == self.run_id).values(**run_values)
+                )
+        for node_id, (task_id, task_key) in inserted.items():
+            self._task_ids[node_id] = task_id
+            task = self.tasks[node_id]
+            task._intid, task.id = task_id, task_key
+        for node_id, values in changes.tasks.items():
+            self._written[node_id] = values
+
+    def _finish_flush(self) -> None:
+        """Raise the error of a failed write and expire what the caller's session read."""
+        with self._write_lock:
+            error, self._write_error = self._write_error, None
+        if error is not None:
+            raise error
+        for obj in list(self.db.identity_map.values()):
+            state = inspect(obj)
+            if isinstance(obj, RunModel) and state.dict.get("id") == self.run_id:
+                self.db.expire(obj, ["tasks", "total_tokens", *TASK_COUNTER_COLUMNS.values()])
+            elif (
+                isinstance(obj, TaskModel)
+                and state.dict.get("run_id") == self.run_id
+                and not state.modified
+            ):
+                self.db.expire(obj)
+
+    def flush(self) -> None:
+        """Write all buffered task changes in a single transaction, waiting for it."""
+        self._cancel_scheduled_flush()
+        if self._take_changes():
+            self._write_queued()
+        else:
+            self._wait_for_writer()
+        self._finish_flush()
+
+    async def aflush(self) -> None:
+        """Write all buffered task changes in a single transaction in a worker thread."""
+        self._cancel_scheduled_flush()
+        loop = asyncio.get_running_loop()
+        if self._take_changes():
+            await loop.run_in_executor(None, self._write_queued)
+        else:
+            await loop.run_in_executor(None, self._wait_for_writer)
+        self._finish_flush()
@@ -0,0 +1,37 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Tuple
+
+
+class TokenUsage:
+    """Number of LLM tokens used while the counter was being tracked."""
+
+    def __init__(self):
+        self.total_tokens = 0
+
+
+# Counters that LLM calls made in the current context report to, innermost last
+_active_usage: ContextVar[Tuple[TokenUsage, ...]] = ContextVar("active_token_usage", default=())
+
+
+@contextmanager
+def track_token_usage(usage: Optional[TokenUsage] = None) -> Iterator[TokenUsage]:
+    """Count the tokens of all LLM calls made in this context, including nested tasks.
+
+    Tracking nests: a call made inside several `track_token_usage` blocks is counted by
+    all of them, so the tokens of a subworkflow also count towards the run that called it.
+    """
+    usage = usage or TokenUsage()
+    reset_token = _active_usage.set(_active_usage.get() + (usage,))
+    try:
+        yield usage
+    finally:
+        _active_usage.reset(reset_token)
+
+
+def record_token_usage(total_tokens: Optional[int]) -> None:
+    """Add the tokens of an LLM call to every counter tracking the current context."""
+    if not total_tokens:
+        return
+    for usage in _active_usage.get():
+        usage.total_tokens += total_tokens
@@ -1,8 +1,22 @@
 import asyncio
 import traceback
-from collections import defaultdict, deque
+from collections import deque
 from datetime import datetime
-from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 from pydantic import ValidationError
 
@@ -13,12 +27,20 @@ from ..models.workflow_model import WorkflowModel
 from ..nodes.base import BaseNode, BaseNodeOutput
 from ..nodes.factory import NodeFactory
 from ..nodes.logic.human_intervention import PauseError
+from ..schemas.execution_event_schemas import ExecutionEventSchema, ExecutionEventType
 from ..schemas.workflow_schemas import (
     SpurType,
     WorkflowDefinitionSchema,
     WorkflowNodeSchema,
 )
+from .batch import iter_ordered
+from .concurrency import ConcurrencyLimiter, get_default_limiter
+from .execution_plan import ExecutionPlan
+from .fingerprint import compute_node_fingerprint
+from .payload_store import output_reference
+from .run_registry import register_run, unregister_run
 from .task_recorder import TaskRecorder
+from .token_usage import track_token_usage
 from .workflow_execution_context import WorkflowExecutionContext
 
 if TYPE_CHECKING:
@@ -33,22 +55,64 @@ class UnconnectedNodeError(Exception):
     pass
 
 
+class NodeTimeoutError(Exception):
+    pass
+
+
+class WorkflowTimeoutError(Exception):
+    pass
+
+
+class WorkflowCancelledError(Exception):
+    pass
+
+
 class WorkflowExecutor:
     """Handles the execution of a workflow."""
 
     def __init__(
         self,
-        workflow: Union[WorkflowModel, WorkflowDefinitionSchema],
+        workflow: Union[WorkflowModel, WorkflowDefinitionSchema, ExecutionPlan],
         initial_inputs: Optional[Dict[str, Dict[str, Any]]] = None,
         task_recorder: Optional["TaskRecorder"] = None,
         context: Optional[WorkflowExecutionContext] = None,
         resumed_node_ids: Optional[List[str]] = None,
+        version_key: Optional[str] = None,
+        concurrency_limiter: Optional[ConcurrencyLimiter] = None,
+        output_lookup: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+        timeout: Optional[float] = None,
     ):
+        """Create an executor for a workflow.
+
+        Args:
+            workflow: The workflow, or an already compiled plan of it
+            initial_inputs: Inputs by input node id
+            task_recorder: Records task state; created from the context if not given
+            context: The execution context of the run
+            resumed_node_ids: Nodes being resumed after a pause
+            version_key: Key identifying the workflow version, used to cache its plan
+            concurrency_limiter: Caps concurrent node executions; defaults to the
+                process-wide limiter
+            output_lookup: Returns the serialized outputs of an earlier execution with the
+                given node fingerprint, if any. When set, reusable nodes (see
+                `BaseNode.reusable`) whose type, config and inputs are unchanged reuse
+                those outputs instead of running again.
+            timeout: Seconds a run may take before it is stopped and its in-flight nodes
+                are cancelled. Nodes can also set their own `timeout` in their config.
+
+        """
         # Convert WorkflowModel to WorkflowDefinitionSchema if needed
-        if isinstance(workflow, WorkflowModel):
-            self.workflow = WorkflowDefinitionSchema.model_validate(workflow.definition)
+        if isinstance(workflow, ExecutionPlan):
+            self._plan = workflow
+        elif isinstance(workflow, WorkflowModel):
+            self._plan = ExecutionPlan.for_workflow(
+                WorkflowDefinitionSchema.model_validate(workflow.definition),
+                process_subworkflows=False,
+                version_key=version_key,
+            )
         else:
-            self.workflow = self._process_subworkflows(workflow)
+            self._plan = ExecutionPlan.for_workflow(workflow, version_key=version_key)
+        self.workflow = self._plan.workflow
         self._initial_inputs = initial_inputs or {}
         if task_recorder:
             self.task_recorder = task_recorder
@@ -58,15 +122,30 @@ class WorkflowExecutor:
         else:
             self.task_recorder = None
         self.context = context
-        self._node_dict: Dict[str, WorkflowNodeSchema] = {}
+        self._node_dict: Dict[str, WorkflowNodeSchema] = self._plan.node_dict
         self.node_instances: Dict[str, BaseNode] = {}
-        self._dependencies: Dict[str, Set[str]] = {}
+        self._dependencies: Dict[str, FrozenSet[str]] = self._plan.dependencies
         self._node_tasks: Dict[str, asyncio.Task[Optional[BaseNodeOutput]]] = {}
         self._outputs: Dict[str, Optional[BaseNodeOutput]] = {}
         self._failed_nodes: Set[str] = set()
         self._resumed_node_ids: Set[str] = set(resumed_node_ids or [])
-        self._build_node_dict()
-        self._build_dependencies()
+        # Nodes whose output is recorded on their task, so inputs can reference it
+        self._recorded_outputs: Set[str] = set()
+        self._limiter = concurrency_limiter or get_default_limiter()
+        self._output_lookup = output_lookup
+        self._timeout = timeout
+        # Set while a run is in progress, so that it can be cancelled
+        self._run_task: Optional[asyncio.Task[Any]] = None
+        self._run_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._deadline: Optional[float] = None
+        self._cancel_requested = False
+        # Only set while the executor is being consumed through `stream()`
+        self._event_queue: Optional[asyncio.Queue[Optional[ExecutionEventSchema]]] = None
+
+    @property
+    def plan(self) -> ExecutionPlan:
+        """Get the compiled execution plan shared by executors of this workflow."""
+        return self._plan
 
     @property
     def outputs(self) -> Dict[str, Optional[BaseNodeOutput]]:
@@ -78,98 +157,23 @@ class WorkflowExecutor:
         """Set the outputs of the workflow execution."""
         self._outputs = value
 
-    def _process_subworkflows(self, workflow: WorkflowDefinitionSchema) -> WorkflowDefinitionSchema:
-        # Group nodes by parent_id
-        nodes_by_parent: Dict[Optional[str], List[WorkflowNodeSchema]] = {}
-        for node in workflow.nodes:
-            parent_id = node.parent_id
-            if parent_id not in nodes_by_parent:
-                nodes_by_parent[parent_id] = []
-            node_copy = node.model_copy(update={"parent_id": None})
-            nodes_by_parent[parent_id].append(node_copy)
-
-        # Get root level nodes (no parent)
-        root_nodes = nodes_by_parent.get(None, [])
-
-        # Process each parent node's children into subworkflows
-        for parent_id, child_nodes in nodes_by_parent.items():
-            if parent_id is None:
-                continue
-
-            # Find the parent node in root nodes
-            parent_node = next((node for node in root_nodes if node.id == parent_id), None)
-            if not parent_node:
-                continue
-
-            # Get links between child nodes
-            child_node_ids = {node.id for node in child_nodes}
-            subworkflow_links = [
-                link
-                for link in workflow.links
-                if link.source_id in child_node_ids and link.target_id in child_node_ids
-            ]
-
-            # Create subworkflow
-            subworkflow = WorkflowDefinitionSchema(nodes=child_nodes, links=subworkflow_links)
-
-            # Update parent node's config with subworkflow
-            parent_node.config = {
-                **parent_node.config,
-                "subworkflow": subworkflow.model_dump(),
-            }
-
-        # Return new workflow with only root nodes
-        return WorkflowDefinitionSchema(
-            nodes=root_nodes,
-            links=[
-                link
-                for link in workflow.links
-                if not any(
-                    node.parent_id
-                    for node in workflow.nodes
-                    if node.id in (link.source_id, link.target_id)
-                )
-            ],
-            test_inputs=workflow.test_inputs,
-            spur_type=workflow.spur_type,
-        )
+    @property
+    def concurrency_limiter(self) -> ConcurrencyLimiter:
+        """Get the limiter capping how many nodes of this executor run at once."""
+        return self._limiter
 
-    def _build_node_dict(self):
-        self._node_dict = {node.id: node for node in self.workflow.nodes}
-
-    def _build_dependencies(self):
-        dependencies: Dict[str, Set[str]] = {node.id: set() for node in self.workflow.nodes}
-        for link in self.workflow.links:
-            dependencies[link.target_id].add(link.source_id)
-        self._dependencies = dependencies
-
-    def _get_source_handles(self) -> Dict[Tuple[str, str], str]:
-        """Build a mapping of (source_id, target_id) -> source_handle for router nodes only."""
-        source_handles: Dict[Tuple[str, str], str] = {}
-        for link in self.workflow.links:
-            source_node = self._node_dict[link.source_id]
-            if source_node.node_type == "RouterNode":
-                if not link.source_handle:
-                    raise ValueError(
-                        f"Missing source_handle in link from router node "
-                        f"{link.source_id} to {link.target_id}"
-                    )
-                source_handles[(link.source_id, link.target_id)] = link.source_handle
-        return source_handles
-
-    def _get_async_task_for_node_execution(
-        self, node_id: str
-    ) -> asyncio.Task[Optional[BaseNodeOutput]]:
-        if node_id in self._node_tasks:
-            return self._node_tasks[node_id]
-        # Start task for the node
-        task = asyncio.create_task(self._execute_node(node_id))
-        self._node_tasks[node_id] = task
-
-        # Record task
-        if self.task_recorder:
-            self.task_recorder.create_task(node_id, {})
-        return task
+    def _emit_event(
+        self,
+        event_type: ExecutionEventType,
+        node: Optional[WorkflowNodeSchema] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Publish an execution event to the stream consumer, if there is one."""
+        if self._event_queue is None:
+            return
+        if node is not None:
+            kwargs.update(node_id=node.id, node_type=node.node_type, node_title=node.title)
+        self._event_queue.put_nowait(ExecutionEventSchema(type=event_type, **kwargs))
 
     def get_blocked_nodes(self, paused_node_id: str) -> Set[str]:
         """Find all nodes that are blocked by the paused node.
@@ -183,29 +187,11 @@ class WorkflowExecutor:
             Set of node IDs that are blocked by the paused node
 
         """
-        blocked_nodes: Set[str] = set()
-
-        # Build a dependency graph (which nodes depend on which)
-        dependents: Dict[str, Set[str]] = defaultdict(set)
-        for node_id, deps in self._dependencies.items():
-            for dep_id in deps:
-                dependents[dep_id].add(node_id)
-
-        # Start with the paused node and find all nodes that depend on it
-        queue: deque[str] = deque([paused_node_id])
-        visited: Set[str] = set()
-
-        while queue:
-            current_node_id: str = queue.popleft()
-            visited.add(current_node_id)
+        return set(self._plan.descendants.get(paused_node_id, frozenset()))
 
-            # Get all nodes that depend on this node
-            for dependent in dependents.get(current_node_id, set()):
-                if dependent not in visited:
-                    blocked_nodes.add(dependent)
-                    queue.append(dependent)
-
-        return blocked_nodes
+    def _is_blocked_by(self, node_id: str, paused_node_id: str) -> bool:
+        """Check if a node directly or indirectly depends on the paused node."""
+        return node_id in self._plan.descendants.get(paused_node_id, frozenset())
 
     def is_downstream_of_pause(self, node_id: str) -> bool:
         """Check if a node is downstream of any paused node.
@@ -236,8 +222,7 @@ class WorkflowExecutor:
         # Check if this node is downstream of any paused node
         for paused_node_id in paused_nodes:
             if _workflow_definition := getattr(self.context, "workflow_definition", None):
-                blocked_nodes = self.get_blocked_nodes(paused_node_id)
-                if node_id in blocked_nodes:
+                if self._is_blocked_by(node_id, paused_node_id):
                     return True
 
         return False
@@ -369,6 +354,8 @@ class WorkflowExecutor:
         self._update_run_status_to_paused()
 
         # Commit all changes at once
+        if self.task_recorder:
+            self.task_recorder.flush()
         if (
             self.context is not None
             and hasattr(self.context, "db_session")
@@ -436,14 +423,17 @@ class WorkflowExecutor:
                 if task.status == TaskStatus.COMPLETED and task.outputs:
                     # If the node already has a completed task, use its outputs
                     try:
-                        # Create a node instance to get the output model
-                        node_instance = NodeFactory.create_node(
+                        # Use the node's prototype to get the output model
+                        prototype = NodeFactory.get_prototype(
                             node_name=node.title,
                             node_type_name=node.node_type,
                             config=node.config,
                         )
-                        node_output = node_instance.output_model.model_validate(task.outputs)
+                        node_output = prototype.output_model.model_validate(
+                            self.task_recorder.payload_store.load(task.outputs)
+                        )
                         self._outputs[node_id] = node_output
+                        self._recorded_outputs.add(node_id)
                         return node_output
                     except Exception as e:
                         print(f"Error validating outputs for completed task {node_id}: {e}")
@@ -457,24 +447,13 @@ class WorkflowExecutor:
                     )
                 return None
 
-            # Check if any predecessor nodes failed
-            dependency_ids = self._dependencies.get(node_id, set())
-
-            # Wait for dependencies
-            predecessor_outputs: List[Optional[BaseNodeOutput]] = []
-            if dependency_ids:
-                try:
-                    predecessor_outputs = await asyncio.gather(
-                        *(
-                            self._get_async_task_for_node_execution(dep_id)
-                            for dep_id in dependency_ids
-                        ),
-                    )
-                except Exception as e:
-                    raise UpstreamFailureError(
-                        f"Node {node_id} skipped due to upstream failure"
-                    ) from e
+            # The scheduler only dispatches a node once all its predecessors are done
+            dependency_ids = self._dependencies.get(node_id, frozenset())
+            predecessor_outputs: List[Optional[BaseNodeOutput]] = [
+                self._outputs.get(dep_id) for dep_id in dependency_ids
+            ]
 
+            # Check if any predecessor nodes failed
             if any(dep_id in self._failed_nodes for dep_id in dependency_ids):
                 print(f"Node {node_id} skipped due to upstream failure")
                 self._failed_nodes.add(node_id)
@@ -529,17 +508,21 @@ class WorkflowExecutor:
                         )
                 return None
 
-            # Get source handles mapping
-            source_handles = self._get_source_handles()
-
-            # Build node input, handling router outputs specially
+            # Build node input, handling router outputs specially. Inputs taken from
+            # recorded task outputs are recorded as references to those outputs.
+            input_references: Dict[str, Dict[str, Any]] = {}
             for dep_id, output in zip(dependency_ids, predecessor_outputs, strict=False):
                 if output is None:
                     continue
                 predecessor_node = self._node_dict[dep_id]
+                if dep_id in self._recorded_outputs:
+                    route = None
+                    if predecessor_node.node_type == "RouterNode":
+                        route = self._plan.get_source_handle(dep_id, node_id)
+                    input_references[predecessor_node.title] = output_reference(dep_id, route)
                 if predecessor_node.node_type == "RouterNode":
                     # For router nodes, we must have a source handle
-                    source_handle = source_handles.get((dep_id, node_id))
+                    source_handle = self._plan.get_source_handle(dep_id, node_id)
                     if not source_handle:
                         raise ValueError(
                             f"Missing source_handle in link from router node {dep_id} to {node_id}"
@@ -548,6 +531,9 @@ class WorkflowExecutor:
                     route_output = getattr(output, source_handle, None)
                     if route_output is not None:
                         node_input[predecessor_node.title] = route_output
+                    elif node.node_type == "CoalesceNode":
+                        # An unselected route is just a missing input for a coalesce
+                        continue
                     else:
                         self._outputs[node_id] = None
                         if self.task_recorder:
@@ -589,16 +575,32 @@ class WorkflowExecutor:
             # Remove None values from input
             node_input = {k: v for k, v in node_input.items() if v is not None}
 
+            # Serialize inputs once for both the task record and the node fingerprint
+            serialized_inputs: Dict[str, Any] = {}
+            fingerprint: Optional[str] = None
+            if self.task_recorder or self._output_lookup:
+                serialized_inputs = {
+                    dep_id: output.model_dump() if hasattr(output, "model_dump") else output
+                    for dep_id, output in node_input.items()
+                }
+                # Only reusable nodes are looked up later, so only they need a fingerprint
+                if NodeFactory.get_node_class(node.node_type).reusable:
+                    fingerprint = compute_node_fingerprint(
+                        node.node_type, node.config, serialized_inputs
+                    )
+
             # update task recorder with inputs
             if self.task_recorder:
                 self.task_recorder.update_task(
                     node_id=node_id,
                     status=TaskStatus.RUNNING,
                     inputs={
-                        dep_id: output.model_dump() if hasattr(output, "model_dump") else output
-                        for dep_id, output in node_input.items()
-                        if node.node_type != "InputNode"
-                    },
+                        title: input_references.get(title, value)
+                        for title, value in serialized_inputs.items()
+                    }
+                    if node.node_type != "InputNode"
+                    else {},
+                    fingerprint=fingerprint,
                 )
 
             # If node_input is empty, return None
@@ -606,7 +608,28 @@ class WorkflowExecutor:
                 self._outputs[node_id] = None
                 raise UnconnectedNodeError(f"Node {node_id} has no input")
 
-            node_instance = NodeFactory.create_node(
+            # Reuse the output of an earlier execution with the same fingerprint
+            if fingerprint is not None and self._output_lookup is not None:
+                reused_output = await self._get_reusable_output(node, fingerprint)
+                if reused_output is not None:
+                    if self.task_recorder:
+                        self.task_recorder.update_task(
+                            node_id=node_id,
+                            status=TaskStatus.COMPLETED,
+                            outputs=self._serialize_output(reused_output),
+                            end_time=datetime.now(),
+                        )
+                        self._recorded_outputs.add(node_id)
+                    self._outputs[node_id] = reused_output
+                    if self._event_queue is not None:
+                        self._emit_event(
+                            ExecutionEventType.NODE_COMPLETED,
+                            node,
+                            output=self._serialize_output(reused_output),
+                        )
+                    return reused_output
+
+            node_instance = NodeFactory.create_node_from_prototype(
                 node_name=node.title,
                 node_type_name=node.node_type,
                 config=node.config,
@@ -621,11 +644,30 @@ class WorkflowExecutor:
                     parent_run_id=self.context.parent_run_id if self.context else None,
                     run_type=self.context.run_type if self.context else "interactive",
                     db_session=self.context.db_session if self.context else None,
-                    workflow_definition=self.workflow.model_dump(),
+                    workflow_definition=self._plan.workflow_definition,
+                )
+
+            if self._event_queue is not None:
+                self._emit_event(ExecutionEventType.NODE_STARTED, node)
+                node_instance._token_delta_handler = lambda delta, field: self._emit_event(
+                    ExecutionEventType.TOKEN_DELTA, node, delta=delta, field=field
                 )
 
             try:
-                output = await node_instance(node_input)
+                async with self._limiter.limit(
+                    node.node_type, hold_global_slot=not node_instance.runs_subworkflow
+                ):
+                    node_timeout = node.config.get("timeout")
+                    timeout_scope = asyncio.timeout(node_timeout)
+                    try:
+                        async with timeout_scope:
+                            output = await node_instance(node_input)
+                    except TimeoutError as e:
+                        if not timeout_scope.expired():
+                            raise
+                        raise NodeTimeoutError(
+                            f"Node {node.title} timed out after {node_timeout} seconds"
+                        ) from e
 
                 # Update task recorder
                 if self.task_recorder:
@@ -637,15 +679,40 @@ class WorkflowExecutor:
                         subworkflow=node_instance.subworkflow,
                         subworkflow_output=node_instance.subworkflow_output,
                     )
+                    self._recorded_outputs.add(node_id)
 
                 # Store output
                 self._outputs[node_id] = output
+                if self._event_queue is not None:
+                    self._emit_event(
+                        ExecutionEventType.NODE_COMPLETED,
+                        node,
+                        output=self._serialize_output(output),
+                    )
                 return output
             except PauseError as e:
                 self._handle_pause_exception(node_id, e)
+                if self._event_queue is not None:
+                    self._emit_event(
+                        ExecutionEventType.NODE_PAUSED,
+                        node,
+                        output=self._serialize_output(e.output) if e.output else None,
+                        message=e.message,
+                    )
                 # Return None to prevent downstream execution
                 return None
 
+        except asyncio.CancelledError:
+            self._failed_nodes.add(node_id)
+            self._outputs[node_id] = None
+            if self.task_recorder:
+                self.task_recorder.update_task(
+                    node_id=node_id,
+                    status=TaskStatus.CANCELED,
+                    end_time=datetime.now(),
+                    error=self._cancellation_reason(),
+                )
+            raise
         except UpstreamFailureError as e:
             self._failed_nodes.add(node_id)
             self._outputs[node_id] = None
@@ -663,8 +730,7 @@ class WorkflowExecutor:
 
                     # Check if this node is blocked by any paused node
                     for paused_node_id in paused_node_ids:
-                        blocked_nodes = self.get_blocked_nodes(paused_node_id)
-                        if node_id in blocked_nodes:
+                        if self._is_blocked_by(node_id, paused_node_id):
                             has_paused_upstream = True
                             break
 
@@ -695,6 +761,7 @@ class WorkflowExecutor:
             )
             print(error_msg)
             self._failed_nodes.add(node_id)
+            self._emit_event(ExecutionEventType.NODE_FAILED, node, error=str(e))
             if self.task_recorder:
                 current_time = datetime.now()
                 self.task_recorder.update_task(
@@ -705,6 +772,32 @@ class WorkflowExecutor:
                 )
             raise e
 
+    async def _get_reusable_output(
+        self, node: WorkflowNodeSchema, fingerprint: str
+    ) -> Optional[BaseNodeOutput]:
+        """Get the output of an earlier execution of the node with the same fingerprint."""
+        if self._output_lookup is None:
+            return None
+        # Lookups query the database and may load offloaded payloads
+        outputs = await asyncio.to_thread(self._output_lookup, fingerprint)
+        if outputs is None:
+            return None
+        try:
+            prototype = NodeFactory.get_prototype(
+                node_name=node.title,
+                node_type_name=node.node_type,
+                config=node.config,
+            )
+            output_model = prototype.output_model
+            if not set(outputs).issubset(output_model.model_fields):
+                # The output model is only complete once the node has run
+                return None
+            return output_model.model_validate(outputs)
+        except (AttributeError, ValidationError) as e:
+            # Nodes that build their output model while running can't be reused
+            print(f"[WARNING]: Could not reuse output for node {node.id}: {e}")
+            return None
+
     def _serialize_output(self, output: Optional[BaseNodeOutput]) -> Optional[Dict[str, Any]]:
         """Serialize node outputs, handling datetime objects."""
         if output is None:
@@ -726,6 +819,156 @@ class WorkflowExecutor:
 
         return {str(key): _serialize_value(value) for key, value in data.items()}
 
+    def _collect_required_nodes(self, nodes_to_run: Set[str]) -> Set[str]:
+        """Find the nodes to run plus every ancestor they need that has no output yet."""
+        required: Set[str] = set()
+        stack = list(nodes_to_run)
+        while stack:
+            node_id = stack.pop()
+            if node_id in required:
+                continue
+            required.add(node_id)
+            for dep_id in self._dependencies.get(node_id, frozenset()):
+                if dep_id not in required and dep_id not in self._outputs:
+                    stack.append(dep_id)
+        return required
+
+    def _prune_unselected_routes(
+        self,
+        node_id: str,
+        remaining_deps: Dict[str, Set[str]],
+        dead_inputs: Dict[str, Set[str]],
+    ) -> List[str]:
+        """Find the nodes that can no longer run because a router did not select their route.
+
+        A node is dead once any of its inputs is dead, except for a CoalesceNode, which is
+        dead only once all of its inputs are. Dead nodes are removed from `remaining_deps`
+        so they are never scheduled.
+
+        Args:
+            node_id: The node that just finished
+            remaining_deps: Unresolved dependencies of every node not yet scheduled
+            dead_inputs: Dead inputs seen so far per node, shared across calls within a run
+
+        Returns:
+            The newly dead nodes, in the order they were found
+
+        """
+        node = self._node_dict[node_id]
+        output = self._outputs.get(node_id)
+        if node.node_type != "RouterNode" or output is None:
+            return []
+
+        stack: List[Tuple[str, str]] = []
+        for dependent_id in self._plan.dependents[node_id]:
+            # Links without a handle are left for _execute_node to report
+            source_handle = self._plan.get_source_handle(node_id, dependent_id)
+            if source_handle and getattr(output, source_handle, None) is None:
+                stack.append((node_id, dependent_id))
+        pruned: List[str] = []
+        while stack:
+            source_id, target_id = stack.pop()
+            if target_id not in remaining_deps:
+                continue
+            dead = dead_inputs.setdefault(target_id, set())
+            dead.add(source_id)
+            if self._node_dict[target_id].node_type == "CoalesceNode" and not dead.issuperset(
+                self._dependencies[target_id]
+            ):
+                continue
+            del remaining_deps[target_id]
+            pruned.append(target_id)
+            stack.extend(
+                (target_id, dependent_id) for dependent_id in self._plan.dependents[target_id]
+            )
+        return pruned
+
+    def _skip_nodes(self, node_ids: List[str], error: Optional[str] = None) -> None:
+        """Mark nodes as skipped without executing them."""
+        for node_id in node_ids:
+            self._outputs[node_id] = None
+        if self.task_recorder:
+            self.task_recorder.skip_tasks(node_ids, error=error)
+        for node_id in node_ids:
+            self._emit_event(ExecutionEventType.NODE_SKIPPED, self._node_dict[node_id])
+
+    async def _schedule_nodes(
+        self, nodes_to_run: Set[str]
+    ) -> Dict[str, asyncio.Task[Optional[BaseNodeOutput]]]:
+        """Execute nodes with a ready queue, launching a node only once its inputs are complete.
+
+        Returns the finished task of every executed node, in dispatch order. Exceptions are
+        left on the tasks for the caller to inspect.
+        """
+        required = self._collect_required_nodes(nodes_to_run)
+        order = [node_id for node_id in self._plan.topological_order if node_id in required]
+
+        # Record all tasks up front so the run shows its pending nodes
+        if self.task_recorder:
+            for node_id in order:
+                self.task_recorder.create_task(node_id, {})
+
+        remaining_deps: Dict[str, Set[str]] = {
+            node_id: {dep_id for dep_id in self._dependencies[node_id] if dep_id in required}
+            for node_id in order
+        }
+        ready: Deque[str] = deque(node_id for node_id in order if not remaining_deps[node_id])
+        running: Dict[asyncio.Task[Optional[BaseNodeOutput]], str] = {}
+        finished: Dict[str, asyncio.Task[Optional[BaseNodeOutput]]] = {}
+        skipped: Set[str] = set()
+        dead_inputs: Dict[str, Set[str]] = {}
+
+        while ready or running:
+            while ready:
+                node_id = ready.popleft()
+                remaining_deps.pop(node_id, None)
+                task = asyncio.create_task(self._execute_node(node_id))
+                self._node_tasks[node_id] = task
+                running[task] = node_id
+                finished[node_id] = task
+
+            try:
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+            except asyncio.CancelledError:
+                # Stop the nodes in flight and never start the rest
+                for task in running:
+                    task.cancel()
+                await asyncio.gather(*running, return_exceptions=True)
+                if remaining_deps:
+                    self._skip_nodes(list(remaining_deps), error=self._cancellation_reason())
+                raise
+            for task in done:
+                node_id = running.pop(task)
+                resolved = [node_id]
+                pruned = self._prune_unselected_routes(node_id, remaining_deps, dead_inputs)
+                if pruned:
+                    self._skip_nodes(pruned)
+                    skipped.update(pruned)
+                    resolved.extend(pruned)
+                for resolved_id in resolved:
+                    for dependent_id in self._plan.dependents[resolved_id]:
+                        deps = remaining_deps.get(dependent_id)
+                        if deps is None or resolved_id not in deps:
+                            continue
+                        deps.discard(resolved_id)
+                        if not deps:
+                            ready.append(dependent_id)
+
+        # Nodes caught in a cycle never become ready
+        for node_id in order:
+            if node_id not in finished and node_id not in skipped:
+                print(f"Node {node_id} is part of a cycle and cannot be scheduled")
+                self._failed_nodes.add(node_id)
+                self._outputs[node_id] = None
+                if self.task_recorder:
+                    self.task_recorder.update_task(
+                        node_id=node_id,
+                        status=TaskStatus.FAILED,
+                        end_time=datetime.now(),
+                        error="Node is part of a cycle",
+                    )
+        return finished
+
     async def _execute_workflow(  # noqa: C901
         self,
         input: Dict[str, Any] = {},
@@ -737,7 +980,7 @@ class WorkflowExecutor:
             for node_id, output in precomputed_outputs.items():
                 try:
                     if isinstance(output, dict):
-                        self._outputs[node_id] = NodeFactory.create_node(
+                        self._outputs[node_id] = NodeFactory.get_prototype(
                             node_name=self._node_dict[node_id].title,
                             node_type_name=self._node_dict[node_id].node_type,
                             config=self._node_dict[node_id].config,
@@ -765,16 +1008,12 @@ class WorkflowExecutor:
                     )
 
         # Store input in initial inputs to be used by InputNode
-        input_node = next(
-            (
-                node
-                for node in self.workflow.nodes
-                if node.node_type == "InputNode" and not node.parent_id
-            ),
-        )
+        if self._plan.input_node_id is None:
+            raise ValueError("Workflow has no input node")
+        input_node = self._node_dict[self._plan.input_node_id]
         self._initial_inputs[input_node.id] = input
         # also update outputs for input node
-        input_node_obj = NodeFactory.create_node(
+        input_node_obj = NodeFactory.create_node_from_prototype(
             node_name=input_node.title,
             node_type_name=input_node.node_type,
             config=input_node.config,
@@ -794,17 +1033,13 @@ class WorkflowExecutor:
         for node_id in nodes_to_run:
             self._outputs.pop(node_id, None)
 
-        # Start tasks for all nodes
-        for node_id in nodes_to_run:
-            self._get_async_task_for_node_execution(node_id)
-
-        # Wait for all tasks to complete, but don't propagate exceptions
-        results = await asyncio.gather(*self._node_tasks.values(), return_exceptions=True)
+        run_tasks = await self._schedule_nodes(nodes_to_run)
+        results: List[Optional[BaseException]] = [task.exception() for task in run_tasks.values()]
 
         # Process results to handle any exceptions
         paused_node_id: Optional[str] = None
         paused_exception: Optional[PauseError] = None
-        for node_id, result in zip(self._node_tasks.keys(), results, strict=False):
+        for node_id, result in zip(run_tasks.keys(), results, strict=False):
             if isinstance(result, PauseError):
                 # Handle pause state - don't mark as failed
                 paused_node_id = result.node_id
@@ -816,17 +1051,7 @@ class WorkflowExecutor:
                 print(f"Node {node_id} failed with error: {str(result)}")
                 if paused_node_id and self.task_recorder:
                     # Check if this node is downstream of the paused node
-                    is_downstream = False
-                    current_node = node_id
-                    while current_node in self._dependencies:
-                        deps = self._dependencies[current_node]
-                        if paused_node_id in deps:
-                            is_downstream = True
-                            break
-                        # Check next level of dependencies
-                        if not deps:
-                            break
-                        current_node = next(iter(deps))
+                    is_downstream = self._is_blocked_by(node_id, paused_node_id)
 
                     if is_downstream:
                         # Update task status without marking as failed
@@ -868,6 +1093,74 @@ class WorkflowExecutor:
         # return the non-None outputs
         return {node_id: output for node_id, output in self._outputs.items() if output is not None}
 
+    async def _execute_workflow_until_deadline(
+        self,
+        input: Dict[str, Any],
+        node_ids: List[str],
+        precomputed_outputs: Dict[str, Dict[str, Any] | List[Dict[str, Any]]],
+    ) -> Dict[str, BaseNodeOutput]:
+        """Execute the workflow within the run timeout, allowing `cancel()` to stop it."""
+        current_task = asyncio.current_task()
+        assert current_task is not None
+        loop = asyncio.get_running_loop()
+        self._run_task = current_task
+        self._run_loop = loop
+        self._cancel_requested = False
+        self._deadline = loop.time() + self._timeout if self._timeout is not None else None
+
+        run_id = self.task_recorder.run_id if self.task_recorder else None
+        registered = run_id is not None and register_run(run_id, self)
+        deadline_scope = asyncio.timeout_at(self._deadline)
+        # LLM calls made by the nodes of this run count towards the run's token total
+        token_usage = self.task_recorder.token_usage if self.task_recorder else None
+        try:
+            with track_token_usage(token_usage):
+                async with deadline_scope:
+                    return await self._execute_workflow(input, node_ids, precomputed_outputs)
+        except TimeoutError as e:
+            if not deadline_scope.expired():
+                raise
+            raise WorkflowTimeoutError(
+                f"Workflow run exceeded its timeout of {self._timeout} seconds"
+            ) from e
+        except asyncio.CancelledError:
+            if not self._cancel_requested:
+                raise
+            current_task.uncancel()
+            raise WorkflowCancelledError("Workflow run was canceled") from None
+        finally:
+            if registered and run_id is not None:
+                unregister_run(run_id, self)
+            self._run_task = None
+            self._run_loop = None
+            # Raises the error of any task write of the run that failed
+            if self.task_recorder:
+                await self.task_recorder.aflush()
+
+    def cancel(self) -> bool:
+        """Cancel the run in progress, stopping all of its in-flight nodes.
+
+        Safe to call from any thread. The run raises `WorkflowCancelledError`, and nodes
+        that were running or not yet started are recorded as CANCELED.
+
+        Returns:
+            Whether a run was in progress
+
+        """
+        run_task, run_loop = self._run_task, self._run_loop
+        if run_task is None or run_loop is None or run_task.done():
+            return False
+        self._cancel_requested = True
+        run_loop.call_soon_threadsafe(run_task.cancel)
+        return True
+
+    def _cancellation_reason(self) -> str:
+        """Describe why nodes of the current run are being cancelled."""
+        if self._deadline is not None and self._run_loop is not None:
+            if self._run_loop.time() >= self._deadline:
+                return f"Workflow run exceeded its timeout of {self._timeout} seconds"
+        return "Workflow run was canceled"
+
     async def run(
         self,
         input: Dict[str, Any] = {},
@@ -889,7 +1182,7 @@ class WorkflowExecutor:
                 input["message_history"] = message_history
 
         # Run the workflow
-        outputs = await self._execute_workflow(input, node_ids, precomputed_outputs)
+        outputs = await self._execute_workflow_until_deadline(input, node_ids, precomputed_outputs)
 
         # For chatbot workflows, store the new messages
         if self.workflow.spur_type == SpurType.CHATBOT:
@@ -931,20 +1224,97 @@ class WorkflowExecutor:
         """
         return await self.run(input, node_ids, precomputed_outputs)
 
+    async def stream(
+        self,
+        input: Dict[str, Any] = {},
+        node_ids: List[str] = [],
+        precomputed_outputs: Dict[str, Dict[str, Any] | List[Dict[str, Any]]] = {},
+    ) -> AsyncIterator[ExecutionEventSchema]:
+        """Execute the workflow and yield events as they happen.
+
+        Yields an event whenever a node starts, completes, fails or pauses, and token
+        deltas for nodes that stream their output. The last event is always one of
+        RUN_COMPLETED (with all outputs), RUN_PAUSED or RUN_FAILED; errors are reported
+        through that event instead of being raised.
+
+        Takes the same arguments as `run`. An executor streams one run at a time; use
+        separate executors for concurrent streams.
+        """
+        if self._event_queue is not None:
+            raise RuntimeError("The executor is already streaming a run")
+        queue: asyncio.Queue[Optional[ExecutionEventSchema]] = asyncio.Queue()
+        self._event_queue = queue
+
+        async def _run() -> None:
+            try:
+                outputs = await self.run(input, node_ids, precomputed_outputs)
+                self._emit_event(
+                    ExecutionEventType.RUN_COMPLETED,
+                    output={
+                        node_id: self._serialize_output(output)
+                        for node_id, output in outputs.items()
+                    },
+                )
+            except PauseError as e:
+                self._emit_event(
+                    ExecutionEventType.RUN_PAUSED,
+                    self._node_dict.get(e.node_id),
+                    message=e.message,
+                )
+            except Exception as e:
+                self._emit_event(ExecutionEventType.RUN_FAILED, error=str(e))
+            finally:
+                queue.put_nowait(None)
+
+        run_task = asyncio.create_task(_run())
+        try:
+            while (event := await queue.get()) is not None:
+                yield event
+        finally:
+            # Stop the run if the consumer goes away before it finishes
+            if not run_task.done():
+                run_task.cancel()
+                try:
+                    await run_task
+                except asyncio.CancelledError:
+                    pass
+            self._event_queue = None
+
+    def _fork(self) -> "WorkflowExecutor":
+        """Create an executor with fresh run state sharing this executor's plan and limiter.
+
+        The fork doesn't record tasks: its run state is separate from the run tracked by
+        this executor's task recorder.
+        """
+        executor = WorkflowExecutor(
+            self._plan,
+            initial_inputs=dict(self._initial_inputs),
+            concurrency_limiter=self._limiter,
+            output_lookup=self._output_lookup,
+            timeout=self._timeout,
+        )
+        executor.context = self.context
+        return executor
+
+    async def iter_batch(
+        self, input_iterator: Iterable[Dict[str, Any]], batch_size: int = 100
+    ) -> AsyncIterator[Dict[str, BaseNodeOutput]]:
+        """Run the workflow on every input and yield the outputs in input order.
+
+        Each input runs with its own isolated run state on top of the shared compiled
+        plan, node prototypes and concurrency limiter. Up to `batch_size` inputs run at
+        once, and the next input starts as soon as any of them finishes.
+        """
+        async for outputs in iter_ordered(
+            input_iterator, lambda input: self._fork().run(input), batch_size
+        ):
+            yield outputs
+
     async def run_batch(
-        self, input_iterator: Iterator[Dict[str, Any]], batch_size: int = 100
+        self, input_iterator: Iterable[Dict[str, Any]], batch_size: int = 100
     ) -> List[Dict[str, BaseNodeOutput]]:
-        """Run the workflow on a batch of inputs."""
-        results: List[Dict[str, BaseNodeOutput]] = []
-        batch_tasks: List[asyncio.Task[Dict[str, BaseNodeOutput]]] = []
-        for input in input_iterator:
-            batch_tasks.append(asyncio.create_task(self.run(input)))
-            if len(batch_tasks) == batch_size:
-                results.extend(await asyncio.gather(*batch_tasks))
-                batch_tasks = []
-        if batch_tasks:
-            results.extend(await asyncio.gather(*batch_tasks))
-        return results
+        """Run the workflow on a batch of inputs, returning outputs in input order."""
+        return [outputs async for outputs in self.iter_batch(input_iterator, batch_size)]
 
     def add_resumed_node_id(self, node_id: str) -> None:
         """Add a node ID to the set of resumed node IDs."""
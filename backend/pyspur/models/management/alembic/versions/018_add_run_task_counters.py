@@ -0,0 +1,48 @@
+"""add_run_task_counters.
+
+Revision ID: 018
+Revises: 017
+Create Date: 2025-04-04 14:22:08.913057
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "018"
+down_revision: Union[str, None] = "017"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TASK_COUNTER_COLUMNS = {
+    "PENDING": "pending_tasks",
+    "RUNNING": "running_tasks",
+    "COMPLETED": "completed_tasks",
+    "FAILED": "failed_tasks",
+    "CANCELED": "canceled_tasks",
+    "PAUSED": "paused_tasks",
+}
+
+
+def upgrade() -> None:
+    for column in [*TASK_COUNTER_COLUMNS.values(), "total_tokens"]:
+        op.add_column(
+            "runs",
+            sa.Column(column, sa.Integer(), nullable=False, server_default="0"),
+        )
+
+    # Count the tasks of existing runs
+    counts = ", ".join(
+        f"{column} = (SELECT count(*) FROM tasks "
+        f"WHERE tasks.run_id = runs.id AND tasks.status = '{status}')"
+        for status, column in TASK_COUNTER_COLUMNS.items()
+    )
+    op.execute(f"UPDATE runs SET {counts}")
+
+
+def downgrade() -> None:
+    for column in [*TASK_COUNTER_COLUMNS.values(), "total_tokens"]:
+        op.drop_column("runs", column)
@@ -0,0 +1,32 @@
+"""persist_failed_run_status.
+
+Revision ID: 021
+Revises: 020
+Create Date: 2025-04-09 11:02:37.420815
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "021"
+down_revision: Union[str, None] = "020"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Runs that finished with failed tasks used to be reported as FAILED without
+    # storing it; store it now that the status is only read from the runs table
+    op.execute(
+        "UPDATE runs SET status = 'FAILED' "
+        "WHERE status = 'COMPLETED' AND failed_tasks > 0 "
+        "AND pending_tasks = 0 AND running_tasks = 0"
+    )
+
+
+def downgrade() -> None:
+    # The runs that were marked as failed can't be told apart from other failed runs
+    pass
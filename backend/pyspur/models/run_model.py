@@ -8,14 +8,19 @@ from sqlalchemy import (
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
     String,
+    func,
+    inspect,
+    select,
+    update,
 )
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, Session, mapped_column, relationship
 
 from .base_model import BaseModel
 from .output_file_model import OutputFileModel
-from .task_model import TaskModel
+from .task_model import TaskModel, TaskStatus
 from .workflow_model import WorkflowModel
 
 
@@ -30,6 +35,14 @@ class RunStatus(PyEnum):
 
 class RunModel(BaseModel):
     __tablename__ = "runs"
+    __table_args__ = (
+        # Serve the run listings, which page through runs newest first
+        Index("ix_runs_workflow_start_time", "workflow_id", "start_time", "_intid"),
+        Index("ix_runs_run_type_start_time", "run_type", "start_time", "_intid"),
+        # The default listing only shows top-level runs (parent_run_id IS NULL)
+        Index("ix_runs_parent_start_time", "parent_run_id", "start_time", "_intid"),
+        Index("ix_runs_parent_status", "parent_run_id", "status"),
+    )
 
     _intid: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement="auto")
     id: Mapped[str] = mapped_column(String, Computed("'R' || _intid"), nullable=False, unique=True)
@@ -58,6 +71,18 @@ class RunModel(BaseModel):
     output_file_id: Mapped[Optional[str]] = mapped_column(
         String, ForeignKey("output_files.id"), nullable=True
     )
+    # Number of the run's tasks in each status, kept up to date by the task recorder (and
+    # `recount_task_counters`) so that listing runs doesn't have to load their tasks
+    pending_tasks: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    running_tasks: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    completed_tasks: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    failed_tasks: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    canceled_tasks: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    paused_tasks: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # LLM tokens used by the run, including its subworkflows
+    total_tokens: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Counts of the subruns removed by retention compaction, see `RunRetention`
+    subrun_summary: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
     tasks: Mapped[List["TaskModel"]] = relationship("TaskModel", cascade="all, delete-orphan")
     parent_run: Mapped[Optional["RunModel"]] = relationship(
         "RunModel",
@@ -89,3 +114,43 @@ class RunModel(BaseModel):
                 * len([subrun for subrun in self.subruns if subrun.status == RunStatus.COMPLETED])
                 / (1.0 * len(self.subruns))
             )
+
+
+# Run column holding the number of tasks in each status
+TASK_COUNTER_COLUMNS = {
+    TaskStatus.PENDING: "pending_tasks",
+    TaskStatus.RUNNING: "running_tasks",
+    TaskStatus.COMPLETED: "completed_tasks",
+    TaskStatus.FAILED: "failed_tasks",
+    TaskStatus.CANCELED: "canceled_tasks",
+    TaskStatus.PAUSED: "paused_tasks",
+}
+
+
+def task_counter_values() -> Dict[str, Any]:
+    """Build the column values that recount the tasks of each run by status."""
+    runs = RunModel.__table__
+    tasks = TaskModel.__table__
+    return {
+        column: select(func.count())
+        .where(tasks.c.run_id == runs.c.id, tasks.c.status == status)
+        .scalar_subquery()
+        for status, column in TASK_COUNTER_COLUMNS.items()
+    }
+
+
+def recount_task_counters(session: Session, run_id: str) -> None:
+    """Recount a run's tasks by status after they were changed outside the task recorder.
+
+    Writes the session's pending changes first, so the counts include them; they are
+    committed together with those changes.
+    """
+    session.flush()
+    session.execute(
+        update(RunModel.__table__)
+        .where(RunModel.__table__.c.id == run_id)
+        .values(**task_counter_values())
+    )
+    for obj in session.identity_map.values():
+        if isinstance(obj, RunModel) and inspect(obj).dict.get("id") == run_id:
+            session.expire(obj, list(TASK_COUNTER_COLUMNS.values()))
@@ -8,6 +8,7 @@ from sqlalchemy import (
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
     String,
 )
@@ -25,8 +26,25 @@ class TaskStatus(PyEnum):
     PAUSED = "PAUSED"
 
 
+# When a node has several tasks in a run, the task with the first status in this order
+# represents it. Among COMPLETED tasks the most recently finished one is used, otherwise
+# the oldest task.
+TASK_STATUS_PRIORITY = {
+    TaskStatus.COMPLETED: 0,
+    TaskStatus.PAUSED: 1,
+    TaskStatus.RUNNING: 2,
+    TaskStatus.PENDING: 3,
+    TaskStatus.FAILED: 4,
+    TaskStatus.CANCELED: 5,
+}
+
+
 class TaskModel(BaseModel):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Serves the recorder's "latest effective task per node" lookup for a run
+        Index("ix_tasks_run_node_status_end_time", "run_id", "node_id", "status", "end_time"),
+    )
 
     _intid: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement="auto")
     id: Mapped[str] = mapped_column(String, Computed("'T' || _intid"), nullable=False, unique=True)
@@ -47,6 +65,8 @@ class TaskModel(BaseModel):
     end_time: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     subworkflow: Mapped[Optional[Any]] = mapped_column(JSON, nullable=True)
     subworkflow_output: Mapped[Optional[Any]] = mapped_column(JSON, nullable=True)
+    # Hash of node type, config and inputs, used to reuse outputs across runs
+    fingerprint: Mapped[Optional[str]] = mapped_column(String, nullable=True, index=True)
 
     # Relationships
     parent_task = relationship("TaskModel", remote_side=[id], back_populates="subtasks")
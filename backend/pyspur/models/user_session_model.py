@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import JSON, Computed, DateTime, ForeignKey, Integer, String
+from sqlalchemy import JSON, Computed, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base_model import BaseModel
@@ -37,6 +37,10 @@ class UserModel(BaseModel):
 
 class SessionModel(BaseModel):
     __tablename__ = "sessions"
+    __table_args__ = (
+        # Serves the session listing, which pages through a user's sessions newest first
+        Index("ix_sessions_user_created_at", "user_id", "created_at", "_intid"),
+    )
 
     _intid: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement="auto")
     id: Mapped[str] = mapped_column(String, Computed("'SN' || _intid"), nullable=False, unique=True)
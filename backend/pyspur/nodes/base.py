@@ -1,14 +1,21 @@
+import copy
 import json
+import os
 from abc import ABC, abstractmethod
+from functools import lru_cache
 from hashlib import md5
-from typing import Any, Dict, List, Optional, Type, cast
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, cast
 
 from pydantic import BaseModel, Field, create_model
+from typing_extensions import Self
 
 from ..execution.workflow_execution_context import WorkflowExecutionContext
 from ..schemas.workflow_schemas import WorkflowDefinitionSchema
 from ..utils import pydantic_utils
 
+# Maximum number of dynamically built input model classes kept per process
+INPUT_MODEL_CACHE_SIZE = int(os.getenv("INPUT_MODEL_CACHE_SIZE", "1024"))
+
 
 class VisualTag(BaseModel):
     """Pydantic model for visual tag properties."""
@@ -39,6 +46,12 @@ class BaseNodeConfig(BaseModel):
         default=False,
         description="Whether the node has a fixed output schema defined in config",
     )
+    timeout: Optional[float] = Field(
+        default=None,
+        gt=0,
+        title="Timeout",
+        description="Maximum number of seconds the node may run before it fails",
+    )
     model_config = {
         "extra": "allow",
     }
@@ -63,6 +76,46 @@ class BaseNodeInput(BaseModel):
     pass
 
 
+@lru_cache(maxsize=INPUT_MODEL_CACHE_SIZE)
+def _get_composite_input_model(
+    model_name: str,
+    module: str,
+    node_name: str,
+    fields: Tuple[Tuple[str, Type[BaseModel]], ...],
+) -> Type[BaseNodeInput]:
+    """Build (once) an input model with one field per predecessor output class."""
+    return create_model(
+        model_name,
+        **{key: (model_class, ...) for key, model_class in fields},  # type: ignore
+        __base__=BaseNodeInput,
+        __config__=None,
+        __doc__=f"Input model for {node_name} node",
+        __module__=module,
+        __validators__=None,
+        __cls_kwargs__=None,
+    )
+
+
+@lru_cache(maxsize=INPUT_MODEL_CACHE_SIZE)
+def _get_primitive_input_model(
+    model_name: str,
+    module: str,
+    node_name: str,
+    fields: Tuple[Tuple[str, type], ...],
+) -> Type[BaseNodeInput]:
+    """Build (once) an input model for a dictionary of primitive values."""
+    return pydantic_utils.create_model(
+        model_name,
+        **{field_name: (field_type, ...) for field_name, field_type in fields},  # type: ignore
+        __base__=BaseNodeInput,
+        __config__=None,
+        __doc__=f"Input model for {node_name} node",
+        __module__=module,
+        __validators__=None,
+        __cls_kwargs__=None,
+    )
+
+
 class BaseNode(ABC):
     """Base class for all nodes.
 
@@ -85,6 +138,14 @@ class BaseNode(ABC):
     visual_tag: VisualTag
     subworkflow: Optional[WorkflowDefinitionSchema]
     subworkflow_output: Optional[Dict[str, Any]]
+    # Nodes that execute a nested workflow don't hold a global execution slot while
+    # running, otherwise their inner nodes could wait forever for a free slot
+    runs_subworkflow: bool = False
+    # Whether a run may reuse the output of an earlier execution with the same type, config
+    # and inputs instead of executing the node. Only set it for nodes without side effects.
+    reusable: bool = False
+    # Set by the executor when the run is streamed, see `emit_token_delta`
+    _token_delta_handler: Optional[Callable[[str, Optional[str]], None]] = None
 
     def __init__(
         self,
@@ -158,18 +219,14 @@ class BaseNode(ABC):
 
         Returns:
             A new Pydantic model with fields named after the keys of the dictionary.
+            Models are cached, so the same field layout always returns the same class.
 
         """
-        # Create the new model class
-        return create_model(
+        return _get_composite_input_model(
             model_name,
-            **{key: (instance.__class__, ...) for key, instance in instances.items()},
-            __base__=BaseNodeInput,
-            __config__=None,
-            __doc__=f"Input model for {self.name} node",
-            __module__=self.__module__,
-            __validators__=None,
-            __cls_kwargs__=None,
+            self.__module__,
+            self.name,
+            tuple((key, instance.__class__) for key, instance in instances.items()),
         )
 
     async def __call__(
@@ -202,21 +259,17 @@ class BaseNode(ABC):
                     model_name=self.input_model.__name__,
                     instances=composite_inputs,  # preserve original keys
                 )
-                data: Dict[str, Any] = {}
-                for key, value in composite_inputs.items():
-                    data[key] = value.model_dump()
-                input = self.input_model.model_validate(data)
+                # Every field is typed as the class of the instance it receives, and the
+                # instances were validated by the nodes that produced them, so they are
+                # passed by reference instead of being dumped and revalidated
+                input = self.input_model.model_construct(**composite_inputs)
             else:
                 # Input is a dictionary of primitive types
-                self.input_model = pydantic_utils.create_model(
+                self.input_model = _get_primitive_input_model(
                     f"{self.name}Input",
-                    **{field_name: (type(value), value) for field_name, value in input.items()},
-                    __base__=BaseNodeInput,
-                    __config__=None,
-                    __doc__=f"Input model for {self.name} node",
-                    __module__=self.__module__,
-                    __validators__=None,
-                    __cls_kwargs__=None,
+                    self.__module__,
+                    self.name,
+                    tuple((field_name, type(value)) for field_name, value in input.items()),
                 )
                 input = self.input_model.model_validate(input)
 
@@ -224,7 +277,11 @@ class BaseNode(ABC):
         result = await self.run(input)
 
         try:
-            output_validated = self.output_model.model_validate(result.model_dump())
+            if type(result) is self.output_model:
+                # Already an instance of the output model, validated on construction
+                output_validated = result
+            else:
+                output_validated = self.output_model.model_validate(result.model_dump())
         except AttributeError:
             output_validated = self.output_model.model_validate(result)
         except Exception as e:
@@ -277,9 +334,13 @@ class BaseNode(ABC):
         # Clean up the docstring by removing extra whitespace and newlines
         description = " ".join(line.strip() for line in description.split("\n")).strip()
 
+        # The timeout is enforced by the executor and is not a parameter of the function
+        properties = {
+            k: v for k, v in config_schema.get("properties", {}).items() if k != "timeout"
+        }
+
         # if has_fixed_output is true then no need to include it in the function schema
         # and also remove output_json_schema from the parameters
-        properties = config_schema.get("properties", {})
         if properties.get("has_fixed_output", {}).get("default", False):
             properties = {
                 k: v
@@ -332,6 +393,35 @@ class BaseNode(ABC):
         node_instance._input = input_model
         return await node_instance.run(input_model)
 
+    def clone(self) -> Self:
+        """Create a fresh copy of the node for a single execution.
+
+        The copy shares the config and the models built by `setup()` with the original,
+        so no Pydantic classes are rebuilt. Mutable containers are copied one level deep
+        so that state a node accumulates while running doesn't leak back.
+        """
+        node = copy.copy(self)
+        for attr, value in vars(self).items():
+            if isinstance(value, (dict, list, set)):
+                setattr(node, attr, copy.copy(value))  # type: ignore
+        node.context = None
+        return node
+
+    @property
+    def streams_tokens(self) -> bool:
+        """Whether the node is executed by a streaming executor, see `emit_token_delta`."""
+        return self._token_delta_handler is not None
+
+    def emit_token_delta(self, delta: str, field: Optional[str] = None) -> None:
+        """Report a fragment of generated text while the node is still running.
+
+        Nodes that stream model output call this for every chunk, with the output field
+        the text belongs to if it is known. It is a no-op unless the node is executed by
+        a streaming executor.
+        """
+        if self._token_delta_handler is not None:
+            self._token_delta_handler(delta, field)
+
     def update_config(self, config: BaseNodeConfig) -> None:
         """Update the node's configuration."""
         self._config = config
@@ -339,11 +429,15 @@ class BaseNode(ABC):
     @property
     def input(self) -> Any:
         """Return the node's input."""
+        if type(self._input) is self.input_model:
+            return self._input
         return self.input_model.model_validate(self._input.model_dump())
 
     @property
     def output(self) -> Any:
         """Return the node's output."""
+        if type(self._output) is self.output_model:
+            return self._output
         return self.output_model.model_validate(self._output.model_dump())
 
     @classmethod
@@ -1,15 +1,24 @@
-import importlib
-from typing import Any, Dict, List
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
 
 from ..schemas.node_type_schemas import NodeTypeSchema
 from .base import BaseNode
 from .node_types import (
-    SUPPORTED_NODE_TYPES,
+    CONFIGURED_NODE_TYPES,
     get_all_node_types,
     is_valid_node_type,
 )
 from .registry import NodeRegistry
 
+# Maximum number of prepared node prototypes kept in memory per process
+NODE_PROTOTYPE_CACHE_SIZE = int(os.getenv("NODE_PROTOTYPE_CACHE_SIZE", "1024"))
+
 
 class NodeFactory:
     """Create node instances from a configuration.
@@ -26,8 +35,17 @@ class NodeFactory:
     Nodes can be registered in two ways:
     1. Using the @NodeRegistry.register decorator (recommended)
     2. Through the legacy configured SUPPORTED_NODE_TYPES in node_types.py
+
+    Creating a node runs its `setup()`, which usually builds Pydantic models. Executors
+    therefore use `create_node_from_prototype`, which builds each distinct
+    (node type, name, config) once and hands out cheap clones of it.
     """
 
+    _prototypes: "OrderedDict[Tuple[str, str, str], BaseNode]" = OrderedDict()
+    _prototypes_lock = threading.Lock()
+    _node_classes: Dict[str, Type[BaseNode]] = {}
+    _registry_version: int = -1
+
     @staticmethod
     def get_all_node_types() -> Dict[str, List[NodeTypeSchema]]:
         """Return a dictionary of all available node types grouped by category.
@@ -63,43 +81,100 @@ class NodeFactory:
 
         return result
 
-    @staticmethod
-    def create_node(node_name: str, node_type_name: str, config: Any) -> BaseNode:
-        """Create a node instance from a configuration.
+    @classmethod
+    def get_node_class(cls, node_type_name: str) -> Type[BaseNode]:
+        """Get the class of a node type.
 
-        Checks both registration methods for the node type.
+        Checks both registration methods for the node type. Resolved classes are cached
+        until the registered nodes change.
         """
+        cls._sync_with_registry()
+        node_class = cls._node_classes.get(node_type_name)
+        if node_class is not None:
+            return node_class
+
         if not is_valid_node_type(node_type_name):
             raise ValueError(f"Node type '{node_type_name}' is not valid.")
 
-        module_name = None
-        class_name = None
-
-        # First check configured nodes
-        for node_group in SUPPORTED_NODE_TYPES.values():
-            for node_type in node_group:
-                if node_type["node_type_name"] == node_type_name:
-                    module_name = node_type["module"]
-                    class_name = node_type["class_name"]
-                    break
-            if module_name and class_name:
-                break
-
-        # If not found, check registry
-        if not module_name or not class_name:
-            registered_nodes = NodeRegistry.get_registered_nodes()
-            for nodes in registered_nodes.values():
-                for node in nodes:
-                    if node.node_type_name == node_type_name:
-                        module_name = node.module
-                        class_name = node.class_name
-                        break
-                if module_name and class_name:
-                    break
-
-        if not module_name or not class_name:
+        # First check configured nodes, then the registry
+        node_type: Optional[NodeTypeSchema] = None
+        configured = CONFIGURED_NODE_TYPES.get(node_type_name)
+        if configured is not None:
+            node_type = NodeTypeSchema.model_validate(configured)
+        else:
+            node_type = NodeRegistry.get_node_info(node_type_name)
+
+        if node_type is None:
             raise ValueError(f"Node type '{node_type_name}' not found.")
 
-        module = importlib.import_module(module_name, package="pyspur")
-        node_class = getattr(module, class_name)
+        node_class = node_type.node_class
+        cls._node_classes[node_type_name] = node_class
+        return node_class
+
+    @classmethod
+    def create_node(cls, node_name: str, node_type_name: str, config: Any) -> BaseNode:
+        """Create a node instance from a configuration."""
+        node_class = cls.get_node_class(node_type_name)
         return node_class(name=node_name, config=node_class.config_model(**config))
+
+    @classmethod
+    def _sync_with_registry(cls) -> None:
+        """Drop the cached classes and prototypes if the registered nodes changed."""
+        registry_version = NodeRegistry.version()
+        if registry_version == cls._registry_version:
+            return
+        with cls._prototypes_lock:
+            cls._node_classes.clear()
+            cls._prototypes.clear()
+            cls._registry_version = registry_version
+
+    @staticmethod
+    def _config_hash(config: Any) -> Optional[str]:
+        """Compute a stable hash of a node config, or None if it can't be serialized."""
+        if isinstance(config, BaseModel):
+            config = config.model_dump(mode="json")
+        try:
+            config_str = json.dumps(config, sort_keys=True, default=str)
+        except (TypeError, ValueError):
+            return None
+        return hashlib.sha256(config_str.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def get_prototype(cls, node_name: str, node_type_name: str, config: Any) -> BaseNode:
+        """Return the shared, fully set up node for a configuration.
+
+        The prototype must not be run or mutated; use `create_node_from_prototype` to get
+        an instance to execute. Reading its models (e.g. `output_model`) is fine.
+        """
+        config_hash = cls._config_hash(config)
+        if config_hash is None:
+            return cls.create_node(node_name, node_type_name, config)
+
+        key = (node_type_name, node_name, config_hash)
+        cls._sync_with_registry()
+        with cls._prototypes_lock:
+            prototype = cls._prototypes.get(key)
+            if prototype is not None:
+                cls._prototypes.move_to_end(key)
+                return prototype
+
+        prototype = cls.create_node(node_name, node_type_name, config)
+        with cls._prototypes_lock:
+            cls._prototypes[key] = prototype
+            cls._prototypes.move_to_end(key)
+            while len(cls._prototypes) > NODE_PROTOTYPE_CACHE_SIZE:
+                cls._prototypes.popitem(last=False)
+        return prototype
+
+    @classmethod
+    def create_node_from_prototype(
+        cls, node_name: str, node_type_name: str, config: Any
+    ) -> BaseNode:
+        """Create a node instance by cloning the cached prototype for its configuration."""
+        return cls.get_prototype(node_name, node_type_name, config).clone()
+
+    @classmethod
+    def clear_prototype_cache(cls) -> None:
+        """Drop all cached node prototypes."""
+        with cls._prototypes_lock:
+            cls._prototypes.clear()
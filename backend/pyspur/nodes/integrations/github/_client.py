@@ -0,0 +1,17 @@
+"""The GitHub client shared by the GitHub nodes."""
+
+import functools
+import os
+from typing import Optional
+
+from phi.tools.github import GithubTools
+
+
+@functools.lru_cache(maxsize=4)
+def _github_tools(access_token: Optional[str]) -> GithubTools:
+    return GithubTools(access_token=access_token)
+
+
+def get_github_tools() -> GithubTools:
+    """Get the tools of the configured access token, which keep their connections open."""
+    return _github_tools(os.getenv("GITHUB_ACCESS_TOKEN"))
@@ -2,10 +2,10 @@ import json
 import logging
 from typing import Optional
 
-from phi.tools.github import GithubTools
 from pydantic import BaseModel, Field  # type: ignore
 
 from ...base import BaseNode, BaseNodeConfig, BaseNodeInput, BaseNodeOutput
+from ._client import get_github_tools
 
 
 class GitHubCreateIssueNodeInput(BaseNodeInput):
@@ -42,7 +42,7 @@ class GitHubCreateIssueNode(BaseNode):
 
     async def run(self, input: BaseModel) -> BaseModel:
         try:
-            gh = GithubTools()
+            gh = get_github_tools()
             issue_info = gh.create_issue(
                 repo_name=self.config.repo_name,
                 title=self.config.issue_title,
@@ -1,10 +1,10 @@
 import json
 import logging
 
-from phi.tools.github import GithubTools
 from pydantic import BaseModel, Field  # type: ignore
 
 from ...base import BaseNode, BaseNodeConfig, BaseNodeInput, BaseNodeOutput
+from ._client import get_github_tools
 
 
 class GitHubGetPullRequestNodeInput(BaseNodeInput):
@@ -42,7 +42,7 @@ class GitHubGetPullRequestNode(BaseNode):
 
     async def run(self, input: BaseModel) -> BaseModel:
         try:
-            gh = GithubTools()
+            gh = get_github_tools()
             pr_details = gh.get_pull_request(
                 repo_name=self.config.repo_name,
                 pr_number=int(self.config.pr_number),
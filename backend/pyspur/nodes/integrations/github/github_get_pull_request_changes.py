@@ -2,10 +2,10 @@ import json
 import logging
 from typing import Optional
 
-from phi.tools.github import GithubTools
 from pydantic import BaseModel, Field  # type: ignore
 
 from ...base import BaseNode, BaseNodeConfig, BaseNodeInput, BaseNodeOutput
+from ._client import get_github_tools
 
 
 class GitHubGetPullRequestChangesNodeInput(BaseNodeInput):
@@ -44,7 +44,7 @@ class GitHubGetPullRequestChangesNode(BaseNode):
 
     async def run(self, input: BaseModel) -> BaseModel:
         try:
-            gh = GithubTools()
+            gh = get_github_tools()
             pr_changes = gh.get_pull_request_changes(
                 repo_name=self.config.repo_name, pr_number=self.config.pr_number
             )
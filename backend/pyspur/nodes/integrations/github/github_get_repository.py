@@ -1,10 +1,10 @@
 import json
 import logging
 
-from phi.tools.github import GithubTools
 from pydantic import BaseModel, Field  # type: ignore
 
 from ...base import BaseNode, BaseNodeConfig, BaseNodeInput, BaseNodeOutput
+from ._client import get_github_tools
 
 
 class GitHubGetRepositoryNodeInput(BaseNodeInput):
@@ -41,7 +41,7 @@ class GitHubGetRepositoryNode(BaseNode):
 
     async def run(self, input: BaseModel) -> BaseModel:
         try:
-            gh = GithubTools()
+            gh = get_github_tools()
             repo_details = gh.get_repository(repo_name=self.config.repo_name)
             return GitHubGetRepositoryNodeOutput(repository_details=repo_details)
         except Exception as e:
@@ -1,10 +1,10 @@
 import json
 import logging
 
-from phi.tools.github import GithubTools
 from pydantic import BaseModel, Field  # type: ignore
 
 from ...base import BaseNode, BaseNodeConfig, BaseNodeInput, BaseNodeOutput
+from ._client import get_github_tools
 
 
 class GitHubListPullRequestsNodeInput(BaseNodeInput):
@@ -49,7 +49,7 @@ class GitHubListPullRequestsNode(BaseNode):
         Fetches the pull requests for a given GitHub repository URL and state.
         """
         try:
-            gh = GithubTools()
+            gh = get_github_tools()
             pull_requests = gh.list_pull_requests(
                 repo_name=self.config.repo_name, state=self.config.state
             )
@@ -1,10 +1,10 @@
 import json
 import logging
 
-from phi.tools.github import GithubTools
 from pydantic import BaseModel, Field  # type: ignore
 
 from ...base import BaseNode, BaseNodeConfig, BaseNodeInput, BaseNodeOutput
+from ._client import get_github_tools
 
 
 class GitHubListRepositoriesNodeInput(BaseNodeInput):
@@ -38,7 +38,7 @@ class GitHubListRepositoriesNode(BaseNode):
 
     async def run(self, input: BaseModel) -> BaseModel:
         try:
-            gh = GithubTools()
+            gh = get_github_tools()
             repositories = gh.list_repositories()
             return GitHubListRepositoriesNodeOutput(repositories=repositories)
         except Exception as e:
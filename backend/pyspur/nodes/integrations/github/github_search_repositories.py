@@ -1,10 +1,10 @@
 import json
 import logging
 
-from phi.tools.github import GithubTools
 from pydantic import BaseModel, Field  # type: ignore
 
 from ...base import BaseNode, BaseNodeConfig, BaseNodeInput, BaseNodeOutput
+from ._client import get_github_tools
 
 
 class GitHubSearchRepositoriesNodeInput(BaseNodeInput):
@@ -48,7 +48,7 @@ class GitHubSearchRepositoriesNode(BaseNode):
 
     async def run(self, input: BaseModel) -> BaseModel:
         try:
-            gh = GithubTools()
+            gh = get_github_tools()
             repos = gh.search_repositories(
                 query=self.config.query,
                 sort=self.config.sort,
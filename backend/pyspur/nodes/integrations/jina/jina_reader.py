@@ -1,9 +1,9 @@
 import json
 import logging
 
-import httpx
 from pydantic import BaseModel, Field  # type: ignore
 
+from ....utils.http_clients import get_http_client
 from ...base import BaseNode, BaseNodeConfig, BaseNodeInput, BaseNodeOutput
 from ...utils.template_utils import render_template_or_get_first_string
 
@@ -59,14 +59,14 @@ class JinaReaderNode(BaseNode):
                 self.config.url_template, raw_input_dict, self.name
             )
 
-            async with httpx.AsyncClient() as client:
-                response = await client.get(reader_url, headers=headers, timeout=None)
-                logging.debug("Fetched from Jina: {text}".format(text=response.text))
-                output = JinaReaderNodeOutput.model_validate(response.json()["data"])
-                if output.content.startswith("```markdown"):
-                    # remove the backticks/code format indicators in the output
-                    output.content = output.content[12:-4]
-                return output
+            client = get_http_client(reader_url)
+            response = await client.get(reader_url, headers=headers, timeout=None)
+            logging.debug("Fetched from Jina: {text}".format(text=response.text))
+            output = JinaReaderNodeOutput.model_validate(response.json()["data"])
+            if output.content.startswith("```markdown"):
+                # remove the backticks/code format indicators in the output
+                output.content = output.content[12:-4]
+            return output
         except Exception as e:
             logging.error(f"Failed to convert URL: {e}")
             return JinaReaderNodeOutput(title="", content="")
@@ -2,9 +2,9 @@ import json
 import logging
 import os
 
-import requests
 from pydantic import BaseModel, Field  # type: ignore
 
+from ....utils.http_clients import get_requests_session
 from ...base import BaseNode, BaseNodeConfig, BaseNodeInput, BaseNodeOutput
 from ...utils.template_utils import render_template_or_get_first_string
 
@@ -71,7 +71,7 @@ class MathpixPdfToLatexNode(BaseNode):
                 raise ValueError("Mathpix API credentials not provided")
 
             # Make API request
-            response = requests.post(
+            response = get_requests_session().post(
                 "https://api.mathpix.com/v3/pdf",
                 json={"url": url, "conversion_formats": {"tex.zip": True}},
                 headers={
@@ -2,9 +2,9 @@ import json
 import logging
 from typing import List, Optional
 
-import requests
 from pydantic import BaseModel, Field
 
+from ....utils.http_clients import get_requests_session
 from ...base import BaseNode, BaseNodeConfig, BaseNodeInput, BaseNodeOutput
 
 
@@ -102,7 +102,7 @@ class FacebookAdLibraryNode(BaseNode):
                 "publisher_platforms": ",".join(self.config.platforms),
             }
 
-            response = requests.get(base_url, params=params)
+            response = get_requests_session().get(base_url, params=params)
             if response.status_code != 200:
                 raise Exception(f"API request failed: {response.text}")
 
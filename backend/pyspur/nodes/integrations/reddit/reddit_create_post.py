@@ -6,6 +6,7 @@ from typing import Optional
 import praw
 from pydantic import BaseModel, Field  # type: ignore
 
+from ....utils.http_clients import get_requests_session
 from ...base import BaseNode, BaseNodeConfig, BaseNodeInput, BaseNodeOutput
 
 
@@ -87,6 +88,7 @@ class RedditCreatePostNode(BaseNode):
                 user_agent=user_agent,
                 username=username,
                 password=password,
+                requestor_kwargs={"session": get_requests_session("reddit")},
             )
 
             # Verify authentication
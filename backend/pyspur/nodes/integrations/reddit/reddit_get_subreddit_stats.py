@@ -5,6 +5,7 @@ import os
 import praw
 from pydantic import BaseModel, Field  # type: ignore
 
+from ....utils.http_clients import get_requests_session
 from ...base import BaseNode, BaseNodeConfig, BaseNodeInput, BaseNodeOutput
 
 
@@ -95,6 +96,7 @@ class RedditGetSubredditStatsNode(BaseNode):
                 client_id=client_id,
                 client_secret=client_secret,
                 user_agent=user_agent,
+                requestor_kwargs={"session": get_requests_session("reddit")},
             )
 
             subreddit = reddit.subreddit(self.config.subreddit)
@@ -6,6 +6,7 @@ from typing import List, Optional
 import praw
 from pydantic import BaseModel, Field  # type: ignore
 
+from ....utils.http_clients import get_requests_session
 from ...base import BaseNode, BaseNodeConfig, BaseNodeInput, BaseNodeOutput
 
 
@@ -96,6 +97,7 @@ class RedditGetTopPostsNode(BaseNode):
                 client_id=client_id,
                 client_secret=client_secret,
                 user_agent=user_agent,
+                requestor_kwargs={"session": get_requests_session("reddit")},
             )
 
             posts = reddit.subreddit(self.config.subreddit).top(
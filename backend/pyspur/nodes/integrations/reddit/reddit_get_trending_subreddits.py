@@ -6,6 +6,7 @@ from typing import List
 import praw
 from pydantic import BaseModel, Field  # type: ignore
 
+from ....utils.http_clients import get_requests_session
 from ...base import BaseNode, BaseNodeConfig, BaseNodeInput, BaseNodeOutput
 
 
@@ -88,6 +89,7 @@ class RedditGetTrendingSubredditsNode(BaseNode):
                 client_id=client_id,
                 client_secret=client_secret,
                 user_agent=user_agent,
+                requestor_kwargs={"session": get_requests_session("reddit")},
             )
 
             popular_subreddits = reddit.subreddits.popular(limit=min(self.config.limit, 100))
@@ -5,6 +5,7 @@ import os
 import praw
 from pydantic import BaseModel, Field  # type: ignore
 
+from ....utils.http_clients import get_requests_session
 from ...base import BaseNode, BaseNodeConfig, BaseNodeInput, BaseNodeOutput
 
 
@@ -85,6 +86,7 @@ class RedditGetUserInfoNode(BaseNode):
                 client_id=client_id,
                 client_secret=client_secret,
                 user_agent=user_agent,
+                requestor_kwargs={"session": get_requests_session("reddit")},
             )
 
             user = reddit.redditor(self.config.username)
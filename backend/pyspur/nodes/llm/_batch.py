@@ -0,0 +1,488 @@
+"""Deferred LLM requests, sent through the providers' batch APIs.
+
+OpenAI and Anthropic process batches of requests asynchronously, at about half the
+price of synchronous calls and with separate rate limits. During a batch run over a
+dataset, LLM nodes with `deferred_batch` enabled hand their requests to the run's
+`LLMBatchCollector`. It gathers the requests of all rows until none arrived for
+LLM_BATCH_WINDOW_SECONDS, submits them as one job per provider, polls the job and
+resumes every waiting node with its response.
+
+Requests that can't be batched raise `BatchRequestError` and are sent directly instead.
+"""
+
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple, Type, Union
+
+import httpx
+from litellm.types.utils import Choices, Message, ModelResponse, Usage
+from loguru import logger
+
+from ...utils.http_clients import get_http_client
+
+# Seconds without new requests after which the gathered requests are submitted
+LLM_BATCH_WINDOW_SECONDS = float(os.getenv("LLM_BATCH_WINDOW_SECONDS", "5"))
+# Requests per batch job; a batch run also keeps this many rows in flight at once
+LLM_BATCH_MAX_REQUESTS = int(os.getenv("LLM_BATCH_MAX_REQUESTS", "1000"))
+# Seconds between checks of a submitted job
+LLM_BATCH_POLL_INTERVAL_SECONDS = float(os.getenv("LLM_BATCH_POLL_INTERVAL_SECONDS", "30"))
+# Seconds after which an unfinished job is cancelled and its requests are sent directly
+LLM_BATCH_TIMEOUT_SECONDS = float(os.getenv("LLM_BATCH_TIMEOUT_SECONDS", str(24 * 3600)))
+
+# Anthropic requires max_tokens, which may have been dropped for the model
+DEFAULT_MAX_TOKENS = 4096
+
+BatchResults = Dict[str, Union[ModelResponse, "BatchRequestError"]]
+
+
+class BatchRequestError(Exception):
+    """A request the batch API couldn't process, to be sent directly instead."""
+
+
+def _strip_provider(model: str) -> str:
+    return model.split("/", 1)[1] if "/" in model else model
+
+
+class BatchClient(ABC):
+    """A client of a provider's batch API."""
+
+    provider: str
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        poll_interval: float = LLM_BATCH_POLL_INTERVAL_SECONDS,
+        timeout: float = LLM_BATCH_TIMEOUT_SECONDS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.headers = headers
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        # The pooled client of the provider's host is used unless a transport is given
+        self._client = httpx.AsyncClient(transport=transport) if transport is not None else None
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        if not url.startswith(("http://", "https://")):
+            url = f"{self.base_url}/{url}"
+        client = self._client or get_http_client(url)
+        response = await client.request(method, url, headers=self.headers, **kwargs)
+        response.raise_for_status()
+        return response
+
+    @abstractmethod
+    def prepare(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert the kwargs of a litellm completion into the provider's request.
+
+        Raises BatchRequestError if the request can't be batched.
+        """
+
+    @abstractmethod
+    async def submit(self, requests: Dict[str, Dict[str, Any]]) -> str:
+        """Create a job of prepared requests by custom ID and return the job's ID."""
+
+    @abstractmethod
+    async def poll(self, batch_id: str) -> bool:
+        """Check whether a job has ended."""
+
+    @abstractmethod
+    async def results(self, batch_id: str) -> BatchResults:
+        """Get the responses and errors of an ended job by custom ID."""
+
+    @abstractmethod
+    async def cancel(self, batch_id: str) -> None:
+        """Cancel a job that is still running."""
+
+    async def run(self, requests: Dict[str, Dict[str, Any]]) -> BatchResults:
+        """Submit a job, wait until it ends and get its results."""
+        batch_id = await self.submit(requests)
+        logger.info(f"Submitted {self.provider} batch {batch_id} of {len(requests)} requests")
+        deadline = time.monotonic() + self.timeout
+        try:
+            while not await self.poll(batch_id):
+                if time.monotonic() >= deadline:
+                    raise BatchRequestError(
+                        f"Batch {batch_id} did not finish within {self.timeout} seconds"
+                    )
+                await asyncio.sleep(self.poll_interval)
+        except BaseException:
+            with contextlib.suppress(Exception):
+                await self.cancel(batch_id)
+            raise
+        return await self.results(batch_id)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+
+
+class OpenAIBatchClient(BatchClient):
+    """Chat completions through the OpenAI Batch API."""
+
+    provider = "openai"
+    endpoint = "/v1/chat/completions"
+    ended_statuses = ("completed", "failed", "expired", "cancelled")
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(
+            os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1"),
+            {"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY', '')}"},
+            **kwargs,
+        )
+        self._batches: Dict[str, Dict[str, Any]] = {}
+
+    def prepare(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        body = {key: value for key, value in request.items() if value is not None}
+        body.pop("thinking", None)
+        body["model"] = _strip_provider(body["model"])
+        if "max_tokens" in body:
+            body["max_completion_tokens"] = body.pop("max_tokens")
+        return body
+
+    async def submit(self, requests: Dict[str, Dict[str, Any]]) -> str:
+        lines = "".join(
+            json.dumps(
+                {"custom_id": custom_id, "method": "POST", "url": self.endpoint, "body": body}
+            )
+            + "\n"
+            for custom_id, body in requests.items()
+        )
+        input_file = await self._request(
+            "POST",
+            "files",
+            data={"purpose": "batch"},
+            files={"file": ("batch.jsonl", lines.encode("utf-8"), "application/jsonl")},
+        )
+        batch = await self._request(
+            "POST",
+            "batches",
+            json={
+                "input_file_id": input_file.json()["id"],
+                "endpoint": self.endpoint,
+                "completion_window": "24h",
+            },
+        )
+        return batch.json()["id"]
+
+    async def poll(self, batch_id: str) -> bool:
+        batch = (await self._request("GET", f"batches/{batch_id}")).json()
+        self._batches[batch_id] = batch
+        return batch["status"] in self.ended_statuses
+
+    async def results(self, batch_id: str) -> BatchResults:
+        batch = self._batches.pop(batch_id)
+        results: BatchResults = {}
+        for file_id in (batch.get("output_file_id"), batch.get("error_file_id")):
+            if not file_id:
+                continue
+            content = await self._request("GET", f"files/{file_id}/content")
+            for line in content.text.splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                response = item.get("response") or {}
+                if response.get("status_code") == 200:
+                    results[item["custom_id"]] = ModelResponse(**response["body"])
+                else:
+                    error = item.get("error") or response.get("body", {}).get("error")
+                    results[item["custom_id"]] = BatchRequestError(json.dumps(error))
+        return results
+
+    async def cancel(self, batch_id: str) -> None:
+        self._batches.pop(batch_id, None)
+        await self._request("POST", f"batches/{batch_id}/cancel")
+
+
+class AnthropicBatchClient(BatchClient):
+    """Messages through the Anthropic Message Batches API."""
+
+    provider = "anthropic"
+    finish_reasons = {"max_tokens": "length", "tool_use": "tool_calls"}
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(
+            os.getenv("ANTHROPIC_API_BASE", "https://api.anthropic.com"),
+            {
+                "x-api-key": os.getenv("ANTHROPIC_API_KEY", ""),
+                "anthropic-version": "2023-06-01",
+            },
+            **kwargs,
+        )
+        self._results_urls: Dict[str, str] = {}
+
+    @staticmethod
+    def _content(content: Any) -> Any:
+        """Convert the content of an OpenAI style message."""
+        if not isinstance(content, list):
+            return content
+        blocks: List[Dict[str, Any]] = []
+        for part in content:
+            if part.get("type") == "text":
+                blocks.append({"type": "text", "text": part["text"]})
+            elif part.get("type") == "image_url":
+                image_url = part["image_url"]
+                url = image_url["url"] if isinstance(image_url, dict) else image_url
+                if url.startswith("data:"):
+                    media_type, _, data = url[len("data:") :].partition(";base64,")
+                    source = {"type": "base64", "media_type": media_type, "data": data}
+                else:
+                    source = {"type": "url", "url": url}
+                blocks.append({"type": "image", "source": source})
+            else:
+                raise BatchRequestError(f"Content of type {part.get('type')} is not batched")
+        return blocks
+
+    def prepare(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if request.get("tools"):
+            raise BatchRequestError("Requests with tools are not batched for Anthropic")
+        system: List[str] = []
+        messages: List[Dict[str, Any]] = []
+        for message in request["messages"]:
+            if message["role"] == "system":
+                system.append(message["content"])
+            else:
+                messages.append(
+                    {"role": message["role"], "content": self._content(message["content"])}
+                )
+
+        # The batch API has no response format; ask for the JSON in the system prompt
+        response_format = request.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            json_schema = response_format["json_schema"]
+            schema = json_schema.get("schema", json_schema)
+            system.append(
+                "You must respond with valid JSON only, adhering to this schema: "
+                + json.dumps(schema)
+            )
+        elif response_format.get("type") == "json_object":
+            system.append("You must respond with valid JSON only.")
+
+        params: Dict[str, Any] = {
+            "model": _strip_provider(request["model"]),
+            "max_tokens": request.get("max_tokens") or DEFAULT_MAX_TOKENS,
+            "messages": messages,
+        }
+        if system:
+            params["system"] = "\n\n".join(system)
+        for key in ("temperature", "thinking"):
+            if request.get(key) is not None:
+                params[key] = request[key]
+        return params
+
+    async def submit(self, requests: Dict[str, Dict[str, Any]]) -> str:
+        batch = await self._request(
+            "POST",
+            "v1/messages/batches",
+            json={
+                "requests": [
+                    {"custom_id": custom_id, "params": params}
+                    for custom_id, params in requests.items()
+                ]
+            },
+        )
+        return batch.json()["id"]
+
+    async def poll(self, batch_id: str) -> bool:
+        batch = (await self._request("GET", f"v1/messages/batches/{batch_id}")).json()
+        if batch["processing_status"] != "ended":
+            return False
+        self._results_urls[batch_id] = batch["results_url"]
+        return True
+
+    def _response(self, message: Dict[str, Any]) -> ModelResponse:
+        text = "".join(
+            block["text"] for block in message.get("content", []) if block.get("type") == "text"
+        )
+        usage = message.get("usage", {})
+        prompt_tokens = usage.get("input_tokens", 0)
+        completion_tokens = usage.get("output_tokens", 0)
+        finish_reason = self.finish_reasons.get(message.get("stop_reason"), "stop")
+        return ModelResponse(
+            id=message.get("id"),
+            model=message.get("model"),
+            choices=[Choices(message=Message(content=text), finish_reason=finish_reason)],
+            usage=Usage(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+
+    async def results(self, batch_id: str) -> BatchResults:
+        content = await self._request("GET", self._results_urls.pop(batch_id))
+        results: BatchResults = {}
+        for line in content.text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            result = item["result"]
+            if result["type"] == "succeeded":
+                results[item["custom_id"]] = self._response(result["message"])
+            else:
+                error = result.get("error") or result["type"]
+                results[item["custom_id"]] = BatchRequestError(json.dumps(error))
+        return results
+
+    async def cancel(self, batch_id: str) -> None:
+        await self._request("POST", f"v1/messages/batches/{batch_id}/cancel")
+
+
+BATCH_CLIENTS: Dict[str, Type[BatchClient]] = {
+    OpenAIBatchClient.provider: OpenAIBatchClient,
+    AnthropicBatchClient.provider: AnthropicBatchClient,
+}
+
+
+def batch_provider(model: str) -> Optional[str]:
+    """Get the provider whose batch API can process requests to a model, if any."""
+    # Requests to OpenAI models are routed to Azure if it is configured
+    if model.startswith("azure/") or os.getenv("AZURE_OPENAI_API_KEY"):
+        return None
+    provider = model.split("/", 1)[0] if "/" in model else "openai"
+    return provider if provider in BATCH_CLIENTS else None
+
+
+_PendingRequest = Tuple[str, Dict[str, Any], "asyncio.Future[ModelResponse]"]
+
+
+class LLMBatchCollector:
+    """Gathers the deferred requests of concurrent runs into batch jobs.
+
+    Requests are grouped by provider. A group is submitted when no request was added to
+    it for `window` seconds, or as soon as it has `max_requests` requests.
+    """
+
+    def __init__(
+        self,
+        window: float = LLM_BATCH_WINDOW_SECONDS,
+        max_requests: int = LLM_BATCH_MAX_REQUESTS,
+        clients: Optional[Dict[str, BatchClient]] = None,
+    ):
+        self.window = window
+        self.max_requests = max(1, max_requests)
+        self._clients: Dict[str, BatchClient] = dict(clients or {})
+        self._pending: Dict[str, List[_PendingRequest]] = {}
+        self._last_added: Dict[str, float] = {}
+        self._flushers: Dict[str, "asyncio.Task[None]"] = {}
+        self._jobs: Set["asyncio.Task[None]"] = set()
+        self._ids = itertools.count()
+
+    def _client(self, provider: str) -> BatchClient:
+        client = self._clients.get(provider)
+        if client is None:
+            client = self._clients[provider] = BATCH_CLIENTS[provider]()
+        return client
+
+    async def complete(self, request: Dict[str, Any]) -> ModelResponse:
+        """Add a completion request to the next batch job and wait for its response.
+
+        Raises BatchRequestError if the request can't be batched or the job didn't
+        produce a response for it.
+        """
+        model = request.get("model", "")
+        provider = batch_provider(model)
+        if provider is None:
+            raise BatchRequestError(f"No batch API for model {model}")
+        body = self._client(provider).prepare(request)
+
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[ModelResponse]" = loop.create_future()
+        pending = self._pending.setdefault(provider, [])
+        pending.append((f"request-{next(self._ids)}", body, future))
+        self._last_added[provider] = loop.time()
+        if len(pending) >= self.max_requests:
+            self._submit(provider)
+        elif provider not in self._flushers:
+            self._flushers[provider] = asyncio.create_task(self._submit_when_idle(provider))
+        return await future
+
+    async def _submit_when_idle(self, provider: str) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while self._pending.get(provider):
+                wait = self._last_added[provider] + self.window - loop.time()
+                if wait <= 0:
+                    self._submit(provider)
+                    break
+                await asyncio.sleep(wait)
+        finally:
+            self._flushers.pop(provider, None)
+
+    def _submit(self, provider: str) -> None:
+        requests = self._pending.pop(provider, [])
+        if requests:
+            job = asyncio.create_task(self._run_job(provider, requests))
+            self._jobs.add(job)
+            job.add_done_callback(self._jobs.discard)
+
+    async def _run_job(self, provider: str, requests: List[_PendingRequest]) -> None:
+        # Requests whose runs were cancelled meanwhile are left out
+        requests = [request for request in requests if not request[2].done()]
+        if not requests:
+            return
+        try:
+            results = await self._client(provider).run(
+                {custom_id: body for custom_id, body, _ in requests}
+            )
+        except asyncio.CancelledError:
+            for _, _, future in requests:
+                future.cancel()
+            raise
+        except Exception as e:
+            logger.warning(f"The {provider} batch job failed, sending its requests directly: {e}")
+            results = {custom_id: BatchRequestError(str(e)) for custom_id, _, _ in requests}
+        for custom_id, _, future in requests:
+            if future.done():
+                continue
+            result = results.get(custom_id)
+            if result is None:
+                result = BatchRequestError(f"The {provider} batch job has no result for it")
+            if isinstance(result, BatchRequestError):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def close(self) -> None:
+        """Cancel the jobs that are still running and close the clients."""
+        tasks = [*self._flushers.values(), *self._jobs]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for requests in self._pending.values():
+            for _, _, future in requests:
+                future.cancel()
+        self._pending.clear()
+        for client in self._clients.values():
+            await client.close()
+
+
+# The collector of the batch run in the current context, if any
+_active_collector: ContextVar[Optional[LLMBatchCollector]] = ContextVar(
+    "llm_batch_collector", default=None
+)
+
+
+def get_batch_collector() -> Optional[LLMBatchCollector]:
+    """Get the collector that deferred requests in the current context are added to."""
+    return _active_collector.get()
+
+
+@contextlib.asynccontextmanager
+async def collect_llm_batches(
+    collector: Optional[LLMBatchCollector] = None,
+) -> AsyncIterator[LLMBatchCollector]:
+    """Batch the deferred LLM requests of all runs in this context, including nested tasks."""
+    collector = collector or LLMBatchCollector()
+    reset_token = _active_collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _active_collector.reset(reset_token)
+        await collector.close()
@@ -0,0 +1,151 @@
+"""Incremental parsing of LLM output while it is being generated."""
+
+from typing import List, Optional, Tuple
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class JsonFieldStream:
+    """Extract the text of the top-level string fields of a streamed JSON object.
+
+    Feed the generated fragments in order; each call returns the decoded text that
+    became available, by field. Nested values and non-string fields are skipped, and
+    text before the opening brace (e.g. a code fence) is ignored.
+    """
+
+    def __init__(self) -> None:
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._unicode: Optional[str] = None
+        self._high_surrogate: Optional[int] = None
+        self._expect_key = False
+        self._string_is_key = False
+        self._key_parts: List[str] = []
+        self._key: Optional[str] = None
+
+    def feed(self, fragment: str) -> List[Tuple[str, str]]:
+        """Parse the next fragment and return the new (field, text) pieces."""
+        pieces: List[Tuple[str, str]] = []
+        text: List[str] = []
+
+        def _emit() -> None:
+            if text and self._key is not None:
+                pieces.append((self._key, "".join(text)))
+            text.clear()
+
+        for char in fragment:
+            if self._in_string:
+                if char == '"' and not self._escape and self._unicode is None:
+                    self._in_string = False
+                    if self._string_is_key:
+                        self._key = "".join(self._key_parts)
+                        self._key_parts.clear()
+                    else:
+                        _emit()
+                    continue
+                decoded = self._decode(char)
+                if decoded is None:
+                    continue
+                if self._string_is_key:
+                    self._key_parts.append(decoded)
+                elif self._depth == 1:
+                    text.append(decoded)
+            elif char == '"':
+                if self._depth == 0:
+                    continue
+                self._in_string = True
+                self._string_is_key = self._depth == 1 and self._expect_key
+            elif char in "{[":
+                self._depth += 1
+                self._expect_key = self._depth == 1 and char == "{"
+            elif char in "}]":
+                self._depth = max(0, self._depth - 1)
+            elif self._depth == 1:
+                if char == ",":
+                    self._expect_key = True
+                elif char == ":":
+                    self._expect_key = False
+
+        _emit()
+        return pieces
+
+    def _decode(self, char: str) -> Optional[str]:
+        """Decode one character of a string; None while an escape sequence is incomplete."""
+        if self._unicode is not None:
+            self._unicode += char
+            if len(self._unicode) < 4:
+                return None
+            try:
+                code = int(self._unicode, 16)
+            except ValueError:
+                code = 0xFFFD
+            self._unicode = None
+            # Characters outside the BMP are escaped as a pair of surrogates
+            if 0xD800 <= code <= 0xDBFF:
+                self._high_surrogate = code
+                return None
+            high, self._high_surrogate = self._high_surrogate, None
+            if high is not None and 0xDC00 <= code <= 0xDFFF:
+                code = 0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00)
+            return chr(code)
+        if self._escape:
+            self._escape = False
+            if char == "u":
+                self._unicode = ""
+                return None
+            return _ESCAPES.get(char, char)
+        if char == "\\":
+            self._escape = True
+            return None
+        return char
+
+
+class BlockFilter:
+    """Drop the blocks between a start and an end marker from streamed text.
+
+    Used for the reasoning blocks that are removed from the final output. Text that
+    could be the beginning of a marker is held back until the next fragment tells. A
+    block that is never closed is not removed from the final output either, so `flush`
+    returns it.
+    """
+
+    def __init__(self, start: str, end: str) -> None:
+        self.start = start
+        self.end = end
+        self._buffer = ""
+        self._in_block = False
+
+    def feed(self, fragment: str) -> str:
+        """Filter the next fragment and return the text outside the blocks."""
+        self._buffer += fragment
+        text: List[str] = []
+        while True:
+            marker = self.end if self._in_block else self.start
+            index = self._buffer.find(marker)
+            if index < 0:
+                break
+            if not self._in_block:
+                text.append(self._buffer[:index])
+            self._buffer = self._buffer[index + len(marker) :]
+            self._in_block = not self._in_block
+        if not self._in_block:
+            held = _partial_marker_length(self._buffer, self.start)
+            text.append(self._buffer[: len(self._buffer) - held])
+            self._buffer = self._buffer[len(self._buffer) - held :]
+        return "".join(text)
+
+    def flush(self) -> str:
+        """Return the text held back at the end of the stream."""
+        text = self.start + self._buffer if self._in_block else self._buffer
+        self._buffer = ""
+        self._in_block = False
+        return text
+
+
+def _partial_marker_length(text: str, marker: str) -> int:
+    """Get the length of the longest end of `text` that begins `marker`."""
+    for length in range(min(len(text), len(marker) - 1), 0, -1):
+        if marker.startswith(text[-length:]):
+            return length
+    return 0
@@ -0,0 +1,325 @@
+"""Client-side rate limiting of the requests to LLM providers.
+
+Each model has a limiter with optional requests- and tokens-per-minute budgets
+(token buckets) and an adaptive concurrency limit. The limit grows by one request per
+limit's worth of successes and halves on a 429 (AIMD). Budgets come from
+LLM_RATE_LIMITS or are learned from the providers' rate limit headers. A provider
+listed in LLM_RATE_LIMITS additionally gets a limiter shared by all of its models.
+
+Completions, embeddings and reranking all go through `call_with_rate_limit`.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+# Budgets per provider or model, e.g.
+# {"openai": {"requests_per_minute": 500}, "openai/gpt-4o": {"tokens_per_minute": 30000}}
+LLM_RATE_LIMITS: Dict[str, Dict[str, Any]] = json.loads(os.getenv("LLM_RATE_LIMITS") or "{}")
+# Upper bound of the adaptive number of concurrent requests per model or provider
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# Times a rate limited request is retried before the error is raised
+LLM_RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "5"))
+
+# Rough size of a token, used to estimate requests before sending them
+CHARS_PER_TOKEN = 4
+# Tokens counted for an image or file in a message
+TOKENS_PER_ATTACHMENT = 1000
+# Seconds between checks for a free concurrency slot
+_SLOT_POLL_INTERVAL = 0.05
+
+# OpenAI style "x-ratelimit-remaining-tokens" and Anthropic style
+# "anthropic-ratelimit-tokens-remaining" headers, possibly prefixed by litellm
+_OPENAI_HEADER = re.compile(r"ratelimit-(limit|remaining)-(requests|tokens)$")
+_ANTHROPIC_HEADER = re.compile(r"ratelimit-(requests|tokens)-(limit|remaining)$")
+
+
+class TokenBucket:
+    """A budget per minute that refills continuously."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Get the seconds until `amount` can be consumed."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """Give back (positive) or additionally take (negative) part of the budget."""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def cap(self, remaining: float) -> None:
+        """Limit the available budget to what the provider reports as remaining."""
+        self.tokens = min(self.tokens, remaining)
+
+
+class RateLimiter:
+    """The budgets and the adaptive concurrency limit of one model or provider.
+
+    The state is guarded by a thread lock and waiting is done by sleeping, so a limiter
+    can be shared by event loops in different threads.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        learn_limits: bool = True,
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_concurrency = max(1, max_concurrency)
+        self.concurrency_limit = float(self.max_concurrency)
+        self.learn_limits = learn_limits
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._next_decrease = 0.0
+        self._lock = threading.Lock()
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Wait until a request of about `tokens` tokens may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self.paused_until - now
+                if self.requests is not None:
+                    wait = max(wait, self.requests.wait_time(1, now))
+                if self.tokens is not None and tokens:
+                    wait = max(wait, self.tokens.wait_time(tokens, now))
+                if wait <= 0 and self.in_flight >= int(self.concurrency_limit):
+                    wait = _SLOT_POLL_INTERVAL
+                if wait <= 0:
+                    if self.requests is not None:
+                        self.requests.consume(1)
+                    if self.tokens is not None and tokens:
+                        self.tokens.consume(tokens)
+                    self.in_flight += 1
+                    return
+            await asyncio.sleep(wait)
+
+    def release(
+        self,
+        reserved_tokens: int = 0,
+        used_tokens: Optional[int] = None,
+        headers: Optional[Mapping[str, Any]] = None,
+    ) -> None:
+        """Finish a successful request and adapt to the provider's feedback."""
+        with self._lock:
+            self.in_flight -= 1
+            self.concurrency_limit = min(
+                self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit
+            )
+            if self.tokens is not None and used_tokens is not None:
+                self.tokens.adjust(reserved_tokens - used_tokens)
+            if headers:
+                self._apply_headers(parse_rate_limit_headers(headers))
+
+    def release_failed(self) -> None:
+        """Finish a request that failed for another reason than the rate limit."""
+        with self._lock:
+            self.in_flight -= 1
+
+    def release_rate_limited(self, retry_after: float) -> None:
+        """Finish a rejected request: halve the concurrency and pause for `retry_after`."""
+        with self._lock:
+            self.in_flight -= 1
+            now = time.monotonic()
+            # A burst of rejections for the requests in flight counts as one signal
+            if now >= self._next_decrease:
+                self.concurrency_limit = max(1.0, self.concurrency_limit / 2)
+                self._next_decrease = now + 1
+            self.paused_until = max(self.paused_until, now + retry_after)
+            logger.warning(
+                f"Rate limited by {self.name}, pausing {retry_after:.1f}s with at most"
+                f" {int(self.concurrency_limit)} concurrent requests"
+            )
+
+    def _apply_headers(self, limits: Dict[str, int]) -> None:
+        if not self.learn_limits:
+            return
+        for kind in ("requests", "tokens"):
+            bucket: Optional[TokenBucket] = getattr(self, kind)
+            limit = limits.get(f"limit_{kind}")
+            if bucket is None and limit:
+                bucket = TokenBucket(limit)
+                setattr(self, kind, bucket)
+            remaining = limits.get(f"remaining_{kind}")
+            if bucket is not None and remaining is not None:
+                bucket.cap(remaining)
+
+
+def parse_rate_limit_headers(headers: Mapping[str, Any]) -> Dict[str, int]:
+    """Get the limits and remaining budgets from a provider's rate limit headers."""
+    limits: Dict[str, int] = {}
+    for name, value in headers.items():
+        name = name.lower()
+        match = _OPENAI_HEADER.search(name)
+        if match:
+            field, kind = match.groups()
+        else:
+            match = _ANTHROPIC_HEADER.search(name)
+            if not match:
+                continue
+            kind, field = match.groups()
+        try:
+            limits[f"{field}_{kind}"] = int(float(value))
+        except (TypeError, ValueError):
+            continue
+    return limits
+
+
+def estimate_tokens(content: Any) -> int:
+    """Estimate the tokens of a prompt: text, messages or a list of texts."""
+    if content is None:
+        return 0
+    if isinstance(content, str):
+        return len(content) // CHARS_PER_TOKEN + 1
+    if isinstance(content, dict):
+        if content.get("type") in ("image_url", "file", "input_audio"):
+            return TOKENS_PER_ATTACHMENT
+        return sum(estimate_tokens(value) for value in content.values())
+    if isinstance(content, (list, tuple)):
+        return sum(estimate_tokens(item) for item in content)
+    return 0
+
+
+def _provider(model: str) -> str:
+    return model.split("/", 1)[0] if "/" in model else "openai"
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _get_limiter(scope: str, learn_limits: bool) -> RateLimiter:
+    with _limiters_lock:
+        limiter = _limiters.get(scope)
+        if limiter is None:
+            config = LLM_RATE_LIMITS.get(scope, {})
+            limiter = _limiters[scope] = RateLimiter(
+                scope,
+                requests_per_minute=config.get("requests_per_minute"),
+                tokens_per_minute=config.get("tokens_per_minute"),
+                max_concurrency=config.get("max_concurrency", LLM_MAX_CONCURRENCY),
+                learn_limits=learn_limits,
+            )
+        return limiter
+
+
+def get_rate_limiters(model: str, provider: Optional[str] = None) -> List[RateLimiter]:
+    """Get the limiters a request to a model has to pass."""
+    limiters = [_get_limiter(model, learn_limits=True)]
+    provider = provider or _provider(model)
+    if provider in LLM_RATE_LIMITS and provider != model:
+        limiters.append(_get_limiter(provider, learn_limits=False))
+    return limiters
+
+
+def reset_rate_limiters() -> None:
+    """Forget the state of all limiters, e.g. in tests."""
+    with _limiters_lock:
+        _limiters.clear()
+
+
+def _is_rate_limit_error(error: BaseException) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def _retry_after(error: BaseException, attempt: int) -> float:
+    """Get the seconds to wait after a 429, from its headers or by exponential backoff."""
+    headers = getattr(error, "litellm_response_headers", None)
+    if headers is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is not None:
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    return min(60.0, 2.0**attempt) * random.uniform(0.5, 1.0)
+
+
+def _response_tokens(response: Any) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        return usage.get("total_tokens")
+    return getattr(usage, "total_tokens", None)
+
+
+def _response_headers(response: Any) -> Optional[Mapping[str, Any]]:
+    hidden_params = getattr(response, "_hidden_params", None) or {}
+    return hidden_params.get("additional_headers")
+
+
+async def call_with_rate_limit(
+    call: Callable[[], Awaitable[T]],
+    model: str,
+    estimated_tokens: int = 0,
+    provider: Optional[str] = None,
+) -> T:
+    """Send a request to an LLM provider within the rate limits of its model.
+
+    Rate limited requests are retried up to LLM_RATE_LIMIT_RETRIES times, after the
+    provider's retry-after or an exponential backoff.
+
+    Args:
+        call: Sends the request
+        model: The model of the request, as passed to litellm
+        estimated_tokens: The tokens the request is expected to use, see `estimate_tokens`
+        provider: The provider, if it isn't the prefix of the model name
+
+    """
+    limiters = get_rate_limiters(model, provider)
+    attempt = 0
+    while True:
+        acquired: List[RateLimiter] = []
+        try:
+            for limiter in limiters:
+                await limiter.acquire(estimated_tokens)
+                acquired.append(limiter)
+            response = await call()
+        except BaseException as e:
+            if not _is_rate_limit_error(e):
+                for limiter in acquired:
+                    limiter.release_failed()
+                raise
+            retry_after = _retry_after(e, attempt)
+            for limiter in acquired:
+                limiter.release_rate_limited(retry_after)
+            if attempt >= LLM_RATE_LIMIT_RETRIES:
+                raise
+            attempt += 1
+            continue
+
+        used_tokens = _response_tokens(response)
+        headers = _response_headers(response)
+        for limiter in acquired:
+            limiter.release(estimated_tokens, used_tokens, headers)
+        return response
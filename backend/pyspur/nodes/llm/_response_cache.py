@@ -0,0 +1,259 @@
+"""Cache of LLM responses, keyed by the content of the request.
+
+Responses are kept in an in-process LRU and in a persistent store shared by all
+workers: a local SQLite file by default, or Redis. Nodes opt in with their
+`cache_policy`, since reusing a response changes the behavior of sampled calls.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from loguru import logger
+
+from ...utils.path_utils import PROJECT_ROOT
+
+# Persistent store: sqlite, redis or none (in-process only)
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "sqlite").lower()
+# Seconds a cached response stays valid (0 = forever)
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Responses kept in the in-process LRU
+LLM_CACHE_MEMORY_SIZE = int(os.getenv("LLM_CACHE_MEMORY_SIZE", "1024"))
+LLM_CACHE_SQLITE_PATH = Path(
+    os.getenv("LLM_CACHE_SQLITE_PATH", str(PROJECT_ROOT / "data" / "llm_cache.sqlite3"))
+)
+LLM_CACHE_REDIS_URL = os.getenv("LLM_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+# The request parameters that determine a response
+CACHE_KEY_FIELDS = (
+    "model",
+    "messages",
+    "temperature",
+    "max_tokens",
+    "response_format",
+    "tools",
+    "tool_choice",
+    "thinking",
+)
+
+
+class CachePolicy(str, Enum):
+    OFF = "off"
+    READ_WRITE = "read_write"
+    READ_ONLY = "read_only"
+
+
+def response_cache_key(request: Dict[str, Any]) -> str:
+    """Hash the parameters of a completion request that determine its response."""
+    canonical = json.dumps(
+        {field: request.get(field) for field in CACHE_KEY_FIELDS},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCacheBackend(ABC):
+    """A store for serialized responses."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        """Get a response, or None if it isn't cached or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        """Store a response for `ttl` seconds (0 = forever)."""
+
+    async def close(self) -> None:
+        """Release the connections of the backend."""
+        return None
+
+
+class MemoryResponseCache(ResponseCacheBackend):
+    """A bounded LRU of responses in this process."""
+
+    def __init__(self, max_size: int = LLM_CACHE_MEMORY_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at and expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + ttl if ttl else 0.0, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+class SQLiteResponseCache(ResponseCacheBackend):
+    """Responses in a local SQLite file, shared by the workers on this machine."""
+
+    def __init__(self, path: Path = LLM_CACHE_SQLITE_PATH):
+        self.path = path
+        self._initialized = False
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection in a transaction, creating the cache table if needed."""
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            if not self._initialized:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_responses"
+                    " (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._initialized = True
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT value, expires_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at and expires_at < time.time():
+                connection.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                return None
+            return value
+
+    def _set(self, key: str, value: str, ttl: int) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl if ttl else 0.0),
+            )
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+
+class RedisResponseCache(ResponseCacheBackend):
+    """Responses in Redis, shared by all workers of a deployment."""
+
+    key_prefix = "pyspur:llm_response:"
+
+    def __init__(self, url: str = LLM_CACHE_REDIS_URL):
+        import redis.asyncio as redis
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(self.key_prefix + key)
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await self.client.set(self.key_prefix + key, value, ex=ttl or None)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class ResponseCache:
+    """An in-process LRU in front of an optional persistent store.
+
+    Failures of the persistent store are logged and treated as cache misses, so an
+    unavailable cache never fails an LLM call.
+    """
+
+    def __init__(
+        self,
+        persistent: Optional[ResponseCacheBackend] = None,
+        memory_size: int = LLM_CACHE_MEMORY_SIZE,
+        ttl: int = LLM_CACHE_TTL_SECONDS,
+    ):
+        self.memory = MemoryResponseCache(memory_size)
+        self.persistent = persistent
+        self.ttl = ttl
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.memory.get(key)
+        if value is not None or self.persistent is None:
+            return value
+        try:
+            value = await self.persistent.get(key)
+        except Exception as e:
+            logger.warning(f"Failed to read from the LLM response cache: {e}")
+            return None
+        if value is not None:
+            await self.memory.set(key, value, self.ttl)
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        await self.memory.set(key, value, self.ttl)
+        if self.persistent is None:
+            return
+        try:
+            await self.persistent.set(key, value, self.ttl)
+        except Exception as e:
+            logger.warning(f"Failed to write to the LLM response cache: {e}")
+
+    async def close(self) -> None:
+        if self.persistent is not None:
+            await self.persistent.close()
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Get the process-wide response cache, configured by the LLM_CACHE_* settings."""
+    global _response_cache
+    if _response_cache is None:
+        persistent: Optional[ResponseCacheBackend] = None
+        if LLM_CACHE_BACKEND == "sqlite":
+            persistent = SQLiteResponseCache()
+        elif LLM_CACHE_BACKEND == "redis":
+            persistent = RedisResponseCache()
+        elif LLM_CACHE_BACKEND != "none":
+            raise ValueError(f"Unknown LLM_CACHE_BACKEND: {LLM_CACHE_BACKEND}")
+        _response_cache = ResponseCache(persistent)
+    return _response_cache
+
+
+def set_response_cache(cache: Optional[ResponseCache]) -> None:
+    """Replace the process-wide response cache, e.g. in tests."""
+    global _response_cache
+    _response_cache = cache
+
+
+async def close_response_cache() -> None:
+    """Close the process-wide response cache, if it was created."""
+    global _response_cache
+    if _response_cache is not None:
+        await _response_cache.close()
+        _response_cache = None
@@ -10,15 +10,26 @@ import litellm
 from docx2python import docx2python
 from dotenv import load_dotenv
 from litellm import acompletion
-from litellm.types.utils import Message
+from litellm.types.utils import Choices, Message, ModelResponse, Usage
 from ollama import AsyncClient
 from pydantic import BaseModel, Field
-from tenacity import AsyncRetrying, stop_after_attempt, wait_random_exponential
+from tenacity import (
+    AsyncRetrying,
+    retry_if_not_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 
+from ...execution.token_usage import record_token_usage
 from ...utils.file_utils import encode_file_to_base64_data_url
+from ...utils.http_clients import get_pooled_client, http_limits
 from ...utils.mime_types_utils import get_mime_type_for_url
 from ...utils.path_utils import is_external_url, resolve_file_path
+from ._batch import BatchRequestError, get_batch_collector
+from ._json_stream import BlockFilter, JsonFieldStream
 from ._model_info import LLMModels
+from ._rate_limiter import call_with_rate_limit, estimate_tokens
+from ._response_cache import CachePolicy, get_response_cache, response_cache_key
 from ._providers import OllamaOptions, setup_azure_configuration
 
 # uncomment for debugging litellm issues
@@ -148,22 +159,136 @@ def async_retry(*dargs, **dkwargs):
     return decorator
 
 
+def _record_usage(response: Any) -> None:
+    """Count the tokens of a completion towards the runs that track token usage."""
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        record_token_usage(getattr(usage, "total_tokens", None))
+
+
+class _StreamedAttempts:
+    """Pass on the streamed text of one attempt at a completion.
+
+    Once an attempt has passed text on, the text of the attempts that retry it is
+    dropped: it would repeat or contradict what was already passed on. The response
+    still comes from the attempt that succeeded.
+    """
+
+    def __init__(self, on_delta: Callable[[str], None]) -> None:
+        self._on_delta = on_delta
+        self._attempt = 0
+        self._streaming_attempt: Optional[int] = None
+
+    def new_attempt(self) -> None:
+        """Start the next attempt."""
+        self._attempt += 1
+
+    def __call__(self, fragment: str) -> None:
+        if self._streaming_attempt is None:
+            self._streaming_attempt = self._attempt
+        if self._streaming_attempt == self._attempt:
+            self._on_delta(fragment)
+
+
+async def _stream_completion(on_delta: Callable[[str], None], **kwargs) -> ModelResponse:
+    """Call the LLM completion endpoint in streaming mode.
+
+    Every fragment of generated text is passed to `on_delta` as it arrives. The chunks
+    are assembled into a single response, like the one of a non-streaming call.
+    """
+    stream = await acompletion(
+        **kwargs, stream=True, stream_options={"include_usage": True}, drop_params=True
+    )
+    content_parts: List[str] = []
+    tool_calls: Dict[int, Dict[str, Any]] = {}
+    usage = None
+    finish_reason = None
+    async for chunk in stream:
+        usage = getattr(chunk, "usage", None) or usage
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        finish_reason = choice.finish_reason or finish_reason
+        delta = choice.delta
+        if delta.content:
+            content_parts.append(delta.content)
+            on_delta(delta.content)
+        # Tool calls arrive in fragments too, identified by their index
+        for tool_call_delta in delta.tool_calls or []:
+            tool_call = tool_calls.setdefault(
+                tool_call_delta.index,
+                {"id": None, "type": "function", "function": {"name": "", "arguments": ""}},
+            )
+            if tool_call_delta.id:
+                tool_call["id"] = tool_call_delta.id
+            function = tool_call_delta.function
+            if function is not None:
+                tool_call["function"]["name"] += function.name or ""
+                tool_call["function"]["arguments"] += function.arguments or ""
+
+    message = Message(
+        content="".join(content_parts) if content_parts else None,
+        tool_calls=[tool_calls[index] for index in sorted(tool_calls)] or None,
+    )
+    if usage is None:
+        # Not all providers report the usage of streamed responses
+        prompt_tokens = estimate_tokens(kwargs.get("messages"))
+        completion_tokens = estimate_tokens(message.content)
+        usage = Usage(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        )
+    response = ModelResponse(
+        choices=[Choices(message=message, finish_reason=finish_reason or "stop")], usage=usage
+    )
+    response._hidden_params = getattr(stream, "_hidden_params", None) or {}
+    return response
+
+
+async def _rate_limited_completion(
+    on_delta: Optional[Callable[[str], None]] = None, **kwargs
+) -> ModelResponse:
+    """Call the LLM completion endpoint within the rate limits of the model."""
+    model = kwargs.get("model", "")
+    # Providers count the completion's max_tokens against the budget until it finished
+    estimated_tokens = estimate_tokens(kwargs.get("messages")) + (kwargs.get("max_tokens") or 0)
+    if on_delta is not None:
+        attempts = (
+            on_delta if isinstance(on_delta, _StreamedAttempts) else _StreamedAttempts(on_delta)
+        )
+
+        async def _stream() -> ModelResponse:
+            # Requests that hit the rate limit are retried
+            attempts.new_attempt()
+            return await _stream_completion(attempts, **kwargs)
+
+        return await call_with_rate_limit(_stream, model, estimated_tokens)
+    return await call_with_rate_limit(
+        lambda: acompletion(**kwargs, drop_params=True), model, estimated_tokens
+    )
+
+
+# Rate limit errors are retried by the rate limiter
 @async_retry(
     wait=wait_random_exponential(min=30, max=120),
     stop=stop_after_attempt(3),
-    retry=lambda e: not isinstance(
-        e,
+    retry=retry_if_not_exception_type(
         (
             litellm.exceptions.AuthenticationError,
             ValueError,
             litellm.exceptions.RateLimitError,
-        ),
+        )
     ),
 )
-async def completion_with_backoff(**kwargs) -> Message:
+async def completion_with_backoff(
+    on_delta: Optional[Callable[[str], None]] = None, **kwargs
+) -> Message:
     """Call the LLM completion endpoint with backoff.
 
-    Supports Azure OpenAI, standard OpenAI, or Ollama based on the model name.
+    Supports Azure OpenAI, standard OpenAI, or Ollama based on the model name. With
+    `on_delta`, the response is streamed (except from Azure) and its text fragments are
+    passed to it as they arrive.
     """
     try:
         model = kwargs.get("model", "")
@@ -178,7 +303,8 @@ async def completion_with_backoff(**kwargs) -> Message:
             azure_kwargs = setup_azure_configuration(kwargs)
             logging.info(f"Using Azure config for model: {azure_kwargs['model']}")
             try:
-                response = await acompletion(**azure_kwargs, drop_params=True)
+                response = await _rate_limited_completion(**azure_kwargs)
+                _record_usage(response)
                 return response.choices[0].message.content
             except Exception as e:
                 logging.error(f"Error calling Azure OpenAI: {e}")
@@ -186,11 +312,13 @@ async def completion_with_backoff(**kwargs) -> Message:
 
         elif model.startswith("ollama/"):
             logging.info("=== Ollama Configuration ===")
-            response = await acompletion(**kwargs, drop_params=True)
+            response = await _rate_limited_completion(on_delta=on_delta, **kwargs)
+            _record_usage(response)
             return response.choices[0].message
         else:
             logging.info("=== Standard Configuration ===")
-            response = await acompletion(**kwargs, drop_params=True)
+            response = await _rate_limited_completion(on_delta=on_delta, **kwargs)
+            _record_usage(response)
             return response.choices[0].message
 
     except Exception as e:
@@ -207,6 +335,56 @@ async def completion_with_backoff(**kwargs) -> Message:
         raise e
 
 
+async def _complete(
+    on_delta: Optional[Callable[[str], None]], deferred_batch: bool, **kwargs
+) -> Message:
+    """Send a deferred request with the batch run's batch job, other requests directly."""
+    collector = get_batch_collector() if deferred_batch else None
+    if collector is not None:
+        try:
+            response = await collector.complete(kwargs)
+        except BatchRequestError as e:
+            logging.warning(f"Sending the request to {kwargs.get('model')} directly: {e}")
+        else:
+            _record_usage(response)
+            return response.choices[0].message
+    # The same attempts span the retries of the backoff and of the rate limiter
+    attempts = _StreamedAttempts(on_delta) if on_delta is not None else None
+    return await completion_with_backoff(on_delta=attempts, **kwargs)
+
+
+async def cached_completion(
+    cache_policy: CachePolicy,
+    on_delta: Optional[Callable[[str], None]] = None,
+    deferred_batch: bool = False,
+    **kwargs,
+) -> Message:
+    """Call `completion_with_backoff`, reusing the response to an identical earlier request.
+
+    Cached responses are used unless the policy is off, and new responses are only
+    stored with the read-write policy. Cache hits don't count any tokens and pass their
+    whole text to `on_delta` at once. With `deferred_batch`, requests made during a
+    batch run are sent through the provider's batch API, see `_batch.py`.
+    """
+    if cache_policy == CachePolicy.OFF:
+        return await _complete(on_delta, deferred_batch, **kwargs)
+
+    cache = get_response_cache()
+    key = response_cache_key(kwargs)
+    cached = await cache.get(key)
+    if cached is not None:
+        logging.info(f"Using the cached response for model {kwargs.get('model')}")
+        message_response = Message(**json.loads(cached))
+        if on_delta is not None and message_response.content:
+            on_delta(message_response.content)
+        return message_response
+
+    message_response = await _complete(on_delta, deferred_batch, **kwargs)
+    if cache_policy == CachePolicy.READ_WRITE and isinstance(message_response, Message):
+        await cache.set(key, json.dumps(message_response.model_dump()))
+    return message_response
+
+
 def sanitize_json_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
     """Make a JSON schema compatible with the LLM providers.
 
@@ -240,6 +418,9 @@ async def generate_text(
     tools: Optional[List[Dict[str, Any]]] = None,
     tool_choice: Optional[str] = "auto",
     thinking: Optional[Dict[str, Any]] = None,
+    cache_policy: CachePolicy = CachePolicy.OFF,
+    on_output_delta: Optional[Callable[[str, str], None]] = None,
+    deferred_batch: bool = False,
 ) -> Message:
     """Generate text using the specified LLM model.
 
@@ -261,6 +442,11 @@ async def generate_text(
                 tool_choice: {"type": "function", "function": {"name": "get_weather"}}
 
         thinking: Thinking parameters for the model
+        cache_policy: Whether to reuse and store responses in the LLM response cache
+        on_output_delta: Streams the response if given, and is called with the output
+            field and a fragment of its text as they are generated
+        deferred_batch: Whether the request may wait for a provider batch job when made
+            during a batch run
 
     """
     kwargs = {
@@ -338,6 +524,33 @@ async def generate_text(
                     + schema_for_prompt
                 )
 
+    on_delta: Optional[Callable[[str], None]] = None
+    reasoning_filter: Optional[BlockFilter] = None
+    if on_output_delta is not None:
+        if supports_json:
+            # The response is a JSON object; pass on the text of its fields
+            json_stream = JsonFieldStream()
+
+            def on_delta(fragment: str) -> None:
+                for field, text in json_stream.feed(fragment):
+                    on_output_delta(field, text)
+
+        elif model_info and model_info.constraints.supports_reasoning:
+            # The reasoning block is removed from the output below, and from its stream
+            start, wildcard, end = model_info.constraints.reasoning_separator.partition(".*?")
+            if wildcard and re.escape(start) == start and re.escape(end) == end:
+                reasoning_filter = BlockFilter(start, end)
+
+                def on_delta(fragment: str) -> None:
+                    text = reasoning_filter.feed(fragment)
+                    if text:
+                        on_output_delta("output", text)
+
+        else:
+            # The response is wrapped into the output field below
+            def on_delta(fragment: str) -> None:
+                on_output_delta("output", fragment)
+
     if json_mode and supports_json:
         if model_name.startswith("ollama"):
             if api_base is None:
@@ -414,11 +627,15 @@ async def generate_text(
                     msg["content"] = content
                 transformed_messages.append(msg)
             kwargs["messages"] = transformed_messages
-            message_response: Message = await completion_with_backoff(**kwargs)
+            message_response: Message = await cached_completion(
+                cache_policy, on_delta, deferred_batch, **kwargs
+            )
             response = message_response.content
             raw_response = response
         else:
-            message_response: Message = await completion_with_backoff(**kwargs)
+            message_response: Message = await cached_completion(
+                cache_policy, on_delta, deferred_batch, **kwargs
+            )
             response = message_response.content
             raw_response = response
     else:
@@ -439,11 +656,17 @@ async def generate_text(
                 tool_calls=[],
             )
         else:
-            message_response: Message = await completion_with_backoff(**kwargs)
+            message_response: Message = await cached_completion(
+                cache_policy, on_delta, deferred_batch, **kwargs
+            )
             response = message_response.content
 
     # For models that don't support JSON output, wrap the response in a JSON structure
     if not supports_json:
+        if reasoning_filter is not None and on_output_delta is not None:
+            held_text = reasoning_filter.flush()
+            if held_text:
+                on_output_delta("output", held_text)
         sanitized_response = response.replace('"', '\\"').replace("\n", "\\n")
         if model_info and model_info.constraints.supports_reasoning:
             separator = model_info.constraints.reasoning_separator
@@ -560,7 +783,12 @@ async def ollama_with_backoff(
         Either a string response or a validated Pydantic model instance
 
     """
-    client = AsyncClient(host=api_base)
+    client = get_pooled_client(
+        ("ollama", api_base),
+        lambda: AsyncClient(host=api_base, limits=http_limits()),
+        # The Ollama client has no close method of its own
+        lambda client: client._client.aclose(),
+    )
     try:
         response = await client.chat(
             model=model.replace("ollama/", ""),
@@ -568,6 +796,7 @@ async def ollama_with_backoff(
             format=format,
             options=(options or OllamaOptions()).to_dict(),
         )
+        record_token_usage((response.prompt_eval_count or 0) + (response.eval_count or 0))
         return response.message.content
     except Exception as e:
         logging.error(f"Error calling Ollama API: {e}")
@@ -68,6 +68,8 @@ class AgentNode(SingleLLMCallNode):
 
     name = "agent_node"
     display_name = "Agent"
+    # The tools it calls can have side effects
+    reusable = False
     config_model = AgentNodeConfig
     input_model = AgentNodeInput
     output_model = AgentNodeOutput
@@ -102,7 +104,7 @@ class AgentNode(SingleLLMCallNode):
         self.tools_instances: Dict[str, BaseNode] = {}
         for tool in tools:
             # Create node instance
-            tool_node_instance = NodeFactory.create_node(
+            tool_node_instance = NodeFactory.get_prototype(
                 node_name=tool.title,
                 node_type_name=tool.node_type,
                 config=tool.config,
@@ -130,7 +132,7 @@ class AgentNode(SingleLLMCallNode):
             if isinstance(tool, BaseNode):
                 tool_schema = tool.function_schema
             else:
-                tool_node_instance = NodeFactory.create_node(
+                tool_node_instance = NodeFactory.get_prototype(
                     node_name=tool.title,
                     node_type_name=tool.node_type,
                     config=tool.config,
@@ -154,7 +156,7 @@ class AgentNode(SingleLLMCallNode):
             raise ValueError(f"Tool {tool_name} not found in tools dictionary")
 
         # Create node instance
-        tool_node_instance = NodeFactory.create_node(
+        tool_node_instance = NodeFactory.create_node_from_prototype(
             node_name=tool_node.title,
             node_type_name=tool_node.node_type,
             config=tool_node.config,
@@ -270,6 +272,9 @@ class AgentNode(SingleLLMCallNode):
                     output_json_schema=self.config.output_json_schema,
                     thinking=thinking_params,
                     tools=self.tools_schemas,
+                    cache_policy=self.config.cache_policy,
+                    on_output_delta=self._output_delta_handler(),
+                    deferred_batch=self.config.deferred_batch,
                 )
                 print(f"[DEBUG] Iteration {num_iterations + 1} response: {message_response}")
                 # add the response to the messages
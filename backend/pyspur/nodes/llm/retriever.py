@@ -4,9 +4,10 @@ from typing import Dict, List
 from jinja2 import Template
 from loguru import logger
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ...database import get_db
+from ...database import get_async_sessionmaker
 from ...models.dc_and_vi_model import VectorIndexModel
 from ...rag.embedder import EmbeddingModels
 from ...rag.vector_index import VectorIndex
@@ -68,16 +69,15 @@ class RetrieverNode(BaseNode):
 
     name = "retriever_node"
     display_name = "Retriever"
+    reusable = True
     config_model = RetrieverNodeConfig
     input_model = RetrieverNodeInput
     output_model = RetrieverNodeOutput
 
-    async def validate_index(self, db: Session) -> None:
+    async def validate_index(self, db: AsyncSession) -> VectorIndexModel:
         """Validate that the vector index exists and is ready"""
-        index = (
-            db.query(VectorIndexModel)
-            .filter(VectorIndexModel.id == self.config.vector_index_id)
-            .first()
+        index = await db.scalar(
+            select(VectorIndexModel).where(VectorIndexModel.id == self.config.vector_index_id)
         )
         if not index:
             raise ValueError(f"Vector index {self.config.vector_index_id} not found")
@@ -85,23 +85,13 @@ class RetrieverNode(BaseNode):
             raise ValueError(
                 f"Vector index {self.config.vector_index_id} is not ready (status: {index.status})"
             )
+        return index
 
     async def run(self, input: BaseModel) -> BaseModel:
-        # Get database session
-        db = next(get_db())
-
         try:
-            # Validate index exists and is ready
-            await self.validate_index(db)
-
-            # Get vector index configuration from database
-            vector_index_model = (
-                db.query(VectorIndexModel)
-                .filter(VectorIndexModel.id == self.config.vector_index_id)
-                .first()
-            )
-            if not vector_index_model:
-                raise ValueError(f"Vector index {self.config.vector_index_id} not found")
+            # Load the index configuration; the connection is released before retrieval
+            async with get_async_sessionmaker()() as db:
+                vector_index_model = await self.validate_index(db)
 
             logger.info(
                 f"[DEBUG] Vector index configuration: {vector_index_model.embedding_config}"
@@ -162,8 +152,6 @@ class RetrieverNode(BaseNode):
             )
         except Exception as e:
             raise ValueError(f"Error retrieving from vector index: {str(e)}")
-        finally:
-            db.close()
 
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
 import json
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 
 from dotenv import load_dotenv
 from jinja2 import Template
@@ -12,6 +12,7 @@ from ..base import (
     BaseNodeInput,
     BaseNodeOutput,
 )
+from ._response_cache import CachePolicy
 from ._utils import LLMModels, ModelInfo, create_messages, generate_text
 
 load_dotenv()
@@ -130,6 +131,21 @@ class SingleLLMCallNodeConfig(BaseNodeConfig):
         None,
         description="Input variable containing message history (e.g., 'message_history')",
     )
+    cache_policy: CachePolicy = Field(
+        CachePolicy.OFF,
+        description=(
+            "Whether to reuse the responses to identical LLM requests (read_only), also"
+            " store new responses for reuse (read_write), or always call the model (off)"
+        ),
+    )
+    deferred_batch: bool = Field(
+        False,
+        description=(
+            "In batch runs over a dataset, send the requests of all rows as jobs to the"
+            " provider's batch API (OpenAI and Anthropic), at about half the cost but"
+            " taking minutes to hours"
+        ),
+    )
 
 
 class SingleLLMCallNodeInput(BaseNodeInput):
@@ -155,6 +171,7 @@ class SingleLLMCallNode(BaseNode):
 
     name = "single_llm_call_node"
     display_name = "Single LLM Call"
+    reusable = True
     config_model = SingleLLMCallNodeConfig
     input_model = SingleLLMCallNodeInput
     output_model = SingleLLMCallNodeOutput
@@ -168,6 +185,12 @@ class SingleLLMCallNode(BaseNode):
                 SingleLLMCallNodeOutput,
             )  # type: ignore
 
+    def _output_delta_handler(self) -> Optional[Callable[[str, str], None]]:
+        """Get the handler streaming the generated output fields, if the run is streamed."""
+        if not self.streams_tokens:
+            return None
+        return lambda field, text: self.emit_token_delta(text, field=field)
+
     async def run(self, input: BaseModel) -> BaseModel:
         # Grab the entire dictionary from the input
         raw_input_dict = input.model_dump()
@@ -248,6 +271,9 @@ class SingleLLMCallNode(BaseNode):
                 url_variables=url_vars,
                 output_json_schema=self.config.output_json_schema,
                 thinking=thinking_params,
+                cache_policy=self.config.cache_policy,
+                on_output_delta=self._output_delta_handler(),
+                deferred_batch=self.config.deferred_batch,
             )
 
             # Extract content from Message object
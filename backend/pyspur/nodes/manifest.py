@@ -0,0 +1,128 @@
+"""Static manifest of the built-in node types.
+
+The manifest holds the registrations of the decorated nodes and the schemas served by
+`/node/supported_types/`, so neither requires importing the node modules and their
+dependencies. Node modules are then only imported when a node is created.
+
+Regenerate it after adding or changing a node type:
+
+    python -m pyspur.nodes.manifest
+"""
+
+import functools
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from loguru import logger
+
+from ..schemas.node_type_schemas import NodeTypeSchema
+from .factory import NodeFactory
+from .llm._model_info import LLMModels
+from .registry import TOOL_FUNCTION_CATEGORY, NodeRegistry
+
+MANIFEST_PATH = Path(__file__).resolve().parent / "node_manifest.json"
+MANIFEST_VERSION = 1
+
+# Set to false to discover the node modules on startup instead, e.g. while developing nodes
+USE_NODE_MANIFEST = os.getenv("USE_NODE_MANIFEST", "true").lower() == "true"
+
+
+def node_type_schema(node_type: NodeTypeSchema) -> Dict[str, Any]:
+    """Build the schema of a node type served by `/node/supported_types/`."""
+    node_class = node_type.node_class
+    try:
+        input_schema = node_class.input_model.model_json_schema()
+    except AttributeError:
+        input_schema = {}
+    try:
+        output_schema = node_class.output_model.model_json_schema()
+    except AttributeError:
+        output_schema = {}
+
+    # Get the config schema and update its title with the display name
+    config_schema = node_class.config_model.model_json_schema()
+    config_schema["title"] = node_type.display_name
+    has_fixed_output = node_class.config_model.model_fields["has_fixed_output"].default
+
+    node_schema: Dict[str, Any] = {
+        "name": node_type.node_type_name,
+        "input": input_schema,
+        "output": output_schema,
+        "config": config_schema,
+        "visual_tag": node_class.get_default_visual_tag().model_dump(),
+        "has_fixed_output": has_fixed_output,
+    }
+
+    # Add model constraints if this is an LLM node
+    if node_type.node_type_name in ["LLMNode", "SingleLLMCallNode"]:
+        model_constraints = {}
+        for model_enum in LLMModels:
+            model_info = LLMModels.get_model_info(model_enum.value)
+            if model_info:
+                model_constraints[model_enum.value] = model_info.constraints.model_dump()
+        node_schema["model_constraints"] = model_constraints
+
+    # Add the logo if available
+    logo = node_type.logo
+    if logo:
+        node_schema["logo"] = logo
+
+    category = node_type.category
+    if category:
+        node_schema["category"] = category
+
+    return node_schema
+
+
+def build_manifest() -> Dict[str, Any]:
+    """Import all node modules and collect the manifest from them."""
+    NodeRegistry.discover_nodes()
+    registered_nodes = {
+        category: [node_info.model_dump() for node_info in nodes]
+        for category, nodes in NodeRegistry.get_registered_nodes().items()
+        if category != TOOL_FUNCTION_CATEGORY
+    }
+    supported_types: Dict[str, List[Dict[str, Any]]] = {
+        group_name: [node_type_schema(node_type) for node_type in node_types]
+        for group_name, node_types in NodeFactory.get_all_node_types().items()
+        if group_name != TOOL_FUNCTION_CATEGORY
+    }
+    return jsonable_encoder(
+        {
+            "manifest_version": MANIFEST_VERSION,
+            "registered_nodes": registered_nodes,
+            "supported_types": supported_types,
+        },
+        # Sorted, so regenerating the manifest gives the same file
+        custom_encoder={set: sorted, frozenset: sorted},
+    )
+
+
+def write_manifest(path: Path = MANIFEST_PATH) -> None:
+    """Regenerate the manifest file."""
+    manifest = build_manifest()
+    path.write_text(json.dumps(manifest, indent=2) + "\n")
+    logger.info(f"Wrote the node manifest to {path}")
+
+
+@functools.lru_cache(maxsize=1)
+def load_manifest() -> Optional[Dict[str, Any]]:
+    """Load the manifest, or None if it is disabled, missing or of another version."""
+    if not USE_NODE_MANIFEST:
+        return None
+    try:
+        manifest = json.loads(MANIFEST_PATH.read_text())
+    except (OSError, ValueError) as e:
+        logger.warning(f"Failed to load the node manifest, discovering nodes instead: {e}")
+        return None
+    if manifest.get("manifest_version") != MANIFEST_VERSION:
+        logger.warning("The node manifest is outdated, discovering nodes instead")
+        return None
+    return manifest
+
+
+if __name__ == "__main__":
+    write_manifest()
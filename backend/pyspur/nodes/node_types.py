@@ -239,6 +239,14 @@ DEPRECATED_NODE_TYPES = [
     },
 ]
 
+# Supported node types by name, so lookups don't scan the lists above
+CONFIGURED_NODE_TYPES: Dict[str, Dict[str, str]] = {
+    node_type["node_type_name"]: node_type
+    for node_types in SUPPORTED_NODE_TYPES.values()
+    for node_type in node_types
+}
+DEPRECATED_NODE_TYPE_NAMES = {node_type["node_type_name"] for node_type in DEPRECATED_NODE_TYPES}
+
 
 def get_all_node_types() -> Dict[str, List[NodeTypeSchema]]:
     """Return a dictionary of all available node types grouped by category."""
@@ -254,20 +262,8 @@ def get_all_node_types() -> Dict[str, List[NodeTypeSchema]]:
 def is_valid_node_type(node_type_name: str) -> bool:
     """Check if a node type is valid (supported, deprecated, or registered via decorator)."""
     # Check configured nodes first
-    for node_types in SUPPORTED_NODE_TYPES.values():
-        for node_type in node_types:
-            if node_type["node_type_name"] == node_type_name:
-                return True
-
-    for node_type in DEPRECATED_NODE_TYPES:
-        if node_type["node_type_name"] == node_type_name:
-            return True
+    if node_type_name in CONFIGURED_NODE_TYPES or node_type_name in DEPRECATED_NODE_TYPE_NAMES:
+        return True
 
     # Check registry for decorator-registered nodes
-    registered_nodes = NodeRegistry.get_registered_nodes()
-    for nodes in registered_nodes.values():
-        for node in nodes:
-            if node.node_type_name == node_type_name:
-                return True
-
-    return False
+    return NodeRegistry.get_node_info(node_type_name) is not None
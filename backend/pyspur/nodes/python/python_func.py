@@ -40,10 +40,10 @@ class PythonFuncNode(BaseNode):
     output_model = PythonFuncNodeOutput
 
     def setup(self) -> None:
-        return super().setup()
+        super().setup()
+        self.output_model = self.create_output_model_class(self.config.output_schema)
 
     async def run(self, input: BaseModel) -> BaseModel:
-        self.output_model = self.create_output_model_class(self.config.output_schema)
         # Prepare the execution environment
         exec_globals: Dict[str, Any] = {}
         exec_locals: Dict[str, Any] = {}
@@ -2,6 +2,8 @@
 import importlib
 import importlib.util
 import os
+import sys
+import threading
 import traceback
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Set, Type, Union
@@ -17,11 +19,29 @@ class NodeInfo(NodeTypeSchema):
     subcategory: Optional[str] = None
 
 
+# Category of the nodes created from tool functions in PROJECT_ROOT/tools
+TOOL_FUNCTION_CATEGORY = "Custom Tools"
+
+
 class NodeRegistry:
+    """Registry of the node types registered with the @NodeRegistry.register decorator.
+
+    Node modules are discovered once per process, on first use. If the node manifest is
+    available, the registrations are read from it and the node modules are only imported
+    when a node is created. Afterwards lookups go through an index by node type name and
+    don't touch the filesystem. Changes to the
+    tools directory are picked up by `reload_tool_functions`. `version` changes whenever
+    the set of registered nodes does, so callers can invalidate what they derived from it.
+    """
+
     _nodes: Dict[str, List[NodeInfo]] = {}
     _decorator_registered_classes: Set[Type[BaseNode]] = (
         set()
     )  # Track classes registered via decorator
+    _index: Dict[str, NodeInfo] = {}
+    _version: int = 0
+    _discovered: bool = False
+    _discovery_lock = threading.RLock()
 
     @classmethod
     def register(
@@ -79,8 +99,12 @@ class NodeRegistry:
                 subcategory=subcategory,
             )
 
-            # Handle positioning
+            # Nodes read from the manifest are registered before their module is imported
             nodes_list = cls._nodes[category]
+            if any(n.node_type_name == node_class.__name__ for n in nodes_list):
+                return node_class
+
+            # Handle positioning
             if position is not None:
                 if isinstance(position, int):
                     # Insert at specific index
@@ -111,6 +135,9 @@ class NodeRegistry:
                     logger.debug(f"Registered node {node_class.__name__} in category {category}")
                     cls._decorator_registered_classes.add(node_class)
 
+            if any(n is node_info for n in nodes_list):
+                cls._add_to_index(node_info)
+
             return node_class
 
         return decorator
@@ -120,9 +147,73 @@ class NodeRegistry:
         cls,
     ) -> Dict[str, List[NodeInfo]]:
         """Get all registered nodes."""
-        cls.discover_nodes()
+        cls.ensure_discovered()
         return cls._nodes
 
+    @classmethod
+    def get_node_info(cls, node_type_name: str) -> Optional[NodeInfo]:
+        """Get the registration of a node type, or None if it isn't registered."""
+        cls.ensure_discovered()
+        return cls._index.get(node_type_name)
+
+    @classmethod
+    def version(cls) -> int:
+        """Get a counter that increases whenever the registered nodes change."""
+        return cls._version
+
+    @classmethod
+    def ensure_discovered(cls) -> None:
+        """Discover the nodes, unless that already happened in this process."""
+        if cls._discovered:
+            return
+        from .manifest import load_manifest
+
+        with cls._discovery_lock:
+            if cls._discovered:
+                return
+            manifest = load_manifest()
+            if manifest is None:
+                cls.discover_nodes()
+                return
+            for category, nodes in manifest["registered_nodes"].items():
+                nodes_list = cls._nodes.setdefault(category, [])
+                for node in nodes:
+                    node_info = NodeInfo.model_validate(node)
+                    if not any(n.node_type_name == node_info.node_type_name for n in nodes_list):
+                        nodes_list.append(node_info)
+                        cls._add_to_index(node_info)
+            cls.discover_tool_functions()
+            cls._discovered = True
+
+    @classmethod
+    def reload_tool_functions(cls) -> int:
+        """Drop the registered tool function nodes and discover the tools directory again.
+
+        The tool modules are re-imported, so edited, added and removed tools take effect.
+
+        Returns:
+            The number of tool function nodes registered afterwards
+
+        """
+        with cls._discovery_lock:
+            for node_info in cls._nodes.pop(TOOL_FUNCTION_CATEGORY, []):
+                if cls._index.get(node_info.node_type_name) is node_info:
+                    del cls._index[node_info.node_type_name]
+            for module_name in list(sys.modules):
+                if module_name == "tools" or module_name.startswith("tools."):
+                    del sys.modules[module_name]
+            importlib.invalidate_caches()
+            cls.discover_tool_functions()
+            cls._version += 1
+            return len(cls._nodes.get(TOOL_FUNCTION_CATEGORY, []))
+
+    @classmethod
+    def _add_to_index(cls, node_info: NodeInfo) -> None:
+        """Make a registered node findable by its type name; the first registration wins."""
+        if node_info.node_type_name not in cls._index:
+            cls._index[node_info.node_type_name] = node_info
+            cls._version += 1
+
     @classmethod
     def _discover_in_directory(cls, base_path: Path, package_prefix: str) -> None:
         """Recursively discover nodes in a directory and its subdirectories.
@@ -156,6 +247,12 @@ class NodeRegistry:
             package_path: The base package path to search for nodes
 
         """
+        with cls._discovery_lock:
+            cls._discover_nodes(package_path)
+            cls._discovered = True
+
+    @classmethod
+    def _discover_nodes(cls, package_path: str) -> None:
         try:
             package = importlib.import_module(package_path)
             if not hasattr(package, "__file__") or package.__file__ is None:
@@ -208,7 +305,7 @@ class NodeRegistry:
         def _register_tool_function_node(func: ToolFunction, category: str) -> None:
             """Register a tool function node in the NodeRegistry."""
             node_class = func.node_class
-            category = "Custom Tools"
+            category = TOOL_FUNCTION_CATEGORY
             if category not in cls._nodes:
                 cls._nodes[category] = []
 
@@ -222,6 +319,7 @@ class NodeRegistry:
 
             if not any(n.node_type_name == node_class.__name__ for n in cls._nodes[category]):
                 cls._nodes[category].append(node_info)
+                cls._add_to_index(node_info)
                 nonlocal registered_tools
                 registered_tools += 1
                 logger.debug(
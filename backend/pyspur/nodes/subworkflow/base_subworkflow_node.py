@@ -21,6 +21,7 @@ class BaseSubworkflowNodeConfig(BaseNodeConfig):
 class BaseSubworkflowNode(BaseNode, ABC):
     name: str = "static_workflow_node"
     config_model = BaseSubworkflowNodeConfig
+    runs_subworkflow = True
 
     def setup(self) -> None:
         super().setup()
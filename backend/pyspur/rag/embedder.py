@@ -2,13 +2,15 @@ import logging
 from enum import Enum
 from typing import Any, Callable, Dict, List, Optional, TypeAlias, Union
 
+import litellm
 import numpy as np
 import numpy.typing as npt
 from litellm import aembedding
 from litellm.types.utils import EmbeddingResponse
 from pydantic import BaseModel, Field
-from tenacity import stop_after_attempt, wait_random_exponential
+from tenacity import retry_if_not_exception_type, stop_after_attempt, wait_random_exponential
 
+from ..nodes.llm._rate_limiter import call_with_rate_limit, estimate_tokens
 from ..nodes.llm._utils import async_retry
 
 EmbeddingArray: TypeAlias = npt.NDArray[np.float32]
@@ -224,9 +226,11 @@ class EmbeddingModels(str, Enum):
         return model_registry.get(model_id)
 
 
+# Rate limit errors are retried by the rate limiter
 @async_retry(
     wait=wait_random_exponential(min=30, max=120),
     stop=stop_after_attempt(3),
+    retry=retry_if_not_exception_type(litellm.exceptions.RateLimitError),
 )
 async def get_single_text_embedding(
     text: str,
@@ -266,7 +270,9 @@ async def get_single_text_embedding(
                 )
             kwargs["encoding_format"] = encoding_format
 
-        response = await aembedding(**kwargs)
+        response = await call_with_rate_limit(
+            lambda: aembedding(**kwargs), model, estimate_tokens(text)
+        )
         return response.data[0]["embedding"]
 
     except Exception as e:
@@ -274,9 +280,11 @@ async def get_single_text_embedding(
         raise
 
 
+# Rate limit errors are retried by the rate limiter
 @async_retry(
     wait=wait_random_exponential(min=30, max=120),
     stop=stop_after_attempt(3),
+    retry=retry_if_not_exception_type(litellm.exceptions.RateLimitError),
 )
 async def get_multiple_text_embeddings(
     docs: List[Any],
@@ -331,7 +339,9 @@ async def get_multiple_text_embeddings(
             logging.debug(f"[DEBUG] First text in batch (truncated): {batch[0][:100]}...")
             logging.debug(f"[DEBUG] Using model: {model}")
 
-            response: EmbeddingResponse = await aembedding(**kwargs)
+            response: EmbeddingResponse = await call_with_rate_limit(
+                lambda kwargs=kwargs: aembedding(**kwargs), model, estimate_tokens(batch)
+            )
             batch_embeddings: List[List[float]] = [item["embedding"] for item in response.data]
             all_embeddings.extend(batch_embeddings)
             logging.debug(f"[DEBUG] Batch embeddings length: {len(batch_embeddings)}")
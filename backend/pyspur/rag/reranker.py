@@ -2,10 +2,12 @@ import logging
 from enum import Enum
 from typing import Any, Callable, Dict, List, Optional
 
+import litellm
 from litellm import arerank
 from pydantic import BaseModel, Field
-from tenacity import stop_after_attempt, wait_random_exponential
+from tenacity import retry_if_not_exception_type, stop_after_attempt, wait_random_exponential
 
+from ..nodes.llm._rate_limiter import call_with_rate_limit, estimate_tokens
 from ..nodes.llm._utils import async_retry
 
 
@@ -45,9 +47,11 @@ class RerankerModels(str, Enum):
         return model_registry.get(model_id)
 
 
+# Rate limit errors are retried by the rate limiter
 @async_retry(
     wait=wait_random_exponential(min=30, max=120),
     stop=stop_after_attempt(3),
+    retry=retry_if_not_exception_type(litellm.exceptions.RateLimitError),
 )
 async def rerank_documents_by_query(
     query: str,
@@ -92,7 +96,11 @@ async def rerank_documents_by_query(
             if api_key:
                 kwargs["api_key"] = api_key
 
-            response = await arerank(**kwargs)
+            response = await call_with_rate_limit(
+                lambda kwargs=kwargs: arerank(**kwargs),
+                model,
+                estimate_tokens(query) * len(batch) + estimate_tokens(batch),
+            )
 
             # Process results
             batch_results = []
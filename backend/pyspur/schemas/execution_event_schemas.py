@@ -0,0 +1,40 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ExecutionEventType(str, Enum):
+    NODE_STARTED = "node_started"
+    NODE_COMPLETED = "node_completed"
+    NODE_FAILED = "node_failed"
+    NODE_PAUSED = "node_paused"
+    NODE_SKIPPED = "node_skipped"
+    TOKEN_DELTA = "token_delta"
+    RUN_COMPLETED = "run_completed"
+    RUN_PAUSED = "run_paused"
+    RUN_FAILED = "run_failed"
+
+
+class ExecutionEventSchema(BaseModel):
+    """An event emitted while a workflow is being executed.
+
+    Node events carry the node they refer to; run events are emitted once, as the last
+    event of a stream.
+    """
+
+    type: ExecutionEventType
+    timestamp: datetime = Field(default_factory=datetime.now)
+    node_id: Optional[str] = None
+    node_type: Optional[str] = None
+    node_title: Optional[str] = None
+    # Serialized node output for NODE_COMPLETED / NODE_PAUSED, or the outputs of all
+    # nodes (by node id) for RUN_COMPLETED
+    output: Optional[Dict[str, Any]] = None
+    # Generated text fragment for TOKEN_DELTA, and the output field it belongs to if known
+    delta: Optional[str] = None
+    field: Optional[str] = None
+    # Pause message for NODE_PAUSED / RUN_PAUSED
+    message: Optional[str] = None
+    error: Optional[str] = None
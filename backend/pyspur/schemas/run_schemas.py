@@ -1,11 +1,11 @@
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, computed_field
+from pydantic import BaseModel, Field, computed_field
 
 from ..models.run_model import RunStatus
 from ..nodes.logic.human_intervention import PauseAction
-from .task_schemas import TaskResponseSchema, TaskStatus
+from .task_schemas import TaskResponseSchema
 from .workflow_schemas import WorkflowVersionResponseSchema
 
 
@@ -13,24 +13,36 @@ class StartRunRequestSchema(BaseModel):
     initial_inputs: Optional[Dict[str, Dict[str, Any]]] = None
     parent_run_id: Optional[str] = None
     files: Optional[Dict[str, List[str]]] = None  # Maps node_id to list of file paths
+    # Reuse outputs of earlier runs for nodes whose type, config and inputs are unchanged
+    reuse_outputs: bool = False
+    # Seconds the run may take before it is stopped and marked as failed
+    timeout: Optional[float] = Field(default=None, gt=0)
 
 
-class RunResponseSchema(BaseModel):
+class RunSummaryResponseSchema(BaseModel):
+    """A run without its tasks; everything here is read from the runs table alone."""
+
     id: str
     workflow_id: str
     workflow_version_id: Optional[str] = None
-    workflow_version: Optional[WorkflowVersionResponseSchema] = None
     status: RunStatus
     start_time: datetime
     end_time: Optional[datetime] = None
     initial_inputs: Optional[Dict[str, Dict[str, Any]]] = None
     outputs: Optional[Dict[str, Dict[str, Any]]] = None
-    tasks: List[TaskResponseSchema] = []
     parent_run_id: Optional[str] = None
     run_type: str = "interactive"
     output_file_id: Optional[str] = None
     input_dataset_id: Optional[str] = None
     message: Optional[str] = None  # Add message field for additional info
+    pending_tasks: int = 0
+    running_tasks: int = 0
+    completed_tasks: int = 0
+    failed_tasks: int = 0
+    canceled_tasks: int = 0
+    paused_tasks: int = 0
+    total_tokens: int = 0
+    subrun_summary: Optional[Dict[str, Any]] = None
 
     @computed_field
     def duration(self) -> Optional[float]:
@@ -43,20 +55,34 @@ class RunResponseSchema(BaseModel):
 
     @computed_field(return_type=float)
     def percentage_complete(self):
-        if not self.tasks:
+        total_tasks = (
+            self.pending_tasks
+            + self.running_tasks
+            + self.completed_tasks
+            + self.failed_tasks
+            + self.canceled_tasks
+            + self.paused_tasks
+        )
+        if not total_tasks:
             return 0
-        completed_tasks = sum(1 for task in self.tasks if task.status == TaskStatus.COMPLETED)
-        return completed_tasks / len(self.tasks) * 100
+        return self.completed_tasks / total_tasks * 100
 
     class Config:
         from_attributes = True
 
 
+class RunResponseSchema(RunSummaryResponseSchema):
+    workflow_version: Optional[WorkflowVersionResponseSchema] = None
+    tasks: List[TaskResponseSchema] = []
+
+
 class PartialRunRequestSchema(BaseModel):
     node_id: str
     rerun_predecessors: bool = False
     initial_inputs: Optional[Dict[str, Dict[str, Any]]] = None
     partial_outputs: Optional[Dict[str, Dict[str, Any] | List[Dict[str, Any]]]] = None
+    # Reuse outputs of earlier runs for nodes whose type, config and inputs are unchanged
+    reuse_outputs: bool = False
 
 
 class ResumeRunRequestSchema(BaseModel):
@@ -0,0 +1,142 @@
+"""Process-wide pools of HTTP connections.
+
+Creating a client per call pays a TCP and TLS handshake every time and leaves the
+sockets in TIME_WAIT, which exhausts the ephemeral ports under load. Clients are
+instead shared: async clients per host and event loop (their connections can't move
+between loops), and `requests` sessions for the SDKs that are synchronous. Every host
+gets its own pool, so HTTP_MAX_CONNECTIONS_PER_HOST bounds the connections to it.
+
+The clients are closed by `close_http_clients` when the app shuts down.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+T = TypeVar("T")
+
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+# Seconds an idle connection is kept open for reuse
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+# Default timeout of requests; calls can pass their own
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "60"))
+# Negotiate HTTP/2 with the hosts that support it
+HTTP_ENABLE_HTTP2 = os.getenv("HTTP_ENABLE_HTTP2", "true").lower() == "true"
+# Hosts whose pools the synchronous session keeps
+HTTP_MAX_SYNC_HOSTS = int(os.getenv("HTTP_MAX_SYNC_HOSTS", "32"))
+
+# Client, its event loop and how to close it, by key and loop
+_PooledClient = Tuple[asyncio.AbstractEventLoop, Any, Callable[[Any], Awaitable[None]]]
+_clients: Dict[Tuple[Hashable, int], _PooledClient] = {}
+_clients_lock = threading.Lock()
+_sessions: Dict[str, requests.Session] = {}
+
+
+def http_limits() -> httpx.Limits:
+    """Get the connection limits of a pool to one host."""
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS_PER_HOST,
+        max_keepalive_connections=HTTP_MAX_CONNECTIONS_PER_HOST,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def _http2_available() -> bool:
+    if not HTTP_ENABLE_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("HTTP/2 is disabled, the h2 package is not installed")
+        return False
+    return True
+
+
+def get_pooled_client(
+    key: Hashable, factory: Callable[[], T], close: Callable[[T], Awaitable[None]]
+) -> T:
+    """Get the client of the running event loop for `key`, creating it on first use.
+
+    Args:
+        key: Identifies the client, e.g. the SDK and the host it connects to
+        factory: Creates the client
+        close: Closes the client when the app shuts down
+
+    """
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        entry = _clients.get((key, id(loop)))
+        if entry is not None and entry[0] is loop:
+            return entry[1]
+        # Clients of loops that ended can't be used or closed anymore
+        for client_key, (client_loop, _, _) in list(_clients.items()):
+            if client_loop.is_closed():
+                del _clients[client_key]
+        client = factory()
+        _clients[(key, id(loop))] = (loop, client, close)
+        return client
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def get_http_client(url: str) -> httpx.AsyncClient:
+    """Get the pooled client for requests to the host of `url`."""
+    origin = _origin(url)
+    return get_pooled_client(
+        ("httpx", origin),
+        lambda: httpx.AsyncClient(
+            limits=http_limits(),
+            timeout=HTTP_TIMEOUT_SECONDS,
+            http2=_http2_available(),
+        ),
+        lambda client: client.aclose(),
+    )
+
+
+def get_requests_session(name: str = "shared") -> requests.Session:
+    """Get a session for synchronous SDKs, with a pool per host.
+
+    SDKs that change the headers or cookies of their session, like praw which sets its
+    User-Agent, use a session of their own `name` so the changes don't leak into the
+    requests of others.
+    """
+    with _clients_lock:
+        session = _sessions.get(name)
+        if session is None:
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_MAX_SYNC_HOSTS, pool_maxsize=HTTP_MAX_CONNECTIONS_PER_HOST
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[name] = session
+        return session
+
+
+async def close_http_clients() -> None:
+    """Close the clients of the running event loop and the synchronous sessions."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        entries = list(_clients.values())
+        _clients.clear()
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for client_loop, client, close in entries:
+        if client_loop is not loop:
+            continue
+        try:
+            await close(client)
+        except Exception as e:
+            logger.warning(f"Failed to close the HTTP client {client}: {e}")
+    for session in sessions:
+        session.close()
@@ -0,0 +1,41 @@
+"""Tests for the node_management.py module."""
+
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from pyspur.api.node_management import get_supported_types_payload, router
+from pyspur.nodes.registry import NodeRegistry
+
+app = FastAPI()
+app.include_router(router, prefix="/node")
+client = TestClient(app)
+
+
+def test_supported_types_revalidate_with_etag() -> None:
+    """Test the node types are served with an ETag and a matching request gets a 304."""
+    response = client.get("/node/supported_types/")
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert "SingleLLMCallNode" in [node["name"] for node in response.json()["AI"]]
+
+    etag = response.headers["ETag"]
+    response = client.get("/node/supported_types/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = client.get("/node/supported_types/", headers={"If-None-Match": '"outdated"'})
+    assert response.status_code == 200
+
+
+def test_supported_types_are_rebuilt_for_a_new_registry_version() -> None:
+    """Test the cached payload is reused until the node registry changes."""
+    body, etag = get_supported_types_payload()
+    assert get_supported_types_payload()[0] is body
+
+    NodeRegistry.reload_tool_functions()
+    new_body, new_etag = get_supported_types_payload()
+    assert new_body is not body
+    assert json.loads(new_body) == json.loads(body)
+    assert new_etag == etag
@@ -0,0 +1,48 @@
+"""Tests for the pagination.py module."""
+
+from datetime import datetime
+from typing import List
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from pyspur.api.pagination import NEXT_CURSOR_HEADER, finish_page, keyset_page
+from pyspur.models.run_model import RunModel
+
+
+def test_cursor_pages_cover_all_rows_once(db_session: Session) -> None:
+    """Test following the next-page cursor visits every run once, newest first."""
+    # Several runs share a start time, so the id has to break ties
+    start_times = [datetime(2025, 1, day) for day in (1, 2, 2, 2, 3, 4, 4)]
+    db_session.add_all(
+        RunModel(workflow_id="S1", workflow_version_id="1", run_type="batch", start_time=start_time)
+        for start_time in start_times
+    )
+    db_session.commit()
+
+    seen: List[RunModel] = []
+    cursor = None
+    while True:
+        response = Response()
+        rows = db_session.scalars(
+            keyset_page(select(RunModel), RunModel.start_time, RunModel._intid, 3, cursor=cursor)
+        ).all()
+        page = finish_page(rows, 3, response, "start_time")
+        seen.extend(page)
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    assert len(seen) == len(start_times)
+    assert len({run._intid for run in seen}) == len(start_times)
+    keys = [(run.start_time, run._intid) for run in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_invalid_cursor_is_rejected() -> None:
+    """Test a malformed cursor is a client error."""
+    with pytest.raises(HTTPException) as exc_info:
+        keyset_page(select(RunModel), RunModel.start_time, RunModel._intid, 10, cursor="nope")
+    assert exc_info.value.status_code == 400
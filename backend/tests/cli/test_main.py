@@ -154,3 +154,37 @@ def test_init_command_error_handling(mock_copy_template: MagicMock, runner: CliR
 
     assert result.exit_code == 1
     assert "Error initializing project: Test error" in result.stdout
+
+
+def test_prune_runs_command_builds_policy_from_options(runner: CliRunner) -> None:
+    """Test the prune-runs command applies a policy built from its options."""
+    from pyspur.execution.retention import RetentionPolicy, RetentionResult
+
+    with (
+        patch("pyspur.cli.main.load_environment"),
+        patch(
+            "pyspur.execution.retention.apply_retention",
+            return_value=RetentionResult(deleted_runs=3),
+        ) as mock_apply,
+    ):
+        result: Result = runner.invoke(
+            app, ["prune-runs", "--older-than-days", "30", "--run-type", "batch", "--dry-run"]
+        )
+
+    assert result.exit_code == 0
+    assert "Would delete 3 runs" in result.stdout
+    mock_apply.assert_called_once_with(
+        [RetentionPolicy(run_type="batch", max_age_days=30)], dry_run=True
+    )
+
+
+def test_prune_runs_command_requires_a_policy(runner: CliRunner) -> None:
+    """Test the prune-runs command fails without options or configured policies."""
+    with (
+        patch("pyspur.cli.main.load_environment"),
+        patch("pyspur.execution.retention.load_retention_policies", return_value=[]),
+    ):
+        result: Result = runner.invoke(app, ["prune-runs"])
+
+    assert result.exit_code == 1
+    assert "No retention policy given" in result.stdout
@@ -1,10 +1,51 @@
 """Common test fixtures for PySpur backend tests."""
 
+from pathlib import Path
+from typing import Iterator
+
 import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
 from typer.testing import CliRunner
 
+from pyspur.models.base_model import BaseModel
+from pyspur.models.dataset_model import DatasetModel  # type: ignore # noqa: F401
+from pyspur.models.dc_and_vi_model import (  # type: ignore # noqa: F401
+    DocumentCollectionModel,
+    VectorIndexModel,
+)
+from pyspur.models.eval_run_model import EvalRunModel  # type: ignore # noqa: F401
+from pyspur.models.output_file_model import OutputFileModel  # type: ignore # noqa: F401
+from pyspur.models.run_model import RunModel  # type: ignore # noqa: F401
+from pyspur.models.slack_agent_model import SlackAgentModel  # type: ignore # noqa: F401
+from pyspur.models.task_model import TaskModel  # type: ignore # noqa: F401
+from pyspur.models.user_session_model import (  # type: ignore # noqa: F401
+    MessageModel,
+    SessionModel,
+    UserModel,
+)
+from pyspur.models.workflow_model import WorkflowModel  # type: ignore # noqa: F401
+from pyspur.models.workflow_version_model import WorkflowVersionModel  # type: ignore # noqa: F401
+
 
 @pytest.fixture
 def cli_runner():
     """Fixture for creating a CLI runner for testing Typer applications."""
     return CliRunner()
+
+
+@pytest.fixture
+def db_session(tmp_path: Path) -> Iterator[Session]:
+    """Fixture for a session on a fresh SQLite database with all tables.
+
+    The database is a file, so that connections of other threads (like the task
+    recorder's writer) see the same data.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    BaseModel.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
@@ -0,0 +1 @@
+"""Execution tests package."""
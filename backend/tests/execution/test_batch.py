@@ -0,0 +1,80 @@
+"""Tests for the batch.py module."""
+
+import asyncio
+from typing import List
+
+import pytest
+
+from pyspur.execution.batch import iter_ordered
+
+
+async def _collect(items: List[float], max_concurrency: int) -> List[float]:
+    async def sleep_and_return(delay: float) -> float:
+        await asyncio.sleep(delay)
+        return delay
+
+    return [result async for result in iter_ordered(items, sleep_and_return, max_concurrency)]
+
+
+def test_results_are_in_input_order() -> None:
+    """Test results come back in input order even when later items finish first."""
+    items = [0.03, 0.0, 0.02, 0.01, 0.0]
+    assert asyncio.run(_collect(items, max_concurrency=3)) == items
+
+
+def test_slow_item_does_not_hold_up_the_window() -> None:
+    """Test new items start as soon as any running item finishes."""
+    events: List[str] = []
+
+    async def run() -> List[int]:
+        async def work(i: int) -> int:
+            events.append(f"start {i}")
+            await asyncio.sleep(0.05 if i == 0 else 0.001)
+            events.append(f"end {i}")
+            return i
+
+        return [result async for result in iter_ordered(range(6), work, max_concurrency=2)]
+
+    assert asyncio.run(run()) == list(range(6))
+    # Lock-step batches of 2 would only start item 2 after slow item 0 finished
+    assert events.index("start 5") < events.index("end 0")
+
+
+def test_concurrency_is_bounded() -> None:
+    """Test no more than max_concurrency calls run at the same time."""
+    active = 0
+    peak = 0
+
+    async def run() -> None:
+        async def work(i: int) -> int:
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.001 * (i % 3))
+            active -= 1
+            return i
+
+        assert [r async for r in iter_ordered(range(20), work, max_concurrency=4)] == list(
+            range(20)
+        )
+
+    asyncio.run(run())
+    assert peak == 4
+
+
+def test_errors_are_raised_at_the_failing_item() -> None:
+    """Test an exception surfaces after the results of the items before it."""
+    results: List[int] = []
+
+    async def run() -> None:
+        async def work(i: int) -> int:
+            if i == 2:
+                raise ValueError("bad item")
+            return i
+
+        async for result in iter_ordered(range(5), work, max_concurrency=2):
+            results.append(result)
+
+    with pytest.raises(ValueError, match="bad item"):
+        asyncio.run(run())
+    assert results == [0, 1]
@@ -0,0 +1,55 @@
+"""Tests for the concurrency.py module."""
+
+import asyncio
+from typing import Dict, List
+
+from pyspur.execution.concurrency import ConcurrencyLimiter, _parse_node_type_limits
+
+
+async def _run_with_limiter(limiter: ConcurrencyLimiter, node_types: List[str]) -> Dict[str, int]:
+    active: Dict[str, int] = {"total": 0}
+    peak: Dict[str, int] = {"total": 0}
+
+    async def run_node(node_type: str) -> None:
+        async with limiter.limit(node_type):
+            for key in ("total", node_type):
+                active[key] = active.get(key, 0) + 1
+                peak[key] = max(peak.get(key, 0), active[key])
+            await asyncio.sleep(0.01)
+            for key in ("total", node_type):
+                active[key] -= 1
+
+    await asyncio.gather(*(run_node(node_type) for node_type in node_types))
+    return peak
+
+
+def test_global_limit() -> None:
+    """Test no more than max_concurrency nodes run at once."""
+    limiter = ConcurrencyLimiter(max_concurrency=3)
+    peak = asyncio.run(_run_with_limiter(limiter, ["PythonFuncNode"] * 10))
+    assert peak["total"] == 3
+
+
+def test_node_type_limit() -> None:
+    """Test per-node-type caps apply independently of other node types."""
+    limiter = ConcurrencyLimiter(node_type_limits={"SingleLLMCallNode": 2})
+    peak = asyncio.run(
+        _run_with_limiter(limiter, ["SingleLLMCallNode"] * 6 + ["PythonFuncNode"] * 6)
+    )
+    assert peak["SingleLLMCallNode"] == 2
+    assert peak["PythonFuncNode"] == 6
+
+
+def test_limiter_is_reusable_across_event_loops() -> None:
+    """Test a shared limiter can be used from separate asyncio.run calls."""
+    limiter = ConcurrencyLimiter(max_concurrency=1)
+    assert asyncio.run(_run_with_limiter(limiter, ["A", "B"]))["total"] == 1
+    assert asyncio.run(_run_with_limiter(limiter, ["A", "B"]))["total"] == 1
+
+
+def test_parse_node_type_limits() -> None:
+    """Test both supported formats of NODE_TYPE_CONCURRENCY_LIMITS."""
+    expected = {"SingleLLMCallNode": 4, "AgentNode": 1}
+    assert _parse_node_type_limits("SingleLLMCallNode=4, AgentNode=1") == expected
+    assert _parse_node_type_limits('{"SingleLLMCallNode": 4, "AgentNode": 1}') == expected
+    assert _parse_node_type_limits("") == {}
@@ -0,0 +1,114 @@
+"""Tests for the execution_plan.py module."""
+
+from typing import Any, Dict, List
+
+import pytest
+
+from pyspur.execution.execution_plan import ExecutionPlan
+from pyspur.schemas.workflow_schemas import WorkflowDefinitionSchema
+
+
+def _make_workflow(
+    nodes: List[Dict[str, Any]], links: List[Dict[str, Any]]
+) -> WorkflowDefinitionSchema:
+    return WorkflowDefinitionSchema.model_validate({"nodes": nodes, "links": links})
+
+
+@pytest.fixture
+def diamond_workflow() -> WorkflowDefinitionSchema:
+    """Input -> (router -> a | b) -> out."""
+    return _make_workflow(
+        nodes=[
+            {"id": "input", "node_type": "InputNode"},
+            {"id": "router", "node_type": "RouterNode"},
+            {"id": "a", "node_type": "StaticValueNode"},
+            {"id": "b", "node_type": "StaticValueNode"},
+            {"id": "out", "node_type": "OutputNode"},
+        ],
+        links=[
+            {"source_id": "input", "target_id": "router"},
+            {"source_id": "router", "target_id": "a", "source_handle": "route1"},
+            {"source_id": "router", "target_id": "b", "source_handle": "route2"},
+            {"source_id": "a", "target_id": "out"},
+            {"source_id": "b", "target_id": "out"},
+        ],
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_plan_cache() -> None:
+    """Start every test with an empty plan cache."""
+    ExecutionPlan.clear_cache()
+
+
+def test_execution_plan_adjacency(diamond_workflow: WorkflowDefinitionSchema) -> None:
+    """Test forward and reverse adjacency are built from the links."""
+    plan = ExecutionPlan(diamond_workflow)
+    assert plan.dependencies["out"] == frozenset({"a", "b"})
+    assert plan.dependents["router"] == frozenset({"a", "b"})
+    assert plan.input_node_id == "input"
+
+
+def test_execution_plan_topological_order(diamond_workflow: WorkflowDefinitionSchema) -> None:
+    """Test every node comes after its predecessors."""
+    plan = ExecutionPlan(diamond_workflow)
+    position = {node_id: i for i, node_id in enumerate(plan.topological_order)}
+    for node_id, deps in plan.dependencies.items():
+        for dep_id in deps:
+            assert position[dep_id] < position[node_id]
+
+
+def test_execution_plan_router_handles(diamond_workflow: WorkflowDefinitionSchema) -> None:
+    """Test router links are mapped to their source handles."""
+    plan = ExecutionPlan(diamond_workflow)
+    assert plan.get_source_handle("router", "a") == "route1"
+    assert plan.get_source_handle("router", "b") == "route2"
+    assert plan.get_source_handle("a", "out") is None
+
+
+def test_execution_plan_descendants(diamond_workflow: WorkflowDefinitionSchema) -> None:
+    """Test pause reachability covers direct and indirect dependents."""
+    plan = ExecutionPlan(diamond_workflow)
+    assert plan.descendants["router"] == frozenset({"a", "b", "out"})
+    assert plan.descendants["a"] == frozenset({"out"})
+    assert plan.descendants["out"] == frozenset()
+
+
+def test_for_workflow_is_cached(diamond_workflow: WorkflowDefinitionSchema) -> None:
+    """Test plans are reused for the same workflow version."""
+    plan = ExecutionPlan.for_workflow(diamond_workflow)
+    same_definition = WorkflowDefinitionSchema.model_validate(diamond_workflow.model_dump())
+    assert ExecutionPlan.for_workflow(same_definition) is plan
+    assert ExecutionPlan.for_workflow(diamond_workflow, version_key="v2") is not plan
+
+
+def test_for_workflow_folds_child_nodes() -> None:
+    """Test child nodes are moved into their parent's subworkflow."""
+    workflow = _make_workflow(
+        nodes=[
+            {"id": "input", "node_type": "InputNode"},
+            {"id": "loop", "node_type": "ForLoopNode"},
+            {"id": "loop_input", "node_type": "InputNode", "parent_id": "loop"},
+            {"id": "loop_output", "node_type": "OutputNode", "parent_id": "loop"},
+        ],
+        links=[
+            {"source_id": "input", "target_id": "loop"},
+            {"source_id": "loop_input", "target_id": "loop_output"},
+        ],
+    )
+    plan = ExecutionPlan.for_workflow(workflow)
+    assert set(plan.node_dict) == {"input", "loop"}
+    assert len(plan.workflow.links) == 1
+    subworkflow = plan.node_dict["loop"].config["subworkflow"]
+    assert {node["id"] for node in subworkflow["nodes"]} == {"loop_input", "loop_output"}
+
+
+def test_plan_is_not_changed_by_edits_of_the_definition(
+    diamond_workflow: WorkflowDefinitionSchema,
+) -> None:
+    """Test the cached plan keeps its own copy of the workflow definition."""
+    plan = ExecutionPlan(diamond_workflow)
+    diamond_workflow.nodes[0].title = "renamed"
+    diamond_workflow.nodes.pop()
+    assert plan.node_dict["input"].title != "renamed"
+    assert [node.id for node in plan.workflow.nodes][-1] == "out"
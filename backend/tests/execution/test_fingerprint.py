@@ -0,0 +1,122 @@
+"""Tests for the fingerprint.py module."""
+
+import asyncio
+from datetime import datetime
+from typing import Any, Dict
+
+import pytest
+from sqlalchemy.orm import Session
+
+from pyspur.execution.fingerprint import TaskOutputLookup, compute_node_fingerprint
+from pyspur.execution.workflow_executor import WorkflowExecutor
+from pyspur.models.run_model import RunModel
+from pyspur.models.task_model import TaskModel, TaskStatus
+from pyspur.nodes.python.python_func import PythonFuncNode
+from pyspur.schemas.workflow_schemas import WorkflowDefinitionSchema
+
+FAILING_CONFIG: Dict[str, Any] = {
+    "code": "raise ValueError('should not run')",
+    "output_schema": {"value": "integer"},
+}
+
+
+def _workflow() -> WorkflowDefinitionSchema:
+    return WorkflowDefinitionSchema.model_validate(
+        {
+            "nodes": [
+                {
+                    "id": "input",
+                    "node_type": "InputNode",
+                    "config": {"output_schema": {"x": "integer"}},
+                },
+                {"id": "py", "node_type": "PythonFuncNode", "config": FAILING_CONFIG},
+            ],
+            "links": [{"source_id": "input", "target_id": "py"}],
+        }
+    )
+
+
+def test_fingerprint_is_stable_and_content_addressed() -> None:
+    """Test the fingerprint ignores key order but changes with config or inputs."""
+    fingerprint = compute_node_fingerprint("PythonFuncNode", {"a": 1, "b": 2}, {"in": {"x": 1}})
+    assert fingerprint == compute_node_fingerprint(
+        "PythonFuncNode", {"b": 2, "a": 1}, {"in": {"x": 1}}
+    )
+    assert fingerprint != compute_node_fingerprint(
+        "PythonFuncNode", {"a": 1, "b": 3}, {"in": {"x": 1}}
+    )
+    assert fingerprint != compute_node_fingerprint(
+        "PythonFuncNode", {"a": 1, "b": 2}, {"in": {"x": 2}}
+    )
+
+
+def test_unchanged_nodes_reuse_outputs(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a reusable node with a known fingerprint is not executed again."""
+    monkeypatch.setattr(PythonFuncNode, "reusable", True)
+    fingerprint = compute_node_fingerprint("PythonFuncNode", FAILING_CONFIG, {"input": {"x": 1}})
+    known_outputs = {fingerprint: {"value": 42}}
+
+    executor = WorkflowExecutor(_workflow(), output_lookup=known_outputs.get)
+    outputs = asyncio.run(executor({"x": 1}))
+    assert outputs["py"].model_dump() == {"value": 42}
+
+    # Different input values make the node dirty, so it runs (and fails) again
+    executor = WorkflowExecutor(_workflow(), output_lookup=known_outputs.get)
+    outputs = asyncio.run(executor({"x": 2}))
+    assert "py" not in outputs
+
+
+def test_nodes_are_not_reused_unless_they_opt_in() -> None:
+    """Test nodes that may have side effects run again even with a known fingerprint."""
+    assert not PythonFuncNode.reusable
+    fingerprint = compute_node_fingerprint("PythonFuncNode", FAILING_CONFIG, {"input": {"x": 1}})
+    executor = WorkflowExecutor(_workflow(), output_lookup={fingerprint: {"value": 42}}.get)
+    outputs = asyncio.run(executor({"x": 1}))
+    assert "py" not in outputs
+
+
+def test_task_output_lookup(db_session: Session) -> None:
+    """Test lookups return the latest completed output of the same workflow."""
+    run = RunModel(workflow_id="S1", workflow_version_id="1", run_type="interactive")
+    other_run = RunModel(workflow_id="S2", workflow_version_id="2", run_type="interactive")
+    db_session.add_all([run, other_run])
+    db_session.commit()
+    db_session.add_all(
+        [
+            TaskModel(
+                run_id=run.id,
+                node_id="py",
+                status=TaskStatus.COMPLETED,
+                fingerprint="abc",
+                outputs={"value": 1},
+                end_time=datetime(2025, 1, 1),
+            ),
+            TaskModel(
+                run_id=run.id,
+                node_id="py",
+                status=TaskStatus.COMPLETED,
+                fingerprint="abc",
+                outputs={"value": 2},
+                end_time=datetime(2025, 1, 2),
+            ),
+            TaskModel(
+                run_id=run.id,
+                node_id="py",
+                status=TaskStatus.FAILED,
+                fingerprint="def",
+            ),
+            TaskModel(
+                run_id=other_run.id,
+                node_id="py",
+                status=TaskStatus.COMPLETED,
+                fingerprint="ghi",
+                outputs={"value": 3},
+            ),
+        ]
+    )
+    db_session.commit()
+
+    lookup = TaskOutputLookup(db_session, "S1")
+    assert lookup.get("abc") == {"value": 2}
+    assert lookup.get("def") is None
+    assert lookup.get("ghi") is None
@@ -0,0 +1,131 @@
+"""Tests for the payload_store.py module."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from pyspur.execution.payload_store import BLOB_KEY, PayloadStore, output_reference
+from pyspur.execution.task_recorder import TaskRecorder
+from pyspur.execution.workflow_executor import WorkflowExecutor
+from pyspur.models.run_model import RunModel
+from pyspur.schemas.task_schemas import TaskResponseSchema
+from pyspur.schemas.workflow_schemas import WorkflowDefinitionSchema
+
+
+def _task(
+    node_id: str,
+    inputs: object = None,
+    outputs: object = None,
+    status: str = "COMPLETED",
+    end_time: Optional[datetime] = None,
+) -> TaskResponseSchema:
+    return TaskResponseSchema(
+        id=f"T_{node_id}",
+        run_id="R1",
+        node_id=node_id,
+        parent_task_id=None,
+        status=status,
+        inputs=inputs,
+        outputs=outputs,
+        error=None,
+        start_time=None,
+        end_time=end_time,
+        subworkflow=None,
+        subworkflow_output=None,
+    )
+
+
+def test_large_payloads_are_offloaded(tmp_path: Path) -> None:
+    """Test payloads over the threshold become compressed blobs that load back."""
+    store = PayloadStore(base_dir=tmp_path, max_inline_bytes=100)
+    small = {"text": "short"}
+    large = {"text": "x" * 1000}
+
+    assert store.pack(small) == small
+    packed = store.pack(large)
+    assert set(packed) == {BLOB_KEY, "size"}
+    assert store.load(packed) == large
+    assert store.pack(large) == packed
+    assert len(list(tmp_path.rglob("*.json.gz"))) == 1
+
+
+def test_concurrent_writers_of_a_blob_do_not_collide(tmp_path: Path) -> None:
+    """Test threads offloading the same payload each use their own temporary file."""
+    store = PayloadStore(base_dir=tmp_path, max_inline_bytes=100)
+    large = {"text": "x" * 100_000}
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        packed = list(pool.map(lambda _: store.pack(large), range(32)))
+
+    assert all(reference == packed[0] for reference in packed)
+    assert store.load(packed[0]) == large
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_input_references_are_resolved(tmp_path: Path) -> None:
+    """Test task inputs stored as references load the referenced task outputs."""
+    store = PayloadStore(base_dir=tmp_path, max_inline_bytes=100)
+    tasks = [
+        _task("router", outputs=store.pack({"route1": {"text": "x" * 1000}, "route2": None})),
+        _task("py", inputs={"Router": output_reference("router", "route1"), "Other": 1}),
+    ]
+    store.resolve_tasks(tasks)
+    assert tasks[0].outputs == {"route1": {"text": "x" * 1000}, "route2": None}
+    assert tasks[1].inputs == {"Router": {"text": "x" * 1000}, "Other": 1}
+
+
+def test_references_resolve_to_the_task_that_represents_the_node(tmp_path: Path) -> None:
+    """Test a node with several tasks is referenced by its latest completed task."""
+    store = PayloadStore(base_dir=tmp_path)
+    tasks = [
+        _task("py", inputs={"Fn": output_reference("fn")}),
+        _task("fn", outputs={"v": 1}, end_time=datetime(2025, 1, 1, 10)),
+        _task("fn", outputs={"v": 2}, end_time=datetime(2025, 1, 1, 11)),
+        _task("fn", status="FAILED", end_time=datetime(2025, 1, 1, 12)),
+        _task("fn", status="CANCELED"),
+    ]
+    store.resolve_tasks(tasks)
+    assert tasks[0].inputs == {"Fn": {"v": 2}}
+
+
+def test_executor_records_inputs_as_references(db_session: Session, tmp_path: Path) -> None:
+    """Test recorded inputs reference upstream outputs instead of copying them."""
+    run = RunModel(workflow_id="S1", workflow_version_id="1", run_type="interactive")
+    db_session.add(run)
+    db_session.commit()
+    store = PayloadStore(base_dir=tmp_path, max_inline_bytes=100)
+    recorder = TaskRecorder(db_session, run.id, payload_store=store)
+    workflow = WorkflowDefinitionSchema.model_validate(
+        {
+            "nodes": [
+                {
+                    "id": "input",
+                    "node_type": "InputNode",
+                    "config": {"output_schema": {"text": "string"}},
+                },
+                {
+                    "id": "upper",
+                    "node_type": "PythonFuncNode",
+                    "config": {
+                        "code": "return {'text': input_model.input.text.upper()}",
+                        "output_schema": {"text": "string"},
+                    },
+                },
+            ],
+            "links": [{"source_id": "input", "target_id": "upper"}],
+        }
+    )
+    asyncio.run(WorkflowExecutor(workflow, task_recorder=recorder)({"text": "a" * 1000}))
+
+    stored_task = recorder.tasks["upper"]
+    assert stored_task.inputs == {"input": output_reference("input")}
+    assert BLOB_KEY in stored_task.outputs
+
+    tasks = [TaskResponseSchema.model_validate(task) for task in recorder.tasks.values()]
+    store.resolve_tasks(tasks)
+    resolved = {task.node_id: task for task in tasks}
+    assert resolved["upper"].inputs == {"input": {"text": "a" * 1000}}
+    assert resolved["upper"].outputs == {"text": "A" * 1000}
@@ -0,0 +1,122 @@
+"""Tests for the retention.py module."""
+
+import gzip
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from pyspur.execution.payload_store import PayloadStore
+from pyspur.execution.retention import RetentionPolicy, RunRetention
+from pyspur.models.run_model import RunModel, RunStatus
+from pyspur.models.task_model import TaskModel, TaskStatus
+
+NOW = datetime(2025, 6, 1)
+
+
+def _add_run(
+    db_session: Session,
+    age_days: float,
+    workflow_id: str = "S1",
+    run_type: str = "interactive",
+    parent_run_id: Optional[str] = None,
+    status: RunStatus = RunStatus.COMPLETED,
+) -> str:
+    run = RunModel(
+        workflow_id=workflow_id,
+        workflow_version_id="1",
+        run_type=run_type,
+        parent_run_id=parent_run_id,
+        status=status,
+        start_time=NOW - timedelta(days=age_days),
+    )
+    db_session.add(run)
+    db_session.commit()
+    db_session.add(
+        TaskModel(run_id=run.id, node_id="a", status=TaskStatus.COMPLETED, outputs={"v": 1})
+    )
+    db_session.commit()
+    return run.id
+
+
+def _retention(
+    db_session: Session, tmp_path: Path, policies: List[RetentionPolicy]
+) -> RunRetention:
+    return RunRetention(
+        db_session,
+        policies,
+        archive_dir=tmp_path / "archives",
+        batch_size=2,
+        payload_store=PayloadStore(tmp_path / "payloads"),
+        now=NOW,
+    )
+
+
+def _run_ids(db_session: Session) -> List[str]:
+    return list(db_session.scalars(select(RunModel.id).order_by(RunModel._intid)))
+
+
+def test_expired_runs_are_archived_and_deleted(db_session: Session, tmp_path: Path) -> None:
+    """Test old finished runs go to the archive with their tasks and subruns."""
+    old_batch = _add_run(db_session, 40, run_type="batch")
+    db_session.add(TaskModel(run_id=old_batch, node_id="b", status=TaskStatus.FAILED))
+    db_session.commit()
+    old_subruns = [_add_run(db_session, 40, parent_run_id=old_batch) for _ in range(3)]
+    old_running = _add_run(db_session, 40, status=RunStatus.RUNNING)
+    recent = _add_run(db_session, 5)
+    # A more specific policy keeps this workflow's runs longer
+    kept = _add_run(db_session, 40, workflow_id="S2")
+
+    result = _retention(
+        db_session,
+        tmp_path,
+        [RetentionPolicy(max_age_days=30), RetentionPolicy(workflow_id="S2", max_age_days=60)],
+    ).apply()
+
+    assert result.deleted_runs == 1
+    assert _run_ids(db_session) == [old_running, recent, kept]
+    assert db_session.scalars(select(TaskModel.run_id)).all() == [old_running, recent, kept]
+    assert result.archive_path is not None
+    with gzip.open(result.archive_path, "rt") as f:
+        records = [json.loads(line) for line in f]
+    assert sorted(record["id"] for record in records) == sorted([old_batch, *old_subruns])
+    assert all(record["tasks"][0]["outputs"] == {"v": 1} for record in records)
+    assert all(record["status"] == "COMPLETED" for record in records)
+
+
+def test_dry_run_changes_nothing(db_session: Session, tmp_path: Path) -> None:
+    """Test a dry run only counts the runs it would delete."""
+    _add_run(db_session, 40)
+    _add_run(db_session, 40)
+
+    result = _retention(db_session, tmp_path, [RetentionPolicy(max_age_days=30)]).apply(
+        dry_run=True
+    )
+
+    assert result.deleted_runs == 2
+    assert result.archive_path is None
+    assert len(_run_ids(db_session)) == 2
+
+
+def test_subruns_are_compacted_into_a_summary(db_session: Session, tmp_path: Path) -> None:
+    """Test compaction replaces the subruns of a run with counts on the run."""
+    batch = _add_run(db_session, 10, run_type="batch")
+    for status in (RunStatus.COMPLETED, RunStatus.COMPLETED, RunStatus.FAILED):
+        _add_run(db_session, 10, parent_run_id=batch, status=status)
+
+    result = _retention(
+        db_session,
+        tmp_path,
+        [RetentionPolicy(run_type="batch", compact_after_days=7, archive=False)],
+    ).apply()
+
+    assert result.compacted_runs == 1
+    assert result.archive_path is None
+    assert _run_ids(db_session) == [batch]
+    run = db_session.scalars(select(RunModel)).one()
+    assert run.subrun_summary is not None
+    assert run.subrun_summary["runs"] == 3
+    assert run.subrun_summary["statuses"] == {"COMPLETED": 2, "FAILED": 1}
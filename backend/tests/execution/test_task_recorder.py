@@ -0,0 +1,195 @@
+"""Tests for the task_recorder.py module."""
+
+import asyncio
+import threading
+from datetime import datetime
+from typing import Any, List
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from pyspur.execution.task_recorder import TaskRecorder
+from pyspur.models.run_model import RunModel, recount_task_counters
+from pyspur.models.task_model import TaskModel, TaskStatus
+
+
+def _recorder(db_session: Session, flush_interval: float) -> TaskRecorder:
+    run = RunModel(workflow_id="S1", workflow_version_id="1", run_type="interactive")
+    db_session.add(run)
+    db_session.commit()
+    return TaskRecorder(db_session, run.id, flush_interval=flush_interval)
+
+
+def _count_commits(db_session: Session) -> List[None]:
+    commits: List[None] = []
+    event.listen(db_session.get_bind(), "commit", lambda connection: commits.append(None))
+    return commits
+
+
+def test_changes_inside_event_loop_are_buffered(db_session: Session) -> None:
+    """Test task changes made during a run are written in one commit on flush."""
+    recorder = _recorder(db_session, flush_interval=60)
+    commits = _count_commits(db_session)
+
+    async def record() -> None:
+        for node_id in ("a", "b", "c"):
+            recorder.create_task(node_id, {})
+            recorder.update_task(node_id, TaskStatus.RUNNING)
+            recorder.update_task(node_id, TaskStatus.COMPLETED, outputs={"value": 1})
+        assert not commits
+        recorder.flush()
+
+    asyncio.run(record())
+    assert len(commits) == 1
+    statuses = {
+        task.node_id: task.status
+        for task in db_session.query(TaskModel).filter(TaskModel.run_id == recorder.run_id)
+    }
+    assert statuses == dict.fromkeys(("a", "b", "c"), TaskStatus.COMPLETED)
+
+
+def test_buffered_changes_are_flushed_after_interval(db_session: Session) -> None:
+    """Test buffered changes are written without an explicit flush."""
+    recorder = _recorder(db_session, flush_interval=0.01)
+    commits = _count_commits(db_session)
+
+    async def record() -> None:
+        recorder.create_task("a", {})
+        recorder.update_task("a", TaskStatus.COMPLETED)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(record())
+    assert len(commits) == 1
+
+
+def test_background_flush_runs_in_a_worker_thread(db_session: Session) -> None:
+    """Test the timed flush doesn't write on the event loop's thread."""
+    recorder = _recorder(db_session, flush_interval=0.01)
+    threads: List[int] = []
+    event.listen(
+        db_session.get_bind(), "commit", lambda connection: threads.append(threading.get_ident())
+    )
+
+    async def record() -> None:
+        recorder.create_task("a", {})
+        await asyncio.sleep(0.1)
+
+    asyncio.run(record())
+    assert threads and threading.get_ident() not in threads
+
+
+def test_failed_write_is_raised_on_next_flush_and_retried(
+    db_session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test a failed background write is reported by the next flush and not lost."""
+    recorder = _recorder(db_session, flush_interval=0.01)
+    original_write = recorder._write
+    failures = [RuntimeError("database is gone")]
+
+    def write(changes: Any) -> None:
+        if failures:
+            raise failures.pop()
+        original_write(changes)
+
+    monkeypatch.setattr(recorder, "_write", write)
+
+    async def record() -> None:
+        recorder.create_task("a", {})
+        recorder.update_task("a", TaskStatus.COMPLETED)
+        await asyncio.sleep(0.1)
+        with pytest.raises(RuntimeError, match="database is gone"):
+            await recorder.aflush()
+        await recorder.aflush()
+
+    asyncio.run(record())
+    task = db_session.query(TaskModel).filter(TaskModel.run_id == recorder.run_id).one()
+    assert task.status == TaskStatus.COMPLETED
+
+
+def test_changes_outside_event_loop_are_written_immediately(db_session: Session) -> None:
+    """Test synchronous callers keep write-through behavior."""
+    recorder = _recorder(db_session, flush_interval=60)
+    commits = _count_commits(db_session)
+    recorder.create_task("a", {})
+    recorder.update_task("a", TaskStatus.COMPLETED)
+    assert len(commits) == 2
+
+
+def test_recorder_loads_effective_task_per_node(db_session: Session) -> None:
+    """Test the task representing each node is chosen by status priority in one query."""
+    run = RunModel(workflow_id="S1", workflow_version_id="1", run_type="interactive")
+    db_session.add(run)
+    db_session.commit()
+    db_session.add_all(
+        [
+            TaskModel(run_id=run.id, node_id="a", status=TaskStatus.FAILED),
+            TaskModel(
+                run_id=run.id,
+                node_id="a",
+                status=TaskStatus.COMPLETED,
+                outputs={"value": 1},
+                end_time=datetime(2025, 1, 1),
+            ),
+            TaskModel(
+                run_id=run.id,
+                node_id="a",
+                status=TaskStatus.COMPLETED,
+                outputs={"value": 2},
+                end_time=datetime(2025, 1, 2),
+            ),
+            TaskModel(run_id=run.id, node_id="b", status=TaskStatus.CANCELED),
+            TaskModel(run_id=run.id, node_id="b", status=TaskStatus.PAUSED),
+            TaskModel(run_id=run.id, node_id="c", status=TaskStatus.FAILED, error="first"),
+            TaskModel(run_id=run.id, node_id="c", status=TaskStatus.FAILED, error="second"),
+        ]
+    )
+    db_session.commit()
+    run_id = run.id
+
+    statements: List[str] = []
+    engine = db_session.get_bind()
+    event.listen(
+        engine, "before_cursor_execute", lambda *args: statements.append(args[2]), named=False
+    )
+    recorder = TaskRecorder(db_session, run_id)
+
+    assert len(statements) == 1
+    assert recorder.tasks["a"].outputs == {"value": 2}
+    assert recorder.tasks["b"].status == TaskStatus.PAUSED
+    assert recorder.tasks["c"].error == "first"
+
+
+def test_run_counters_follow_task_status(db_session: Session) -> None:
+    """Test the run's task counters and token total are updated by each write."""
+    recorder = _recorder(db_session, flush_interval=60)
+
+    async def record() -> None:
+        for node_id in ("a", "b", "c"):
+            recorder.create_task(node_id, {})
+        recorder.flush()
+        recorder.update_task("a", TaskStatus.COMPLETED, outputs={"value": 1})
+        recorder.update_task("b", TaskStatus.FAILED, error="boom")
+        recorder.token_usage.total_tokens += 42
+        recorder.flush()
+
+    statements: List[str] = []
+    event.listen(
+        db_session.get_bind(),
+        "before_cursor_execute",
+        lambda *args: statements.append(args[2]),
+        named=False,
+    )
+    asyncio.run(record())
+    # The counters are incremented, not recounted from the run's tasks
+    assert not [statement for statement in statements if "count(" in statement]
+    run = db_session.query(RunModel).filter(RunModel.id == recorder.run_id).one()
+    assert (run.pending_tasks, run.completed_tasks, run.failed_tasks) == (1, 1, 1)
+    assert run.total_tokens == 42
+
+    # Tasks changed outside the recorder are counted again explicitly
+    task = db_session.query(TaskModel).filter(TaskModel.node_id == "c").one()
+    task.status = TaskStatus.CANCELED
+    recount_task_counters(db_session, run.id)
+    db_session.commit()
+    assert (run.pending_tasks, run.canceled_tasks) == (0, 1)
@@ -0,0 +1,24 @@
+"""Tests for the token_usage.py module."""
+
+import asyncio
+
+from pyspur.execution.token_usage import record_token_usage, track_token_usage
+
+
+def test_usage_is_counted_by_all_enclosing_trackers() -> None:
+    """Test tokens recorded in nested tasks count towards every enclosing tracker."""
+
+    async def call_llm(tokens: int) -> None:
+        await asyncio.sleep(0)
+        record_token_usage(tokens)
+
+    async def run() -> None:
+        with track_token_usage() as outer:
+            with track_token_usage() as inner:
+                await asyncio.gather(call_llm(10), call_llm(5))
+            await asyncio.create_task(call_llm(1))
+        record_token_usage(100)
+        assert inner.total_tokens == 15
+        assert outer.total_tokens == 16
+
+    asyncio.run(run())
@@ -0,0 +1,322 @@
+"""Tests for the workflow_executor.py module."""
+
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from pyspur.execution.concurrency import ConcurrencyLimiter
+from pyspur.execution.run_registry import cancel_run
+from pyspur.execution.task_recorder import TaskRecorder
+from pyspur.execution.workflow_executor import (
+    WorkflowCancelledError,
+    WorkflowExecutor,
+    WorkflowTimeoutError,
+)
+from pyspur.models.run_model import RunModel
+from pyspur.models.task_model import TaskStatus
+from pyspur.nodes.python.python_func import PythonFuncNode
+from pyspur.schemas.execution_event_schemas import ExecutionEventSchema, ExecutionEventType
+from pyspur.schemas.workflow_schemas import WorkflowDefinitionSchema
+
+
+def _python_node(node_id: str, code: str) -> Dict[str, Any]:
+    return {
+        "id": node_id,
+        "node_type": "PythonFuncNode",
+        "config": {"code": code, "output_schema": {"value": "integer"}},
+    }
+
+
+def _fan_out_workflow(width: int) -> WorkflowDefinitionSchema:
+    """Input -> width independent python nodes -> output summing their values."""
+    branch_ids = [f"branch_{i}" for i in range(width)]
+    nodes: List[Dict[str, Any]] = [
+        {"id": "input", "node_type": "InputNode", "config": {"output_schema": {"x": "integer"}}},
+        *(
+            _python_node(branch_id, f"return {{'value': {i}}}")
+            for i, branch_id in enumerate(branch_ids)
+        ),
+        _python_node(
+            "total",
+            "return {'value': sum(getattr(input_model, f'branch_{i}').value "
+            f"for i in range({width}))}}",
+        ),
+        {
+            "id": "output",
+            "node_type": "OutputNode",
+            "config": {"output_map": {"value": "total.value"}},
+        },
+    ]
+    links = [{"source_id": "input", "target_id": branch_id} for branch_id in branch_ids]
+    links += [{"source_id": branch_id, "target_id": "total"} for branch_id in branch_ids]
+    links.append({"source_id": "total", "target_id": "output"})
+    return WorkflowDefinitionSchema.model_validate({"nodes": nodes, "links": links})
+
+
+def test_fan_out_with_concurrency_limit() -> None:
+    """Test a wide workflow completes under a tight global cap."""
+    executor = WorkflowExecutor(
+        _fan_out_workflow(20), concurrency_limiter=ConcurrencyLimiter(max_concurrency=2)
+    )
+    outputs = asyncio.run(executor({"x": 1}))
+    assert outputs["output"].model_dump() == {"value": sum(range(20))}
+
+
+def test_run_selected_nodes_runs_missing_ancestors() -> None:
+    """Test running a single node also runs the predecessors it needs."""
+    executor = WorkflowExecutor(_fan_out_workflow(3))
+    outputs = asyncio.run(executor({"x": 1}, node_ids=["total"]))
+    assert outputs["total"].model_dump() == {"value": 3}
+    assert "output" not in outputs
+
+
+def test_upstream_failure_skips_dependents() -> None:
+    """Test a failing node stops its dependents without stopping independent branches."""
+    workflow = _fan_out_workflow(2)
+    workflow.nodes[1].config["code"] = "raise ValueError('boom')"
+    executor = WorkflowExecutor(workflow)
+    outputs = asyncio.run(executor({"x": 1}))
+    assert "branch_1" in outputs
+    assert "total" not in outputs
+    assert "output" not in outputs
+
+
+async def _collect_events(executor: WorkflowExecutor) -> List[ExecutionEventSchema]:
+    return [event async for event in executor.stream({"x": 1})]
+
+
+def test_stream_yields_node_and_run_events() -> None:
+    """Test every node reports start and completion before the final run event."""
+    events = asyncio.run(_collect_events(WorkflowExecutor(_fan_out_workflow(2))))
+
+    assert events[-1].type == ExecutionEventType.RUN_COMPLETED
+    assert events[-1].output is not None
+    assert events[-1].output["output"] == {"value": 1}
+
+    completed = [e.node_id for e in events if e.type == ExecutionEventType.NODE_COMPLETED]
+    assert set(completed) == {"input", "branch_0", "branch_1", "total", "output"}
+    assert completed.index("total") > max(completed.index("branch_0"), completed.index("branch_1"))
+    for node_id in completed:
+        started_at = next(
+            i
+            for i, e in enumerate(events)
+            if e.type == ExecutionEventType.NODE_STARTED and e.node_id == node_id
+        )
+        completed_at = next(
+            i
+            for i, e in enumerate(events)
+            if e.type == ExecutionEventType.NODE_COMPLETED and e.node_id == node_id
+        )
+        assert started_at < completed_at
+
+
+def test_second_stream_of_an_executor_is_rejected() -> None:
+    """Test an executor refuses to stream a run while it is streaming another."""
+
+    async def _run() -> None:
+        executor = WorkflowExecutor(_fan_out_workflow(2))
+        first = executor.stream({"x": 1})
+        await first.__anext__()
+        with pytest.raises(RuntimeError):
+            await executor.stream({"x": 1}).__anext__()
+        await first.aclose()
+        # The executor can stream again once the first stream ended
+        events = await _collect_events(executor)
+        assert events[-1].type == ExecutionEventType.RUN_COMPLETED
+
+    asyncio.run(_run())
+
+
+def test_stream_reports_node_failures() -> None:
+    """Test a failing node is reported as an event instead of ending the stream."""
+    workflow = _fan_out_workflow(2)
+    workflow.nodes[1].config["code"] = "raise ValueError('boom')"
+    events = asyncio.run(_collect_events(WorkflowExecutor(workflow)))
+
+    failed = [e for e in events if e.type == ExecutionEventType.NODE_FAILED]
+    assert [e.node_id for e in failed] == ["branch_0"]
+    assert failed[0].error is not None and "boom" in failed[0].error
+    assert events[-1].type == ExecutionEventType.RUN_COMPLETED
+
+
+def test_run_batch_isolates_runs_and_keeps_input_order() -> None:
+    """Test concurrent batch items don't share run state and come back in input order."""
+    workflow = WorkflowDefinitionSchema.model_validate(
+        {
+            "nodes": [
+                {
+                    "id": "input",
+                    "node_type": "InputNode",
+                    "config": {"output_schema": {"x": "integer"}},
+                },
+                _python_node("double", "return {'value': input_model.input.x * 2}"),
+            ],
+            "links": [{"source_id": "input", "target_id": "double"}],
+        }
+    )
+    executor = WorkflowExecutor(workflow)
+    results = asyncio.run(executor.run_batch(({"x": i} for i in range(10)), batch_size=3))
+    assert [outputs["double"].model_dump() for outputs in results] == [
+        {"value": i * 2} for i in range(10)
+    ]
+
+
+def _router_workflow() -> WorkflowDefinitionSchema:
+    """Input -> router -> two two-node branches -> coalesce of the branch ends."""
+    route_conditions = {
+        "positive": {
+            "conditions": [{"variable": "input.x", "operator": "greater_than", "value": 0}]
+        },
+        "negative": {"conditions": [{"variable": "input.x", "operator": "less_than", "value": 0}]},
+    }
+    nodes: List[Dict[str, Any]] = [
+        {"id": "input", "node_type": "InputNode", "config": {"output_schema": {"x": "integer"}}},
+        {"id": "router", "node_type": "RouterNode", "config": {"route_map": route_conditions}},
+        _python_node("pos_1", "return {'value': 1}"),
+        _python_node("pos_2", "return {'value': input_model.pos_1.value + 1}"),
+        _python_node("neg_1", "return {'value': -1}"),
+        _python_node("neg_2", "return {'value': input_model.neg_1.value - 1}"),
+        {
+            "id": "merge",
+            "node_type": "CoalesceNode",
+            "config": {"preferences": ["pos_2", "neg_2"]},
+        },
+    ]
+    links = [
+        {"source_id": "input", "target_id": "router"},
+        {"source_id": "router", "target_id": "pos_1", "source_handle": "positive"},
+        {"source_id": "pos_1", "target_id": "pos_2"},
+        {"source_id": "router", "target_id": "neg_1", "source_handle": "negative"},
+        {"source_id": "neg_1", "target_id": "neg_2"},
+        {"source_id": "pos_2", "target_id": "merge"},
+        {"source_id": "neg_2", "target_id": "merge"},
+    ]
+    return WorkflowDefinitionSchema.model_validate({"nodes": nodes, "links": links})
+
+
+def test_unselected_routes_are_never_scheduled() -> None:
+    """Test the branch a router didn't pick is skipped while the coalesce still runs."""
+    events = asyncio.run(_collect_events(WorkflowExecutor(_router_workflow())))
+
+    started = {e.node_id for e in events if e.type == ExecutionEventType.NODE_STARTED}
+    skipped = {e.node_id for e in events if e.type == ExecutionEventType.NODE_SKIPPED}
+    assert skipped == {"neg_1", "neg_2"}
+    assert not started & skipped
+    assert events[-1].type == ExecutionEventType.RUN_COMPLETED
+    assert events[-1].output is not None
+    assert events[-1].output["merge"] == {"value": 2}
+
+
+def test_skipped_branch_is_recorded_in_one_update(db_session: Session) -> None:
+    """Test the skipped subgraph is marked CANCELED with a single recorder update."""
+    run = RunModel(workflow_id="S1", workflow_version_id="1", run_type="interactive")
+    db_session.add(run)
+    db_session.commit()
+    recorder = TaskRecorder(db_session, run.id)
+
+    skip_calls: List[List[str]] = []
+    original_skip_tasks = recorder.skip_tasks
+
+    def skip_tasks(node_ids: List[str], **kwargs: Any) -> None:
+        skip_calls.append(sorted(node_ids))
+        original_skip_tasks(node_ids, **kwargs)
+
+    recorder.skip_tasks = skip_tasks  # type: ignore[method-assign]
+    asyncio.run(WorkflowExecutor(_router_workflow(), task_recorder=recorder)({"x": -5}))
+
+    assert skip_calls == [["pos_1", "pos_2"]]
+    statuses = {node_id: task.status for node_id, task in recorder.tasks.items()}
+    assert statuses["pos_1"] == statuses["pos_2"] == TaskStatus.CANCELED
+    assert statuses["neg_2"] == statuses["merge"] == TaskStatus.COMPLETED
+
+
+async def _slow_run(self: PythonFuncNode, input: BaseModel) -> BaseModel:
+    await asyncio.sleep(10)
+    return self.output_model.model_validate({"value": 0})
+
+
+def _slow_workflow(node_timeout: float | None = None) -> WorkflowDefinitionSchema:
+    """Input -> a python node that never finishes in time -> output."""
+    slow_node = _python_node("slow", "return {'value': 0}")
+    slow_node["config"]["timeout"] = node_timeout
+    return WorkflowDefinitionSchema.model_validate(
+        {
+            "nodes": [
+                {
+                    "id": "input",
+                    "node_type": "InputNode",
+                    "config": {"output_schema": {"x": "integer"}},
+                },
+                slow_node,
+                {
+                    "id": "output",
+                    "node_type": "OutputNode",
+                    "config": {"output_map": {"value": "slow.value"}},
+                },
+            ],
+            "links": [
+                {"source_id": "input", "target_id": "slow"},
+                {"source_id": "slow", "target_id": "output"},
+            ],
+        }
+    )
+
+
+def _recorder(db_session: Session) -> TaskRecorder:
+    run = RunModel(workflow_id="S1", workflow_version_id="1", run_type="interactive")
+    db_session.add(run)
+    db_session.commit()
+    return TaskRecorder(db_session, run.id)
+
+
+def test_node_timeout_fails_the_node(db_session: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a node exceeding its configured timeout is recorded as FAILED."""
+    monkeypatch.setattr(PythonFuncNode, "run", _slow_run)
+    recorder = _recorder(db_session)
+    executor = WorkflowExecutor(_slow_workflow(node_timeout=0.05), task_recorder=recorder)
+    outputs = asyncio.run(executor({"x": 1}))
+
+    assert "slow" not in outputs
+    assert recorder.tasks["slow"].status == TaskStatus.FAILED
+    assert "timed out" in (recorder.tasks["slow"].error or "")
+    assert recorder.tasks["output"].status == TaskStatus.CANCELED
+
+
+def test_run_timeout_cancels_in_flight_nodes(
+    db_session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test a run exceeding its deadline stops and records its unfinished nodes."""
+    monkeypatch.setattr(PythonFuncNode, "run", _slow_run)
+    recorder = _recorder(db_session)
+    executor = WorkflowExecutor(_slow_workflow(), task_recorder=recorder, timeout=0.05)
+    with pytest.raises(WorkflowTimeoutError):
+        asyncio.run(executor({"x": 1}))
+
+    for node_id in ("slow", "output"):
+        assert recorder.tasks[node_id].status == TaskStatus.CANCELED
+        assert "timeout" in (recorder.tasks[node_id].error or "")
+
+
+def test_cancel_run_stops_in_flight_nodes(
+    db_session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test cancelling a run by id cancels its executing nodes."""
+    monkeypatch.setattr(PythonFuncNode, "run", _slow_run)
+    recorder = _recorder(db_session)
+    executor = WorkflowExecutor(_slow_workflow(), task_recorder=recorder)
+
+    async def run_and_cancel() -> None:
+        run_task = asyncio.create_task(executor({"x": 1}))
+        await asyncio.sleep(0.05)
+        assert cancel_run(recorder.run_id)
+        await run_task
+
+    with pytest.raises(WorkflowCancelledError):
+        asyncio.run(run_and_cancel())
+
+    assert recorder.tasks["slow"].status == TaskStatus.CANCELED
+    assert recorder.tasks["output"].status == TaskStatus.CANCELED
+    assert not cancel_run(recorder.run_id)
@@ -0,0 +1 @@
+"""Nodes tests package."""
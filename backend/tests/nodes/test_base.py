@@ -0,0 +1,54 @@
+"""Tests for the base.py module."""
+
+import asyncio
+from typing import Any, Dict
+
+from pyspur.nodes.factory import NodeFactory
+
+
+def _python_node_config() -> Dict[str, Any]:
+    return {
+        "code": "return {'value': len(input_model.model_dump())}",
+        "output_schema": {"value": "integer"},
+    }
+
+
+def test_primitive_input_model_is_reused() -> None:
+    """Test nodes called with the same primitive field types share one input model."""
+    first = NodeFactory.create_node("py", "PythonFuncNode", _python_node_config())
+    second = NodeFactory.create_node("py", "PythonFuncNode", _python_node_config())
+    asyncio.run(first({"a": "x", "b": 1}))
+    asyncio.run(second({"a": "y", "b": 2}))
+    assert first.input_model is second.input_model
+    assert second.input.model_dump() == {"a": "y", "b": 2}
+
+
+def test_composite_input_model_is_reused() -> None:
+    """Test nodes fed the same predecessor output classes share one input model."""
+    upstream = NodeFactory.create_node("up", "PythonFuncNode", _python_node_config())
+    upstream_output = asyncio.run(upstream({"a": "x"}))
+
+    first = NodeFactory.create_node("py", "PythonFuncNode", _python_node_config())
+    second = NodeFactory.create_node("py", "PythonFuncNode", _python_node_config())
+    asyncio.run(first({"up": upstream_output}))
+    output = asyncio.run(second({"up": upstream_output}))
+    assert first.input_model is second.input_model
+    assert output.model_dump() == {"value": 1}
+
+
+def test_predecessor_outputs_are_passed_by_reference() -> None:
+    """Test composite inputs and validated outputs are not copied between nodes."""
+    upstream = NodeFactory.create_node("up", "PythonFuncNode", _python_node_config())
+    upstream_output = asyncio.run(upstream({"a": "x"}))
+    assert upstream.output is upstream_output
+
+    node = NodeFactory.create_node("py", "PythonFuncNode", _python_node_config())
+    asyncio.run(node({"up": upstream_output}))
+    assert node.input.up is upstream_output  # type: ignore
+
+
+def test_timeout_is_not_a_function_parameter() -> None:
+    """Test the executor-enforced timeout is left out of tool function schemas."""
+    node = NodeFactory.create_node("py", "PythonFuncNode", {**_python_node_config(), "timeout": 5})
+    assert node.config.timeout == 5
+    assert "timeout" not in node.function_schema["function"]["parameters"]["properties"]
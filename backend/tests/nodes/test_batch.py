@@ -0,0 +1,216 @@
+"""Tests for the _batch.py module, against a mock batch server."""
+
+import asyncio
+import json
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+from litellm.types.utils import Message
+
+from pyspur.nodes.llm import _utils
+from pyspur.nodes.llm._batch import (
+    AnthropicBatchClient,
+    BatchRequestError,
+    LLMBatchCollector,
+    OpenAIBatchClient,
+    collect_llm_batches,
+)
+from pyspur.nodes.llm._response_cache import CachePolicy
+
+
+class MockBatchServer:
+    """The batch endpoints of OpenAI and Anthropic, answering with the last user message."""
+
+    def __init__(self, polls_until_done: int = 1, failing_ids: tuple = ()):
+        self.polls_until_done = polls_until_done
+        self.failing_ids = failing_ids
+        self.batches: List[List[Dict[str, Any]]] = []
+        self.polls = 0
+        self.files: Dict[str, str] = {}
+
+    def _answer(self, messages: List[Dict[str, Any]]) -> str:
+        return f"echo: {messages[-1]['content']}"
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path == "/v1/files":
+            content = request.content.split(b"\r\n\r\n", 2)[2].rsplit(b"\r\n--", 1)[0]
+            file_id = f"file-{len(self.files)}"
+            self.files[file_id] = content.decode()
+            return httpx.Response(200, json={"id": file_id})
+        if path == "/v1/batches":
+            lines = self.files[json.loads(request.content)["input_file_id"]].splitlines()
+            self.batches.append([json.loads(line) for line in lines])
+            return httpx.Response(200, json={"id": "batch-0", "status": "validating"})
+        if path == "/v1/messages/batches":
+            self.batches.append(json.loads(request.content)["requests"])
+            return httpx.Response(200, json={"id": "msgbatch-0"})
+
+        requests = self.batches[-1]
+        if path in ("/v1/batches/batch-0", "/v1/messages/batches/msgbatch-0"):
+            self.polls += 1
+        done = self.polls > self.polls_until_done
+        if path == "/v1/batches/batch-0":
+            status = "completed" if done else "in_progress"
+            return httpx.Response(200, json={"status": status, "output_file_id": "output"})
+        if path == "/v1/files/output/content":
+            lines = [
+                {
+                    "custom_id": item["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "body": {
+                            "choices": [
+                                {
+                                    "index": 0,
+                                    "message": {
+                                        "role": "assistant",
+                                        "content": self._answer(item["body"]["messages"]),
+                                    },
+                                    "finish_reason": "stop",
+                                }
+                            ],
+                            "usage": {
+                                "prompt_tokens": 5,
+                                "completion_tokens": 3,
+                                "total_tokens": 8,
+                            },
+                        },
+                    },
+                }
+                for item in requests
+            ]
+            return httpx.Response(200, text="\n".join(json.dumps(line) for line in lines))
+        if path == "/v1/messages/batches/msgbatch-0":
+            return httpx.Response(
+                200,
+                json={
+                    "processing_status": "ended" if done else "in_progress",
+                    "results_url": "https://api.anthropic.com/v1/messages/batches/results",
+                },
+            )
+        if path == "/v1/messages/batches/results":
+            lines = []
+            for item in requests:
+                if item["custom_id"] in self.failing_ids:
+                    result = {"type": "errored", "error": {"type": "overloaded_error"}}
+                else:
+                    result = {
+                        "type": "succeeded",
+                        "message": {
+                            "content": [
+                                {"type": "text", "text": self._answer(item["params"]["messages"])}
+                            ],
+                            "stop_reason": "end_turn",
+                            "usage": {"input_tokens": 5, "output_tokens": 3},
+                        },
+                    }
+                lines.append({"custom_id": item["custom_id"], "result": result})
+            return httpx.Response(200, text="\n".join(json.dumps(line) for line in lines))
+        return httpx.Response(404)
+
+
+def _request(model: str, text: str) -> Dict[str, Any]:
+    return {
+        "model": model,
+        "max_tokens": 100,
+        "temperature": 0.0,
+        "messages": [
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": text},
+        ],
+    }
+
+
+def test_openai_requests_of_concurrent_runs_share_a_job() -> None:
+    """Test requests gathered within the window are sent as one job and answered."""
+    server = MockBatchServer()
+    client = OpenAIBatchClient(poll_interval=0, transport=httpx.MockTransport(server.handle))
+
+    async def _run() -> List[Any]:
+        collector = LLMBatchCollector(window=0.05, clients={"openai": client})
+        async with collect_llm_batches(collector):
+            return await asyncio.gather(
+                *(collector.complete(_request("openai/gpt-4o", f"row {i}")) for i in range(5))
+            )
+
+    responses = asyncio.run(_run())
+    assert [response.choices[0].message.content for response in responses] == [
+        f"echo: row {i}" for i in range(5)
+    ]
+    assert len(server.batches) == 1
+    body = server.batches[0][0]["body"]
+    assert body["model"] == "gpt-4o"
+    assert body["max_completion_tokens"] == 100
+    assert server.polls == 2
+
+
+def test_full_batches_are_submitted_without_waiting() -> None:
+    """Test a group that reached the maximum size is submitted at once."""
+    server = MockBatchServer(polls_until_done=0)
+    client = OpenAIBatchClient(poll_interval=0, transport=httpx.MockTransport(server.handle))
+
+    async def _run() -> None:
+        collector = LLMBatchCollector(window=60, max_requests=2, clients={"openai": client})
+        async with collect_llm_batches(collector):
+            await asyncio.wait_for(
+                asyncio.gather(
+                    collector.complete(_request("gpt-4o", "a")),
+                    collector.complete(_request("gpt-4o", "b")),
+                ),
+                timeout=5,
+            )
+
+    asyncio.run(_run())
+    assert len(server.batches) == 1
+
+
+def test_anthropic_requests_are_converted() -> None:
+    """Test system messages and the response format are moved to the system prompt."""
+    client = AnthropicBatchClient()
+    request = _request("anthropic/claude-3-5-sonnet-latest", "hi")
+    request["response_format"] = {
+        "type": "json_schema",
+        "json_schema": {"name": "output", "schema": {"type": "object"}},
+    }
+    params = client.prepare(request)
+    assert params["model"] == "claude-3-5-sonnet-latest"
+    assert params["messages"] == [{"role": "user", "content": "hi"}]
+    assert params["system"].startswith("You are a helpful assistant.")
+    assert '{"type": "object"}' in params["system"]
+    with pytest.raises(BatchRequestError):
+        client.prepare({**request, "tools": [{"type": "function"}]})
+    asyncio.run(client.close())
+
+
+def test_unbatched_requests_are_sent_directly(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test failed and unsupported requests fall back to direct calls."""
+    server = MockBatchServer(failing_ids=("request-1",))
+    client = AnthropicBatchClient(poll_interval=0, transport=httpx.MockTransport(server.handle))
+    direct: List[str] = []
+
+    async def _completion(**kwargs: Any) -> Message:
+        direct.append(kwargs["messages"][-1]["content"])
+        return Message(content="direct")
+
+    monkeypatch.setattr(_utils, "completion_with_backoff", _completion)
+
+    async def _run() -> List[Message]:
+        collector = LLMBatchCollector(window=0.05, clients={"anthropic": client})
+        async with collect_llm_batches(collector):
+            return await asyncio.gather(
+                _utils.cached_completion(
+                    CachePolicy.OFF, None, True, **_request("anthropic/claude-3-5-haiku", "a")
+                ),
+                _utils.cached_completion(
+                    CachePolicy.OFF, None, True, **_request("anthropic/claude-3-5-haiku", "b")
+                ),
+                _utils.cached_completion(
+                    CachePolicy.OFF, None, True, **_request("gemini/gemini-1.5-pro", "c")
+                ),
+            )
+
+    messages = asyncio.run(_run())
+    assert [message.content for message in messages] == ["echo: a", "direct", "direct"]
+    assert sorted(direct) == ["b", "c"]
@@ -0,0 +1,51 @@
+"""Tests for the factory.py module."""
+
+from typing import Any, Dict
+
+import pytest
+
+from pyspur.nodes.factory import NodeFactory
+
+
+def _python_config(code: str = "return {'value': 1}") -> Dict[str, Any]:
+    return {"code": code, "output_schema": {"value": "integer"}}
+
+
+@pytest.fixture(autouse=True)
+def clear_prototype_cache() -> None:
+    """Start every test with an empty prototype cache."""
+    NodeFactory.clear_prototype_cache()
+
+
+def test_prototype_is_reused_for_equal_configs() -> None:
+    """Test identical configurations share one prototype and its models."""
+    first = NodeFactory.get_prototype("py", "PythonFuncNode", _python_config())
+    second = NodeFactory.get_prototype("py", "PythonFuncNode", _python_config())
+    assert first is second
+
+
+def test_prototype_depends_on_name_and_config() -> None:
+    """Test a different node name or config gets its own prototype."""
+    prototype = NodeFactory.get_prototype("py", "PythonFuncNode", _python_config())
+    assert NodeFactory.get_prototype("other", "PythonFuncNode", _python_config()) is not prototype
+    assert (
+        NodeFactory.get_prototype("py", "PythonFuncNode", _python_config("return {'value': 2}"))
+        is not prototype
+    )
+
+
+def test_clone_shares_prepared_models() -> None:
+    """Test clones reuse the output model built by the prototype's setup."""
+    prototype = NodeFactory.get_prototype("py", "PythonFuncNode", _python_config())
+    clone = NodeFactory.create_node_from_prototype("py", "PythonFuncNode", _python_config())
+    assert clone is not prototype
+    assert clone.output_model is prototype.output_model
+
+
+def test_clone_does_not_share_run_state() -> None:
+    """Test state accumulated by a clone while running doesn't leak into the prototype."""
+    config = {"iteration_list_path": "x", "subworkflow": {"nodes": [], "links": []}}
+    prototype = NodeFactory.get_prototype("loop", "ForLoopNode", config)
+    clone = NodeFactory.create_node_from_prototype("loop", "ForLoopNode", config)
+    clone.loop_outputs["node"] = [{"value": 1}]  # type: ignore
+    assert prototype.loop_outputs == {}  # type: ignore
@@ -0,0 +1,54 @@
+"""Tests for the _json_stream.py module."""
+
+import json
+from typing import List, Tuple
+
+import pytest
+
+from pyspur.nodes.llm._json_stream import BlockFilter, JsonFieldStream
+
+OUTPUT = {
+    "answer": 'Say "hi" \\ to 🌍\nand é',
+    "count": 3,
+    "nested": {"answer": "ignored", "items": ["a", "b"]},
+    "summary": "done",
+}
+
+
+def _stream_fields(text: str, chunk_size: int) -> List[Tuple[str, str]]:
+    stream = JsonFieldStream()
+    pieces: List[Tuple[str, str]] = []
+    for start in range(0, len(text), chunk_size):
+        pieces.extend(stream.feed(text[start : start + chunk_size]))
+    return pieces
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1000])
+def test_json_field_stream_decodes_top_level_strings(chunk_size: int) -> None:
+    """Test the string fields are decoded in order, however the JSON is chunked."""
+    text = "```json\n" + json.dumps(OUTPUT) + "\n```"
+    pieces = _stream_fields(text, chunk_size)
+    fields = {}
+    for field, fragment in pieces:
+        fields[field] = fields.get(field, "") + fragment
+    assert fields == {"answer": OUTPUT["answer"], "summary": "done"}
+    assert [field for field, _ in pieces] == sorted(field for field, _ in pieces)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 1000])
+def test_block_filter_drops_the_blocks(chunk_size: int) -> None:
+    """Test the text between the markers is dropped, however the stream is chunked."""
+    text = "<think>plan <b></think>Hi <th>ere<think>more</think>!<thi"
+    block_filter = BlockFilter("<think>", "</think>")
+    pieces = [
+        block_filter.feed(text[start : start + chunk_size])
+        for start in range(0, len(text), chunk_size)
+    ]
+    assert "".join(pieces) + block_filter.flush() == "Hi <th>ere!<thi"
+
+
+def test_block_filter_keeps_an_unclosed_block() -> None:
+    """Test a block without its end marker is returned at the end of the stream."""
+    block_filter = BlockFilter("<think>", "</think>")
+    assert block_filter.feed("Hi <think>never") == "Hi "
+    assert block_filter.flush() == "<think>never"
@@ -0,0 +1,64 @@
+"""Tests for the manifest.py module."""
+
+import os
+import subprocess
+import sys
+
+from pyspur.nodes.manifest import load_manifest
+from pyspur.nodes.node_types import SUPPORTED_NODE_TYPES
+
+COLD_START_SCRIPT = """
+import json
+import sys
+
+from pyspur.api.node_management import get_supported_types_payload
+
+node_types = json.loads(get_supported_types_payload()[0])
+assert node_types["Integrations"], node_types.keys()
+imported = [name for name in sys.modules if name.startswith("pyspur.nodes.integrations.")]
+assert not imported, imported
+assert "litellm" not in sys.modules
+"""
+
+FRESHNESS_SCRIPT = """
+import json
+
+from pyspur.nodes.manifest import MANIFEST_PATH, build_manifest
+
+built = json.loads(json.dumps(build_manifest()))
+assert built == json.loads(MANIFEST_PATH.read_text()), "run python -m pyspur.nodes.manifest"
+"""
+
+
+def _run_script(script: str, **extra_env: str) -> subprocess.CompletedProcess[str]:
+    env = {key: value for key, value in os.environ.items() if key != "PROJECT_ROOT"}
+    env.update(extra_env)
+    return subprocess.run(
+        [sys.executable, "-c", script],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+
+def test_manifest_lists_configured_node_types() -> None:
+    """Test the manifest has a schema for every configured node type, in order."""
+    manifest = load_manifest()
+    assert manifest is not None
+    for group_name, node_types in SUPPORTED_NODE_TYPES.items():
+        names = [node_schema["name"] for node_schema in manifest["supported_types"][group_name]]
+        assert [node_type["node_type_name"] for node_type in node_types] == names[: len(node_types)]
+
+
+def test_supported_types_do_not_import_node_modules() -> None:
+    """Test serving the node types from the manifest doesn't import the node modules."""
+    result = _run_script(COLD_START_SCRIPT)
+    assert result.returncode == 0, result.stderr
+
+
+def test_manifest_is_up_to_date() -> None:
+    """Test the checked-in manifest matches the one built from the node modules."""
+    # Building imports every node module, so it runs in a process of its own. Some of
+    # them create the database engine on import, which needs a database URL.
+    result = _run_script(FRESHNESS_SCRIPT, SQLITE_OVERRIDE_DATABASE_URL="sqlite://")
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,103 @@
+"""Tests for the _rate_limiter.py module."""
+
+import asyncio
+from typing import Iterator, List
+
+import pytest
+
+from pyspur.nodes.llm._rate_limiter import (
+    RateLimiter,
+    TokenBucket,
+    call_with_rate_limit,
+    get_rate_limiters,
+    parse_rate_limit_headers,
+    reset_rate_limiters,
+)
+
+
+class _RateLimitError(Exception):
+    status_code = 429
+    litellm_response_headers = {"retry-after": "0"}
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiters() -> Iterator[None]:
+    """Start every test without limiter state."""
+    reset_rate_limiters()
+    yield
+    reset_rate_limiters()
+
+
+def test_token_bucket_refills_per_minute() -> None:
+    """Test an exhausted bucket makes requests wait for its refill."""
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0
+    bucket.consume(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 1) == 0
+
+
+def test_parse_rate_limit_headers() -> None:
+    """Test OpenAI and Anthropic style headers are understood, with litellm's prefix."""
+    assert parse_rate_limit_headers(
+        {
+            "llm_provider-x-ratelimit-limit-requests": "500",
+            "x-ratelimit-remaining-tokens": "1200",
+            "anthropic-ratelimit-tokens-limit": "4000",
+            "anthropic-ratelimit-input-tokens-remaining": "10",
+            "content-type": "application/json",
+        }
+    ) == {"limit_requests": 500, "remaining_tokens": 1200, "limit_tokens": 4000}
+
+
+def test_limits_are_learned_from_headers() -> None:
+    """Test a limiter without configured budgets adopts the ones the provider reports."""
+    limiter = RateLimiter("model")
+    asyncio.run(limiter.acquire(100))
+    limiter.release(
+        100,
+        50,
+        {"x-ratelimit-limit-tokens": "1000", "x-ratelimit-remaining-tokens": "10"},
+    )
+    assert limiter.tokens is not None
+    assert limiter.tokens.capacity == 1000
+    assert limiter.tokens.tokens == 10
+
+
+def test_rate_limited_requests_are_retried_with_less_concurrency() -> None:
+    """Test a 429 is retried and halves the concurrency of the model."""
+    attempts: List[int] = []
+
+    async def _call() -> str:
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise _RateLimitError()
+        return "done"
+
+    assert asyncio.run(call_with_rate_limit(_call, "openai/gpt-4o")) == "done"
+    assert len(attempts) == 2
+    (limiter,) = get_rate_limiters("openai/gpt-4o")
+    assert limiter.concurrency_limit < limiter.max_concurrency
+    assert limiter.in_flight == 0
+
+
+def test_concurrency_limit_is_respected() -> None:
+    """Test no more requests than the concurrency limit are in flight at once."""
+    limiter = RateLimiter("model", max_concurrency=2)
+    in_flight: List[int] = [0]
+    peak: List[int] = [0]
+
+    async def _request() -> None:
+        await limiter.acquire()
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        limiter.release()
+
+    async def _run() -> None:
+        await asyncio.gather(*(_request() for _ in range(6)))
+
+    asyncio.run(_run())
+    assert peak[0] == 2
@@ -0,0 +1,68 @@
+"""Tests for the registry.py module."""
+
+import sys
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from pyspur.nodes.factory import NodeFactory
+from pyspur.nodes.registry import TOOL_FUNCTION_CATEGORY, NodeRegistry
+
+TOOL_MODULE = """
+from pyspur.nodes.decorator import tool_function
+
+
+@tool_function(name="greet")
+def greet(name: str) -> str:
+    \"\"\"Greet someone.\"\"\"
+    return "{greeting} " + name
+"""
+
+
+@pytest.fixture
+def project_root(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    """Provide a project root with an empty tools package."""
+    (tmp_path / "tools").mkdir()
+    (tmp_path / "tools" / "__init__.py").write_text("")
+    monkeypatch.setenv("PROJECT_ROOT", str(tmp_path))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield tmp_path
+    monkeypatch.undo()
+    NodeRegistry.reload_tool_functions()
+
+
+def _write_tool(project_root: Path, greeting: str) -> None:
+    (project_root / "tools" / "greet.py").write_text(TOOL_MODULE.format(greeting=greeting))
+
+
+def test_lookups_do_not_rediscover(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the node modules are only scanned by the first lookup."""
+    NodeRegistry.ensure_discovered()
+
+    def _fail(*args: object) -> None:
+        raise AssertionError("nodes were discovered again")
+
+    monkeypatch.setattr(NodeRegistry, "_discover_in_directory", classmethod(_fail))
+    assert NodeRegistry.get_node_info("HumanInterventionNode") is not None
+    assert NodeRegistry.get_node_info("NoSuchNode") is None
+    assert NodeRegistry.get_registered_nodes()
+    assert NodeFactory.get_node_class("PythonFuncNode").__name__ == "PythonFuncNode"
+
+
+def test_reload_tool_functions(project_root: Path) -> None:
+    """Test reloading the tools directory picks up new and edited tool functions."""
+    _write_tool(project_root, "hello")
+    version = NodeRegistry.version()
+    assert NodeRegistry.reload_tool_functions() == 1
+    assert NodeRegistry.version() > version
+
+    (node_info,) = NodeRegistry.get_registered_nodes()[TOOL_FUNCTION_CATEGORY]
+    assert NodeRegistry.get_node_info(node_info.node_type_name) is node_info
+    first_class = NodeFactory.get_node_class(node_info.node_type_name)
+
+    _write_tool(project_root, "hi")
+    assert NodeRegistry.reload_tool_functions() == 1
+    second_class = NodeFactory.get_node_class(node_info.node_type_name)
+    assert second_class is not first_class
+    assert sys.modules["tools.greet"].greet("there") == "hi there"
@@ -0,0 +1,97 @@
+"""Tests for the _response_cache.py module."""
+
+import asyncio
+import time
+from pathlib import Path
+from typing import Any, Iterator, List
+
+import pytest
+from litellm.types.utils import Message
+
+from pyspur.nodes.llm import _response_cache, _utils
+from pyspur.nodes.llm._response_cache import (
+    CachePolicy,
+    ResponseCache,
+    SQLiteResponseCache,
+    response_cache_key,
+    set_response_cache,
+)
+
+
+@pytest.fixture
+def completions(monkeypatch: pytest.MonkeyPatch) -> List[Any]:
+    """Replace the provider call with one that records its requests."""
+    requests: List[Any] = []
+
+    async def _completion(**kwargs: Any) -> Message:
+        requests.append(kwargs)
+        return Message(content=f"response {len(requests)}")
+
+    monkeypatch.setattr(_utils, "completion_with_backoff", _completion)
+    return requests
+
+
+@pytest.fixture
+def sqlite_path(tmp_path: Path) -> Iterator[Path]:
+    """Use a response cache backed by a fresh SQLite file."""
+    path = tmp_path / "llm_cache.sqlite3"
+    set_response_cache(ResponseCache(SQLiteResponseCache(path)))
+    yield path
+    set_response_cache(None)
+
+
+def _request(temperature: float = 0.0) -> Any:
+    return {
+        "model": "openai/gpt-4o",
+        "messages": [{"role": "user", "content": "hi"}],
+        "temperature": temperature,
+        "max_tokens": 100,
+    }
+
+
+def test_key_depends_on_the_request_content() -> None:
+    """Test equal requests share a key and a different parameter changes it."""
+    reordered = dict(reversed(list(_request().items())))
+    assert response_cache_key(_request()) == response_cache_key(reordered)
+    assert response_cache_key(_request()) != response_cache_key(_request(temperature=0.5))
+
+
+def test_read_write_reuses_responses_across_processes(
+    completions: List[Any], sqlite_path: Path
+) -> None:
+    """Test a stored response is reused, also by a cache that only shares the SQLite file."""
+
+    async def _run() -> List[Message]:
+        first = await _utils.cached_completion(CachePolicy.READ_WRITE, **_request())
+        second = await _utils.cached_completion(CachePolicy.READ_WRITE, **_request())
+        set_response_cache(ResponseCache(SQLiteResponseCache(sqlite_path)))
+        third = await _utils.cached_completion(CachePolicy.READ_ONLY, **_request())
+        return [first, second, third]
+
+    responses = asyncio.run(_run())
+    assert len(completions) == 1
+    assert [response.content for response in responses] == ["response 1"] * 3
+
+
+def test_read_only_and_off_do_not_store(completions: List[Any], sqlite_path: Path) -> None:
+    """Test only the read-write policy stores responses and off never reads them."""
+
+    async def _run() -> None:
+        await _utils.cached_completion(CachePolicy.READ_ONLY, **_request())
+        await _utils.cached_completion(CachePolicy.READ_ONLY, **_request())
+        await _utils.cached_completion(CachePolicy.READ_WRITE, **_request())
+        await _utils.cached_completion(CachePolicy.OFF, **_request())
+
+    asyncio.run(_run())
+    assert len(completions) == 4
+
+
+def test_responses_expire(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test both tiers stop returning a response once its TTL has passed."""
+    cache = ResponseCache(SQLiteResponseCache(tmp_path / "llm_cache.sqlite3"), ttl=60)
+    asyncio.run(cache.set("key", "value"))
+    assert asyncio.run(cache.get("key")) == "value"
+
+    now = time.time()
+    monkeypatch.setattr(_response_cache.time, "time", lambda: now + 120)
+    assert asyncio.run(cache.get("key")) is None
@@ -0,0 +1,123 @@
+"""Tests for the _utils.py module."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, List
+
+import litellm
+import pytest
+
+from pyspur.nodes.llm import _utils
+from pyspur.nodes.llm._rate_limiter import reset_rate_limiters
+
+
+def _chunk(content: Any = None, tool_calls: Any = None, usage: Any = None) -> Any:
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=usage)
+
+
+def _tool_call_delta(index: int, id: Any = None, name: Any = None, arguments: str = "") -> Any:
+    function = SimpleNamespace(name=name, arguments=arguments)
+    return SimpleNamespace(index=index, id=id, function=function)
+
+
+def test_completion_is_not_repeated_without_a_retryable_error(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test successful calls and non-retryable errors are not retried with backoff."""
+    calls: List[str] = []
+
+    async def _completion(on_delta: Any = None, **kwargs: Any) -> Any:
+        calls.append(kwargs["messages"][-1]["content"])
+        if kwargs["messages"][-1]["content"] == "bad":
+            raise ValueError("bad request")
+        message = SimpleNamespace(content="ok")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    monkeypatch.setattr(_utils, "_rate_limited_completion", _completion)
+    message = asyncio.run(
+        _utils.completion_with_backoff(
+            model="openai/gpt-4o", messages=[{"role": "user", "content": "hi"}]
+        )
+    )
+    assert message.content == "ok"
+    with pytest.raises(ValueError):
+        asyncio.run(
+            _utils.completion_with_backoff(
+                model="openai/gpt-4o", messages=[{"role": "user", "content": "bad"}]
+            )
+        )
+    assert calls == ["hi", "bad"]
+
+
+def test_stream_completion_assembles_the_response(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the streamed chunks are reported and assembled into one response."""
+    chunks = [
+        _chunk(content="Hel"),
+        _chunk(content="lo"),
+        _chunk(tool_calls=[_tool_call_delta(0, id="call_1", name="search", arguments='{"q"')]),
+        _chunk(tool_calls=[_tool_call_delta(0, arguments=': "x"}')]),
+        _chunk(tool_calls=[_tool_call_delta(1, id="call_2", name="noop", arguments="{}")]),
+    ]
+
+    async def _acompletion(**kwargs: Any) -> AsyncIterator[Any]:
+        assert kwargs["stream"] is True
+
+        async def _stream() -> AsyncIterator[Any]:
+            for chunk in chunks:
+                yield chunk
+
+        return _stream()
+
+    monkeypatch.setattr(_utils, "acompletion", _acompletion)
+    reset_rate_limiters()
+    deltas: List[str] = []
+    response = asyncio.run(
+        _utils._rate_limited_completion(
+            on_delta=deltas.append,
+            model="openai/gpt-4o",
+            messages=[{"role": "user", "content": "hi"}],
+        )
+    )
+    message = response.choices[0].message
+    assert deltas == ["Hel", "lo"]
+    assert message.content == "Hello"
+    assert [tool_call.function.name for tool_call in message.tool_calls] == ["search", "noop"]
+    assert json.loads(message.tool_calls[0].function.arguments) == {"q": "x"}
+    assert response.usage.total_tokens > 0
+
+
+def test_retried_streams_are_not_passed_on_again(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the text of an attempt that retries a failed stream is not passed on."""
+    attempts: List[int] = []
+
+    async def _acompletion(**kwargs: Any) -> AsyncIterator[Any]:
+        attempts.append(1)
+        failing = len(attempts) == 1
+
+        async def _stream() -> AsyncIterator[Any]:
+            yield _chunk(content="Hel")
+            if failing:
+                error = litellm.exceptions.RateLimitError(
+                    "rate limited", llm_provider="openai", model="gpt-4o"
+                )
+                error.litellm_response_headers = {"retry-after": "0"}
+                raise error
+            yield _chunk(content="lo")
+
+        return _stream()
+
+    monkeypatch.setattr(_utils, "acompletion", _acompletion)
+    reset_rate_limiters()
+    deltas: List[str] = []
+    response = asyncio.run(
+        _utils._rate_limited_completion(
+            on_delta=deltas.append,
+            model="openai/gpt-4o",
+            messages=[{"role": "user", "content": "hi"}],
+        )
+    )
+    assert len(attempts) == 2
+    assert response.choices[0].message.content == "Hello"
+    assert deltas == ["Hel"]
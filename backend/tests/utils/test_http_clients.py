@@ -0,0 +1,56 @@
+"""Tests for the http_clients.py module."""
+
+import asyncio
+
+import httpx
+
+from pyspur.utils.http_clients import close_http_clients, get_http_client, get_requests_session
+
+
+def test_clients_are_shared_per_host() -> None:
+    """Test calls to a host reuse one client, and other hosts get their own."""
+
+    async def _run() -> httpx.AsyncClient:
+        client = get_http_client("https://r.jina.ai/https://example.com")
+        assert get_http_client("https://r.jina.ai/other") is client
+        assert get_http_client("https://api.openai.com/v1/files") is not client
+        return client
+
+    first = asyncio.run(_run())
+    # Connections can't move between event loops, so another loop gets a new client
+    second = asyncio.run(_run())
+    assert second is not first
+    asyncio.run(close_http_clients())
+
+
+def test_close_http_clients() -> None:
+    """Test closing releases the clients of the loop and the synchronous session."""
+
+    async def _run() -> httpx.AsyncClient:
+        client = get_http_client("https://api.anthropic.com")
+        await close_http_clients()
+        assert client.is_closed
+        return client
+
+    session = get_requests_session()
+    reddit_session = get_requests_session("reddit")
+    client = asyncio.run(_run())
+    assert get_requests_session() is not session
+    assert get_requests_session("reddit") is not reddit_session
+
+    async def _reopen() -> None:
+        assert get_http_client("https://api.anthropic.com") is not client
+        await close_http_clients()
+
+    asyncio.run(_reopen())
+
+
+def test_named_sessions_are_separate() -> None:
+    """Test an SDK's own session doesn't share headers or cookies with the others."""
+    reddit_session = get_requests_session("reddit")
+    assert get_requests_session("reddit") is reddit_session
+    assert get_requests_session() is not reddit_session
+    reddit_session.headers["User-Agent"] = "RedditTools v1.0"
+    assert get_requests_session().headers["User-Agent"] != "RedditTools v1.0"
+    assert get_requests_session().cookies is not reddit_session.cookies
+    asyncio.run(close_http_clients())